@@ -11,6 +11,9 @@ setup(
     packages=['taskban', ],
     license='GPLv2',
     long_description=open('README.md').read(),
+    extras_require={
+      'numpy': ['numpy'],
+    },
     entry_points={
       'console_scripts': ['taskban = taskban:main']
     }
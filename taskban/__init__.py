@@ -17,13 +17,28 @@
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
 import os
-from taskban.reports import KanbanReport, RefinementReport, PlanningReport
+import sys
+import shlex
+import logging
+import tempfile
+import subprocess
 from taskban.cli import load_logger, load_parser
 
+log = logging.getLogger('Main')
+
+
+def _absolute_path(path):
+    return os.path.abspath(os.path.expanduser(path))
+
+
+def _refinement_next(report, parentage, direction):
+    report.next(parentage, direction)
+    print(report.summary())
+
 
 def _refinement_next_parent(report, direction):
     try:
-        report.next('parent', direction)
+        _refinement_next(report, 'parent', direction)
     except IndexError:
         if direction == 1:
             print('There are no more projects :)')
@@ -34,7 +49,7 @@ def _refinement_next_parent(report, direction):
 
 def _refinement_next_child(report, direction):
     try:
-        report.next('child', direction)
+        _refinement_next(report, 'child', direction)
     except IndexError:
         print('There are no more children')
 
@@ -46,45 +61,163 @@ def refinement_next_project(args, report, direction):
         _refinement_next_child(report, direction)
     elif args.parentage == 'sibling':
         try:
-            report.next('sibling', direction)
+            _refinement_next(report, 'sibling', direction)
         except IndexError:
             print('There are no more children')
     else:
         try:
-            report.next('child', direction)
+            _refinement_next(report, 'child', direction)
         except IndexError:
             try:
-                report.next('sibling', direction)
+                _refinement_next(report, 'sibling', direction)
             except IndexError:
                 _refinement_next_parent(report, direction)
 
 
+def read_task_order(path):
+    '''Read the task ids of a file with one task per line, starting with its
+    id. Empty lines and lines starting with # are ignored.
+
+    Raise ValueError if a line doesn't start with a task id'''
+    task_ids = []
+    with open(os.path.expanduser(path), 'r') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if line == '' or line.startswith('#'):
+                continue
+            try:
+                task_ids.append(int(line.split()[0]))
+            except ValueError:
+                raise ValueError(
+                    'Line {} of {} doesn\'t start with a task id: {}'.format(
+                        number,
+                        path,
+                        line,
+                    )
+                )
+    return task_ids
+
+
+def edit_task_order(report):
+    '''Open the tasks of the report in $EDITOR, one per line, and return the
+    task ids in the order they were left'''
+    order_file = tempfile.NamedTemporaryFile(
+        mode='w',
+        prefix='taskban-order-',
+        delete=False,
+    )
+    with order_file:
+        order_file.write('# Sort the lines to reorder the tasks\n')
+        for task in report.tasks:
+            order_file.write('{} {}\n'.format(task['id'], task))
+    editor = os.environ.get('EDITOR', 'vi')
+    try:
+        from taskban.spawns import log as spawn_log
+        with spawn_log.command(editor, [order_file.name]):
+            subprocess.call(shlex.split(editor) + [order_file.name])
+        return read_task_order(order_file.name)
+    finally:
+        os.remove(order_file.name)
+
+
+def write_ocupation(report, args):
+    'Print the ocupation report in the output format of the arguments'
+    if args.output_format == 'markdown':
+        report.print_report(
+            show_backlog=args.backlog,
+            show_inactive=args.inactive
+        )
+    else:
+        report.export_report(
+            args.output_format,
+            show_backlog=args.backlog,
+            show_inactive=args.inactive,
+        )
+
+
 def main():
     parser = load_parser()
     args = parser.parse_args()
     load_logger(args)
 
-    if args.subcommand == 'ocupation':
-        report = KanbanReport(
+    if not args.profile and args.profile_json is None:
+        return run(args)
+
+    from taskban.profiler import Profiler
+    profiler = Profiler(trace_memory=args.profile_memory)
+    try:
+        with profiler, profiler.span(args.subcommand):
+            run(args)
+    finally:
+        if args.profile_json is not None:
+            with open(os.path.expanduser(args.profile_json), 'w') as f:
+                profiler.write_json(f)
+        else:
+            profiler.write_table(sys.stderr)
+
+
+def run(args):
+    '''Run the subcommand of the parsed arguments.
+
+    The reports import tasklib, yaml, tabulate and NumPy, so each subcommand
+    imports what it uses and --help and the shell completion start fast'''
+    if args.subcommand == 'ocupation' and args.members is not None:
+        from taskban.reports import TeamReport, team_members
+        try:
+            members = team_members(args.members, args.taskrc_path)
+        except ValueError as e:
+            log.error(e)
+            return
+        report = TeamReport(
+            members,
             start_date=args.period,
-            task_data_path=args.task_data_path,
-            taskrc_path=args.taskrc_path,
             config_path=args.config_path,
+            data_path=args.data_path,
+            workers=args.workers,
         )
-        report.print_report(
-            show_backlog=args.backlog,
-            show_inactive=args.inactive
-        )
+        write_ocupation(report, args)
+    elif args.subcommand == 'ocupation':
+        from taskban.reports import KanbanReport
+        from taskban.server import ServerUnavailable, ServerError, request
+        try:
+            sys.stdout.write(request(args.data_path, 'ocupation', {
+                'period': args.period,
+                'task_data_path': _absolute_path(args.task_data_path),
+                'taskrc_path': _absolute_path(args.taskrc_path),
+                'config_path': _absolute_path(args.config_path),
+                'show_backlog': args.backlog,
+                'show_inactive': args.inactive,
+                'output_format': args.output_format,
+            }))
+        except ServerUnavailable as e:
+            log.debug('{}, running in process'.format(e))
+            report = KanbanReport(
+                start_date=args.period,
+                task_data_path=args.task_data_path,
+                taskrc_path=args.taskrc_path,
+                config_path=args.config_path,
+                data_path=args.data_path,
+            )
+            write_ocupation(report, args)
+            report.update_completion_index()
+        except ServerError as e:
+            log.error(e)
+    elif args.subcommand == 'serve':
+        from taskban.server import TaskbanServer
+        TaskbanServer(args.data_path).serve()
     elif args.subcommand == 'refine':
+        from taskban.reports import RefinementReport
         report = RefinementReport(
             task_data_path=args.task_data_path,
             taskrc_path=args.taskrc_path,
             config_path=args.config_path,
             data_path=args.data_path,
+            skip_empty=args.skip_empty,
         )
 
         if args.next_subcommand == 'jump':
             report.jump(args.jump_project)
+            print(report.summary())
         elif args.next_subcommand == 'next':
             direction = 1
             refinement_next_project(args, report, direction)
@@ -92,12 +225,10 @@ def main():
             direction = -1
             refinement_next_project(args, report, direction)
         else:
-            os.system('task rc:{} pro:{} list'.format(
-                    args.taskrc_path,
-                    report.state['project'],
-                ),
-            )
+            report.print_report()
+        report.update_completion_index()
     elif args.subcommand == 'plan':
+        from taskban.reports import PlanningReport
         report = PlanningReport(
             task_data_path=args.task_data_path,
             taskrc_path=args.taskrc_path,
@@ -106,10 +237,57 @@ def main():
             task_state=args.task_status,
             project=args.project,
         )
-        if args.plan_direction == 'up':
-            report.move_task_up(args.task_id)
-        elif args.plan_direction == 'down':
-            report.move_task_down(args.task_id)
+        try:
+            if args.plan_direction == 'up':
+                report.move_task_up(args.task_id)
+            elif args.plan_direction == 'down':
+                report.move_task_down(args.task_id)
+        except ValueError as e:
+            log.error(e)
+            return
+        report.update_completion_index()
+    elif args.subcommand == 'reorder':
+        from taskban.reports import PlanningReport
+        report = PlanningReport(
+            task_data_path=args.task_data_path,
+            taskrc_path=args.taskrc_path,
+            config_path=args.config_path,
+            data_path=args.data_path,
+            task_state=args.task_status,
+            project=args.project,
+        )
+        try:
+            if args.edit:
+                task_ids = edit_task_order(report)
+            elif args.order_file is not None:
+                task_ids = read_task_order(args.order_file)
+            else:
+                task_ids = args.task_ids
+            report.reorder(task_ids)
+        except ValueError as e:
+            log.error(e)
+            return
+        report.update_completion_index()
+    elif args.subcommand == 'session':
+        from taskban.reports import RefinementReport, PlanningReport
+        from taskban.session import Session
+        report_arguments = {
+            'task_data_path': args.task_data_path,
+            'taskrc_path': args.taskrc_path,
+            'config_path': args.config_path,
+            'data_path': args.data_path,
+        }
+        refinement = RefinementReport(
+            skip_empty=args.skip_empty,
+            **report_arguments
+        )
+        planning = PlanningReport(
+            task_state=args.task_status,
+            project=refinement.state['project'],
+            **report_arguments
+        )
+        Session(refinement, planning, args.task_status).cmdloop()
+        planning.update_completion_index()
 
 
 if __name__ == "__main__":
@@ -1,6 +1,8 @@
 import logging
 import argparse
 import argcomplete
+from taskban.completion import complete_projects, complete_task_ids, \
+    complete_states
 
 
 def load_parser():
@@ -46,6 +48,24 @@ def load_parser():
     group.add_argument("-v", "--verbose", action="count")
     group.add_argument("-q", "--quiet", action="store_true")
 
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print the time and memory of each phase of the command",
+    )
+    parser.add_argument(
+        "--profile_json",
+        type=str,
+        help="Write the time and memory of each phase of the command as JSON "
+        "to this file",
+    )
+    parser.add_argument(
+        "--profile_memory",
+        action="store_true",
+        help="Also measure the memory allocated by each phase with "
+        "tracemalloc, it makes the command much slower",
+    )
+
     subparser = parser.add_subparsers(dest='subcommand', help='subcommands')
     subparser.required = True
 
@@ -69,6 +89,37 @@ def load_parser():
         action="store_true",
         help="Show inactive tasks",
     )
+    ocupation_parser.add_argument(
+        "--format",
+        dest="output_format",
+        choices=['markdown', 'json', 'jsonl', 'csv'],
+        default='markdown',
+        help="Output format, json, jsonl and csv have a record per task and "
+        "a total record per project",
+    )
+    ocupation_parser.add_argument(
+        "-m",
+        "--member",
+        dest="members",
+        action="append",
+        metavar="TASK_DATA_PATH[:TASKRC_PATH]",
+        help="Taskwarrior data directory of a member of the team, or a glob "
+        "of several of them. Repeat it to build one board of the whole team "
+        "with the totals of each member, the members without taskrc use "
+        "--taskrc_path",
+    )
+    ocupation_parser.add_argument(
+        "--workers",
+        type=int,
+        help="Processes that build the boards of the members at the same "
+        "time, one per CPU by default",
+    )
+
+    subparser.add_parser(
+        'serve',
+        help='Keep the Taskwarrior data in memory and answer the ocupation '
+        'requests through a socket in the data directory',
+    )
 
     snapshot_parser = subparser.add_parser('snapshot')
     snapshot_parser.add_argument(
@@ -80,6 +131,12 @@ def load_parser():
     )
 
     refine_parser = subparser.add_parser('refine')
+    refine_parser.add_argument(
+        "-s",
+        "--skip_empty",
+        action="store_true",
+        help="Skip the projects without pending tasks",
+    )
     refine_next_subparser = refine_parser.add_subparsers(
         dest='next_subcommand',
         help='Next project subparser',
@@ -105,14 +162,14 @@ def load_parser():
         type=str,
         help='Jump to a specific project',
         metavar='project',
-    )
+    ).completer = complete_projects
 
     plan_parser = subparser.add_parser('plan')
     plan_parser.add_argument(
         'task_id',
         type=int,
         help='Taskwarrior task ID',
-    )
+    ).completer = complete_task_ids
     plan_parser.add_argument(
         'plan_direction',
         choices=['up', 'down'],
@@ -125,7 +182,7 @@ def load_parser():
         help='Filter just a specific project',
         metavar='project',
         nargs='?'
-    )
+    ).completer = complete_projects
 
     plan_parser.add_argument(
         '--task_status',
@@ -133,7 +190,57 @@ def load_parser():
         help='Filter just a specific task status',
         nargs='?',
         default='todo'
+    ).completer = complete_states
+
+    reorder_parser = subparser.add_parser('reorder')
+    reorder_parser.add_argument(
+        'task_ids',
+        type=int,
+        help='Taskwarrior task IDs in the desired order',
+        metavar='task_id',
+        nargs='*',
+    ).completer = complete_task_ids
+    reorder_group = reorder_parser.add_mutually_exclusive_group()
+    reorder_group.add_argument(
+        '--file',
+        type=str,
+        help='File with the task IDs in the desired order, one per line',
+        dest='order_file',
+    )
+    reorder_group.add_argument(
+        '-e',
+        '--edit',
+        action='store_true',
+        help='Edit the order of the tasks with $EDITOR',
+    )
+    reorder_parser.add_argument(
+        '--project',
+        type=str,
+        help='Filter just a specific project',
+        metavar='project',
+        nargs='?'
+    ).completer = complete_projects
+    reorder_parser.add_argument(
+        '--task_status',
+        type=str,
+        help='Filter just a specific task status',
+        nargs='?',
+        default='todo'
+    ).completer = complete_states
+
+    session_parser = subparser.add_parser('session')
+    session_parser.add_argument(
+        "-s",
+        "--skip_empty",
+        action="store_true",
+        help="Skip the projects without pending tasks",
     )
+    session_parser.add_argument(
+        '--task_status',
+        type=str,
+        help='Task status of the planning',
+        default='todo'
+    ).completer = complete_states
 
     argcomplete.autocomplete(parser)
     return parser
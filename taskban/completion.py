@@ -0,0 +1,70 @@
+import os
+import json
+
+INDEX_NAME = 'completion.json'
+
+
+def index_path(data_path):
+    'Path of the completion index of the data_path directory'
+    return os.path.join(os.path.expanduser(data_path), INDEX_NAME)
+
+
+def save_index(data_path, projects, tasks, states, fingerprint=None):
+    '''Save the completion index with the project names, the dictionary of
+    pending task ids to their description and the pm states. The fingerprint
+    of the data files it was built from is saved with them'''
+    path = index_path(data_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = '{}.tmp'.format(path)
+    with open(tmp_path, 'w') as f:
+        json.dump(
+            {
+                'projects': projects,
+                'tasks': {
+                    str(task_id): description
+                    for task_id, description in tasks.items()
+                },
+                'states': states,
+                'fingerprint': fingerprint,
+            },
+            f,
+        )
+    os.replace(tmp_path, path)
+
+
+def load_index(data_path):
+    '''Load the completion index written by the last taskban run, if it can't
+    be read return an empty one'''
+    try:
+        with open(index_path(data_path), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'projects': [], 'tasks': {}, 'states': []}
+
+
+# The completers are called by argcomplete with the arguments parsed so far,
+# they only read the index so the completion never starts Taskwarrior
+
+
+def complete_projects(prefix, parsed_args, **kwargs):
+    return [
+        project for project in load_index(parsed_args.data_path)['projects']
+        if project.startswith(prefix)
+    ]
+
+
+def complete_task_ids(prefix, parsed_args, **kwargs):
+    return {
+        task_id: description
+        for task_id, description in load_index(
+            parsed_args.data_path,
+        )['tasks'].items()
+        if task_id.startswith(prefix)
+    }
+
+
+def complete_states(prefix, parsed_args, **kwargs):
+    return [
+        state for state in load_index(parsed_args.data_path)['states']
+        if state.startswith(prefix)
+    ]
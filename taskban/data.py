@@ -0,0 +1,535 @@
+import os
+import re
+import json
+import logging
+import datetime
+import functools
+from taskban.profiler import profiled
+
+log = logging.getLogger('Main')
+
+DATE_ATTRIBUTES = [
+    'due',
+    'end',
+    'entry',
+    'modified',
+    'scheduled',
+    'start',
+    'until',
+    'wait',
+]
+
+URGENCY_DEFAULTS = {
+    'urgency.active.coefficient': 4.0,
+    'urgency.age.coefficient': 2.0,
+    'urgency.age.max': 365,
+    'urgency.annotations.coefficient': 1.0,
+    'urgency.blocked.coefficient': -5.0,
+    'urgency.blocking.coefficient': 8.0,
+    'urgency.due.coefficient': 12.0,
+    'urgency.project.coefficient': 1.0,
+    'urgency.scheduled.coefficient': 5.0,
+    'urgency.tags.coefficient': 1.0,
+    'urgency.waiting.coefficient': -3.0,
+    'urgency.uda.priority.H.coefficient': 6.0,
+    'urgency.uda.priority.M.coefficient': 3.9,
+    'urgency.uda.priority.L.coefficient': 1.8,
+    'urgency.user.tag.next.coefficient': 15.0,
+}
+
+# Values Taskwarrior reads as false in boolean settings like gc
+FALSE_VALUES = ['off', 'no', 'false', '0', 'n']
+
+# Attributes computed by Taskwarrior or by the reports, that aren't exported
+EXPORT_IGNORED_ATTRIBUTES = [
+    'active_time',
+    'id',
+    'total_active_percent',
+    'urgency',
+]
+
+_attribute_regexp = re.compile(r'([^\s:\[\]]+):"((?:[^"\\]|\\.)*)"')
+
+
+class UnrecognisedTaskData(Exception):
+    """Raised when the Taskwarrior data files can't be read by taskban"""
+
+
+def parse_line(line):
+    '''Parse a Taskwarrior FF4 line `[key:"value" ...]` into a dictionary
+    of raw string values.
+
+    Raise UnrecognisedTaskData if the line doesn't follow the format'''
+
+    line = line.strip()
+    if not (line.startswith('[') and line.endswith(']')):
+        raise UnrecognisedTaskData('Unknown task line {}'.format(line[:80]))
+
+    body = line[1:-1]
+    data = {}
+    end = 0
+    for match in _attribute_regexp.finditer(body):
+        if body[end:match.start()].strip() != '':
+            raise UnrecognisedTaskData(
+                'Unknown task line {}'.format(line[:80]),
+            )
+        data[match.group(1)] = _decode_value(match.group(2))
+        end = match.end()
+    if body[end:].strip() != '':
+        raise UnrecognisedTaskData('Unknown task line {}'.format(line[:80]))
+    return data
+
+
+def _decode_value(value):
+    'Undo the escaping Taskwarrior applies to the values of the FF4 format'
+    if '\\' in value:
+        try:
+            value = json.loads('"{}"'.format(value))
+        except ValueError:
+            pass
+    return value.replace(
+        '&open;', '[',
+    ).replace(
+        '&close;', ']',
+    ).replace(
+        '&dquot;', '"',
+    )
+
+
+def epoch_to_datetime(epoch):
+    'Convert a Taskwarrior epoch string to a local timezone aware datetime'
+    return datetime.datetime.fromtimestamp(
+        int(epoch),
+        tz=datetime.timezone.utc,
+    ).astimezone()
+
+
+def datetime_to_export(date):
+    'Convert a datetime to the date format of the Taskwarrior JSON export'
+    return date.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def files_fingerprint(paths):
+    '''Return the size, mtime and inode of each file, or None if it doesn't
+    exist, to detect when any of them change'''
+    fingerprint = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            fingerprint.append(None)
+            continue
+        fingerprint.append([stat.st_size, stat.st_mtime_ns, stat.st_ino])
+    return fingerprint
+
+
+def load_taskrc(taskrc_path):
+    '''Load the key=value pairs of a taskrc file, following the `include`
+    statements it can resolve'''
+
+    config = {}
+    taskrc_path = os.path.expanduser(taskrc_path)
+    try:
+        with open(taskrc_path, 'r') as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        log.debug('Taskrc file {} not found'.format(taskrc_path))
+        return config
+
+    for line in lines:
+        line = line.split('#', 1)[0].strip()
+        if line == '':
+            continue
+        if line.startswith('include '):
+            include_path = os.path.expanduser(line[len('include '):].strip())
+            if not os.path.isabs(include_path):
+                include_path = os.path.join(
+                    os.path.dirname(taskrc_path),
+                    include_path,
+                )
+            config.update(load_taskrc(include_path))
+        elif '=' in line:
+            key, value = line.split('=', 1)
+            config[key.strip()] = value.strip()
+    return config
+
+
+class LocalTask():
+    """Task read directly from the Taskwarrior data files.
+
+    It mimics the interface of tasklib.Task that taskban uses: the attributes
+    are accessed as items, unset attributes return None and the string
+    representation is the description.
+
+    The lazy dictionary maps attributes to functions that compute them on
+    first access"""
+
+    def __init__(self, data, lazy=None):
+        self._data = data
+        self._lazy = lazy or {}
+
+    def __getitem__(self, key):
+        if key in self._lazy:
+            self._data[key] = self._lazy.pop(key)()
+        return self._data.get(key)
+
+    def __setitem__(self, key, value):
+        self._lazy.pop(key, None)
+        self._data[key] = value
+
+    def __contains__(self, key):
+        return key in self._data or key in self._lazy
+
+    def __str__(self):
+        return self._data.get('description', '')
+
+    def __repr__(self):
+        return '<LocalTask {}>'.format(self._data.get('uuid'))
+
+    def export(self):
+        'Return the task as a dictionary in the Taskwarrior JSON format'
+        exported = {}
+        for key, value in self._data.items():
+            if key in EXPORT_IGNORED_ATTRIBUTES or value is None or \
+                    value == set() or value == []:
+                continue
+            if isinstance(value, datetime.datetime):
+                exported[key] = datetime_to_export(value)
+            elif key == 'tags':
+                exported[key] = sorted(value)
+            elif key == 'depends':
+                exported[key] = ','.join(sorted(value))
+            elif key == 'annotations':
+                exported[key] = [
+                    {
+                        'entry': datetime_to_export(annotation['entry']),
+                        'description': annotation['description'],
+                    }
+                    for annotation in value
+                ]
+            else:
+                exported[key] = value
+        return exported
+
+
+class TaskData():
+    """Reader of the Taskwarrior data files pending.data and completed.data.
+
+    It parses the files in process instead of running `task export`, so
+    tasks can be filtered without spawning Taskwarrior. If the files don't
+    follow the expected format UnrecognisedTaskData is raised so the caller
+    can fall back to the Taskwarrior binary"""
+
+    def __init__(self, task_data_path, taskrc_path):
+        self.task_data_path = os.path.expanduser(task_data_path)
+        self.taskrc_path = os.path.expanduser(taskrc_path)
+        self._pending = None
+        self._completed = None
+        self._config = None
+        self._uda_types = None
+        self._urgency_coefficients = None
+
+    @property
+    def config(self):
+        'Taskwarrior configuration with the urgency defaults applied'
+        if self._config is None:
+            self._config = dict(URGENCY_DEFAULTS)
+            self._config.update(load_taskrc(self.taskrc_path))
+        return self._config
+
+    @property
+    def uda_types(self):
+        'Dictionary of UDA name to its type, parsed once from the config'
+        if self._uda_types is None:
+            self._uda_types = {
+                key[len('uda.'):-len('.type')]: value
+                for key, value in self.config.items()
+                if key.startswith('uda.') and key.endswith('.type')
+            }
+        return self._uda_types
+
+    @property
+    def urgency_coefficients(self):
+        '''Urgency coefficients of the config, parsed once into lookup
+        tables so each task only looks up its own tags, project and UDAs:
+
+        * coefficients: name to value of the fixed coefficients, like
+            project or age.
+        * tags: user tag to coefficient.
+        * projects: list of (user project, coefficient).
+        * udas: UDA name to the coefficient applied if it's set.
+        * uda_values: UDA name to a dictionary of value to coefficient.'''
+        if self._urgency_coefficients is None:
+            coefficients = {
+                key[len('urgency.'):]: self._coefficient(key)
+                for key in URGENCY_DEFAULTS
+            }
+            tags = {}
+            projects = []
+            udas = {}
+            uda_values = {}
+            for key in self.config:
+                if not key.endswith('.coefficient'):
+                    continue
+                if key.startswith('urgency.user.tag.'):
+                    tag = key[len('urgency.user.tag.'):-len('.coefficient')]
+                    tags[tag] = self._coefficient(key)
+                elif key.startswith('urgency.user.project.'):
+                    project = key[
+                        len('urgency.user.project.'):-len('.coefficient')
+                    ]
+                    projects.append((project, self._coefficient(key)))
+                elif key.startswith('urgency.uda.'):
+                    uda = key[len('urgency.uda.'):-len('.coefficient')]
+                    if '.' in uda:
+                        uda, value = uda.split('.', 1)
+                        uda_values.setdefault(uda, {})[value] = \
+                            self._coefficient(key)
+                    else:
+                        udas[uda] = self._coefficient(key)
+            self._urgency_coefficients = {
+                'coefficients': coefficients,
+                'tags': tags,
+                'projects': projects,
+                'udas': udas,
+                'uda_values': uda_values,
+            }
+        return self._urgency_coefficients
+
+    @profiled('read data file')
+    def _read(self, file_name):
+        'Parse a data file into a list of raw dictionaries'
+        path = os.path.join(self.task_data_path, file_name)
+        try:
+            with open(path, 'r') as f:
+                return [parse_line(line) for line in f if line.strip() != '']
+        except FileNotFoundError:
+            raise UnrecognisedTaskData('Data file {} not found'.format(path))
+
+    @property
+    def pending_loaded(self):
+        'True if pending.data has already been parsed'
+        return self._pending is not None
+
+    @property
+    def pending(self):
+        'List of tasks of pending.data'
+        if self._pending is None:
+            raw_tasks = self._read('pending.data')
+            self._pending = self._build_tasks(raw_tasks, assign_ids=True)
+        return self._pending
+
+    @property
+    def completed(self):
+        'List of tasks of completed.data'
+        if self._completed is None:
+            raw_tasks = self._read('completed.data')
+            self._completed = self._build_tasks(raw_tasks)
+        return self._completed
+
+    def _has_id(self, raw_task):
+        '''Return if Taskwarrior gives an id to a task of pending.data. Like
+        its loader, the completed and deleted tasks only get one if the
+        garbage collection is off, otherwise it moves them out first'''
+        if raw_task.get('status') not in ['completed', 'deleted']:
+            return True
+        return str(self.config.get('gc', 'on')).lower() in FALSE_VALUES
+
+    @profiled('build tasks')
+    def _build_tasks(self, raw_tasks, assign_ids=False):
+        '''Convert the raw dictionaries into LocalTasks.
+
+        The urgency of the tasks of pending.data is computed right away, the
+        one of the rest of tasks only if it's used'''
+        now = datetime.datetime.now().timestamp()
+        blocking = set()
+        pending_uuids = set()
+        if assign_ids:
+            for raw_task in raw_tasks:
+                if raw_task.get('status') in ['pending', 'waiting']:
+                    pending_uuids.add(raw_task.get('uuid'))
+            for raw_task in raw_tasks:
+                if raw_task.get('status') in ['pending', 'waiting']:
+                    blocking.update(
+                        uuid for uuid in
+                        raw_task.get('depends', '').split(',')
+                        if uuid in pending_uuids
+                    )
+
+        tasks = []
+        next_id = 1
+        for raw_task in raw_tasks:
+            task_id = 0
+            if assign_ids and self._has_id(raw_task):
+                task_id = next_id
+                next_id += 1
+            data = self._deserialize(raw_task)
+            data['id'] = task_id
+            urgency = functools.partial(
+                self._urgency,
+                raw_task,
+                blocked=bool(data['depends'] & pending_uuids),
+                blocking=raw_task.get('uuid') in blocking,
+                now=now,
+            )
+            if assign_ids:
+                data['urgency'] = urgency()
+                tasks.append(LocalTask(data))
+            else:
+                tasks.append(LocalTask(data, lazy={'urgency': urgency}))
+        return tasks
+
+    def _deserialize(self, raw_task):
+        'Convert the raw string values to the types tasklib uses'
+        uda_types = self.uda_types
+        data = {}
+        annotations = []
+        for key, value in raw_task.items():
+            if key.startswith('annotation_'):
+                annotations.append({
+                    'entry': epoch_to_datetime(key[len('annotation_'):]),
+                    'description': value,
+                })
+            elif key in DATE_ATTRIBUTES or uda_types.get(key) == 'date':
+                data[key] = epoch_to_datetime(value)
+            elif key == 'tags':
+                data[key] = set(value.split(',')) if value else set()
+            elif key == 'depends':
+                continue
+            elif uda_types.get(key) == 'numeric':
+                data[key] = self._to_number(value)
+            else:
+                data[key] = value
+        data['depends'] = set(
+            uuid for uuid in raw_task.get('depends', '').split(',') if uuid
+        )
+        data['annotations'] = sorted(annotations, key=lambda k: k['entry'])
+        return data
+
+    def _to_number(self, value):
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError:
+                return None
+
+    def _coefficient(self, key):
+        try:
+            return float(self.config.get(key, 0))
+        except ValueError:
+            return 0.
+
+    def _urgency(self, raw_task, blocked=False, blocking=False, now=None):
+        '''Compute the urgency of a task the same way Taskwarrior does for
+        the coefficients defined in the taskrc'''
+        if now is None:
+            now = datetime.datetime.now().timestamp()
+        tables = self.urgency_coefficients
+        coefficients = tables['coefficients']
+        urgency = 0.
+
+        if raw_task.get('project'):
+            urgency += coefficients['project.coefficient']
+        if raw_task.get('start'):
+            urgency += coefficients['active.coefficient']
+        if raw_task.get('status') == 'waiting':
+            urgency += coefficients['waiting.coefficient']
+        if blocked:
+            urgency += coefficients['blocked.coefficient']
+        if blocking:
+            urgency += coefficients['blocking.coefficient']
+        if raw_task.get('scheduled') and int(raw_task['scheduled']) < now:
+            urgency += coefficients['scheduled.coefficient']
+
+        tags = [tag for tag in raw_task.get('tags', '').split(',') if tag]
+        urgency += coefficients['tags.coefficient'] * \
+            self._count_factor(len(tags))
+        annotations = [key for key in raw_task if key.startswith('annotation_')]
+        urgency += coefficients['annotations.coefficient'] * \
+            self._count_factor(len(annotations))
+
+        if raw_task.get('due'):
+            days_overdue = (now - int(raw_task['due'])) / 86400
+            if days_overdue >= 7.:
+                due_factor = 1.
+            elif days_overdue >= -14.:
+                due_factor = ((days_overdue + 14.) * 0.8 / 21.) + 0.2
+            else:
+                due_factor = 0.2
+            urgency += coefficients['due.coefficient'] * due_factor
+
+        if raw_task.get('entry'):
+            age_max = coefficients['age.max']
+            age = (now - int(raw_task['entry'])) / 86400
+            if age_max == 0 or age > age_max:
+                age_factor = 1.
+            else:
+                age_factor = age / age_max
+            urgency += coefficients['age.coefficient'] * age_factor
+
+        for tag in tags:
+            urgency += tables['tags'].get(tag, 0.)
+        if tables['projects']:
+            task_project = raw_task.get('project', '')
+            for project, coefficient in tables['projects']:
+                if task_project.startswith(project):
+                    urgency += coefficient
+        for uda, coefficient in tables['udas'].items():
+            if raw_task.get(uda):
+                urgency += coefficient
+        for uda, values in tables['uda_values'].items():
+            value = raw_task.get(uda)
+            if value is not None:
+                urgency += values.get(value, 0.)
+        return urgency
+
+    def _count_factor(self, count):
+        'Factor Taskwarrior applies to the number of tags and annotations'
+        if count == 0:
+            return 0.
+        elif count == 1:
+            return 0.8
+        elif count == 2:
+            return 0.9
+        return 1.
+
+    def filter(self, **filters):
+        '''Return the tasks that match the filters. The supported filters are
+        the ones taskban uses:
+
+        * status: pending, waiting, completed or deleted
+        * project: the project or any of its subprojects
+        * modified__after: datetime
+        * Any other attribute, that must be equal to the value'''
+
+        status = filters.pop('status', None)
+        if status in ['pending', 'waiting']:
+            tasks = self.pending
+        elif status in ['completed', 'deleted']:
+            tasks = self.completed + self.pending
+        else:
+            tasks = self.pending + self.completed
+
+        project = filters.pop('project', None)
+        modified_after = filters.pop('modified__after', None)
+        if modified_after is not None:
+            modified_after = modified_after.timestamp()
+
+        selected_tasks = []
+        for task in tasks:
+            if status is not None and task['status'] != status:
+                continue
+            if project is not None and task['project'] != project and \
+                    not (task['project'] or '').startswith(project + '.'):
+                continue
+            if modified_after is not None and (
+                task['modified'] is None or
+                task['modified'].timestamp() <= modified_after
+            ):
+                continue
+            if any(task[key] != value for key, value in filters.items()):
+                continue
+            selected_tasks.append(task)
+        return selected_tasks
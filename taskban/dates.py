@@ -0,0 +1,131 @@
+import re
+import time
+import datetime
+
+DURATION_UNITS = {
+    'seconds': ['s', 'sec', 'secs', 'second', 'seconds'],
+    'minutes': ['min', 'mins', 'minute', 'minutes'],
+    'hours': ['h', 'hr', 'hrs', 'hour', 'hours'],
+    'days': ['d', 'day', 'days'],
+    'weeks': ['w', 'wk', 'wks', 'week', 'weeks'],
+    'months': ['mo', 'mos', 'mth', 'mths', 'month', 'months'],
+    'quarters': ['q', 'qtr', 'qtrs', 'quarter', 'quarters'],
+    'years': ['y', 'yr', 'yrs', 'year', 'years'],
+}
+
+# Taskwarrior uses fixed lengths for the calendar units of the durations
+DURATION_SECONDS = {
+    'seconds': 1,
+    'minutes': 60,
+    'hours': 3600,
+    'days': 86400,
+    'weeks': 7 * 86400,
+    'months': 30 * 86400,
+    'quarters': 91 * 86400,
+    'years': 365 * 86400,
+}
+
+_duration_regexp = re.compile(r'^([0-9]+(?:\.[0-9]+)?)\s*([a-z]+)$')
+_date_regexp = re.compile(
+    r'^([0-9]{4})-([0-9]{1,2})-([0-9]{1,2})'
+    r'(?:[T ]([0-9]{1,2}):([0-9]{2})(?::([0-9]{2}))?)?$'
+)
+_expression_regexp = re.compile(r'^(.+?)\s+([+-])\s+(.+)$')
+
+
+def local_timezone(timestamp):
+    'Return the local timezone at the epoch timestamp, as a fixed offset'
+    return datetime.timezone(
+        datetime.timedelta(seconds=time.localtime(timestamp).tm_gmtoff),
+    )
+
+
+def local_datetime(*date_parts):
+    '''Return the local timezone aware datetime of the year, month, day and
+    optional time parts. Python 3.5 can't call astimezone() on naive
+    datetimes, so the offset is taken from the local time'''
+    date = datetime.datetime(*date_parts)
+    return date.replace(
+        tzinfo=local_timezone(time.mktime(date.timetuple())),
+    )
+
+
+def local_now():
+    'Return the current local timezone aware datetime, without microseconds'
+    now = int(time.time())
+    return datetime.datetime.fromtimestamp(now, tz=local_timezone(now))
+
+
+def parse_duration(string):
+    '''Convert a Taskwarrior duration like `7d` or `2 weeks` to a
+    timedelta.
+
+    Raise ValueError if the string isn't a supported duration'''
+    match = _duration_regexp.match(string.strip().lower())
+    if match is None:
+        raise ValueError('Unsupported duration {}'.format(string))
+    for unit, aliases in DURATION_UNITS.items():
+        if match.group(2) in aliases:
+            return datetime.timedelta(
+                seconds=float(match.group(1)) * DURATION_SECONDS[unit],
+            )
+    raise ValueError('Unsupported duration unit {}'.format(string))
+
+
+def parse_date(string, now=None):
+    '''Convert a Taskwarrior date like `now`, `today` or `1984-01-01` to a
+    local timezone aware datetime.
+
+    Raise ValueError if the string isn't a supported date'''
+    if now is None:
+        now = local_now()
+    string = string.strip().lower()
+
+    if string == 'now':
+        return now
+    elif string in ['today', 'sod']:
+        return _midnight(now)
+    elif string == 'yesterday':
+        return _midnight(now - datetime.timedelta(days=1))
+    elif string == 'tomorrow':
+        return _midnight(now + datetime.timedelta(days=1))
+
+    match = _date_regexp.match(string)
+    if match is None:
+        raise ValueError('Unsupported date {}'.format(string))
+    return local_datetime(
+        *[int(value) for value in match.groups() if value is not None]
+    )
+
+
+def _midnight(date):
+    return local_datetime(date.year, date.month, date.day)
+
+
+def convert_datetime_string(string, now=None):
+    '''Evaluate in process the Taskwarrior date expressions taskban accepts,
+    a date, a date plus or minus a duration, or a duration, that is
+    subtracted from now. For example:
+
+    * now
+    * now - 7d
+    * 1984-01-01
+    * 1w
+
+    Raise ValueError if the expression isn't supported, so it can be sent to
+    `task calc` instead'''
+    if now is None:
+        now = local_now()
+
+    match = _expression_regexp.match(string.strip())
+    if match is not None:
+        date = parse_date(match.group(1), now)
+        duration = parse_duration(match.group(3))
+        if match.group(2) == '+':
+            return date + duration
+        return date - duration
+
+    try:
+        return parse_date(string, now)
+    except ValueError:
+        return now - parse_duration(string)
@@ -0,0 +1,76 @@
+import csv
+import json
+
+RECORD_FIELDS = [
+    'type',
+    'state',
+    'project',
+    'id',
+    'ov',
+    'est',
+    'active',
+    'progress',
+    'description',
+]
+# The team report records also have the person of the task
+TEAM_RECORD_FIELDS = [
+    'type',
+    'person',
+    'state',
+    'project',
+    'id',
+    'ov',
+    'est',
+    'active',
+    'progress',
+    'description',
+]
+
+
+def write_json(records, out):
+    'Write the records as a JSON list, one record per line'
+    out.write('[')
+    separator = '\n'
+    for record in records:
+        out.write(separator)
+        out.write(json.dumps(record))
+        separator = ',\n'
+    out.write('\n]\n')
+
+
+def write_jsonl(records, out):
+    'Write each record as a JSON object in its own line'
+    for record in records:
+        out.write(json.dumps(record))
+        out.write('\n')
+
+
+def write_csv(records, out, fields=RECORD_FIELDS):
+    'Write the records as CSV with a header row, None is an empty field'
+    writer = csv.DictWriter(out, fieldnames=fields)
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+
+
+EXPORT_FORMATS = {
+    'json': write_json,
+    'jsonl': write_jsonl,
+    'csv': write_csv,
+}
+
+
+def write_records(output_format, records, out, fields=RECORD_FIELDS):
+    '''Write the records in the output format, consuming them one by one so
+    the whole report is never held in memory. The fields are the columns of
+    the csv format.
+
+    Raise ValueError if the format is not one of EXPORT_FORMATS'''
+    try:
+        writer = EXPORT_FORMATS[output_format]
+    except KeyError:
+        raise ValueError('Unknown output format {}'.format(output_format))
+    if writer is write_csv:
+        writer(records, out, fields)
+    else:
+        writer(records, out)
@@ -0,0 +1,354 @@
+import os
+import json
+import bisect
+import hashlib
+import logging
+import datetime
+from taskban.profiler import profiled
+from taskban.data import parse_line, UnrecognisedTaskData
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+log = logging.getLogger('Main')
+
+CHECKPOINT_VERSION = 1
+
+
+class History():
+    """Active time history of the tasks, extracted from undo.data.
+
+    As undo.data only grows, the parsed state is saved in a checkpoint file
+    with the byte offset and a fingerprint of the last parsed transaction.
+    The next load only parses the bytes appended since then, the whole file
+    is parsed again only if it has been truncated or rewritten. A History
+    that is loaded again, like the one kept by the server, checks its own
+    state instead of reading the checkpoint, and updates its index with the
+    tasks of the new transactions.
+
+    self.intervals is a dictionary of task uuid to the list of [start, stop]
+    epochs the task has been active. An interval that hasn't been stopped
+    yet has stop None"""
+
+    def __init__(self, undo_path, checkpoint_path=None):
+        self.undo_path = os.path.expanduser(undo_path)
+        self.checkpoint_path = checkpoint_path
+        if checkpoint_path is not None:
+            self.checkpoint_path = os.path.expanduser(checkpoint_path)
+        self._reset()
+
+    def _reset(self):
+        self.intervals = {}
+        self._index = None
+        self.offset = 0
+        self.fingerprint = None
+        self.fingerprint_length = 0
+        # Tasks of the transactions parsed by the last load
+        self._updated = set()
+
+    @profiled('parse undo.data')
+    def load(self):
+        'Load the history, parsing only the unparsed part of undo.data'
+        try:
+            undo_file = open(self.undo_path, 'rb')
+        except FileNotFoundError:
+            log.debug('Undo file {} not found'.format(self.undo_path))
+            self._reset()
+            return self
+
+        with undo_file:
+            if self.fingerprint is not None:
+                # Loaded before, keep the state if undo.data only grew
+                if not self._matches(
+                    undo_file,
+                    self.offset,
+                    self.fingerprint_length,
+                    self.fingerprint,
+                ):
+                    self._reset()
+            elif not self._load_checkpoint(undo_file):
+                self._reset()
+            offset = self.offset
+            self._updated = set()
+            undo_file.seek(self.offset)
+            self._parse(undo_file)
+
+        if self.offset != offset:
+            self._save_checkpoint()
+        if self._index is not None:
+            self._index.update(self.intervals, self._updated)
+        return self
+
+    @property
+    def index(self):
+        '''Index of the loaded intervals, built on first access. If NumPy is
+        installed it's a VectorActiveTimeIndex, otherwise an ActiveTimeIndex'''
+        if self._index is None:
+            if numpy is None:
+                self._index = ActiveTimeIndex(self.intervals)
+            else:
+                self._index = VectorActiveTimeIndex(self.intervals)
+        return self._index
+
+    def _load_checkpoint(self, undo_file):
+        '''Load the checkpoint, return False if it doesn't exist or it doesn't
+        match the current undo.data'''
+        if self.checkpoint_path is None:
+            return False
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return False
+        except ValueError:
+            log.warning(
+                'Corrupted history checkpoint {}, rebuilding it'.format(
+                    self.checkpoint_path,
+                ),
+            )
+            return False
+
+        if checkpoint.get('version') != CHECKPOINT_VERSION or \
+                checkpoint.get('undo_path') != self.undo_path:
+            return False
+
+        offset = checkpoint['offset']
+        length = checkpoint['fingerprint_length']
+        if not self._matches(
+            undo_file,
+            offset,
+            length,
+            checkpoint['fingerprint'],
+        ):
+            return False
+
+        self.intervals = checkpoint['intervals']
+        self.offset = offset
+        self.fingerprint = checkpoint['fingerprint']
+        self.fingerprint_length = length
+        return True
+
+    def _matches(self, undo_file, offset, length, fingerprint):
+        '''Return True if the transaction of length bytes that ends at offset
+        in undo.data still has the fingerprint'''
+        if os.fstat(undo_file.fileno()).st_size < offset:
+            log.debug('Undo file truncated, rebuilding the history')
+            return False
+        undo_file.seek(offset - length)
+        if self._fingerprint(undo_file.read(length)) != fingerprint:
+            log.debug('Undo file rewritten, rebuilding the history')
+            return False
+        return True
+
+    def _save_checkpoint(self):
+        if self.checkpoint_path is None:
+            return
+        checkpoint = {
+            'version': CHECKPOINT_VERSION,
+            'undo_path': self.undo_path,
+            'offset': self.offset,
+            'fingerprint': self.fingerprint,
+            'fingerprint_length': self.fingerprint_length,
+            'intervals': self.intervals,
+        }
+        os.makedirs(os.path.dirname(self.checkpoint_path), exist_ok=True)
+        tmp_path = '{}.tmp'.format(self.checkpoint_path)
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _fingerprint(self, transaction):
+        return hashlib.sha1(transaction).hexdigest()
+
+    def _parse(self, undo_file):
+        '''Parse the complete transactions from the current position of the
+        file, a trailing incomplete transaction is left for the next load'''
+        transaction = []
+        for line in undo_file:
+            transaction.append(line)
+            if line.rstrip(b'\n') == b'---':
+                self._parse_transaction(transaction)
+                raw_transaction = b''.join(transaction)
+                self.offset += len(raw_transaction)
+                self.fingerprint = self._fingerprint(raw_transaction)
+                self.fingerprint_length = len(raw_transaction)
+                transaction = []
+
+    def _parse_transaction(self, lines):
+        transaction_time = None
+        old = {}
+        for line in lines:
+            line = line.decode('utf-8').rstrip('\n')
+            if line.startswith('time '):
+                transaction_time = int(line[5:])
+            elif line.startswith('old '):
+                old = parse_line(line[4:])
+            elif line.startswith('new '):
+                new = parse_line(line[4:])
+                self._update_intervals(new, old, transaction_time)
+            elif line != '---':
+                raise UnrecognisedTaskData(
+                    'Unknown undo line {}'.format(line[:80]),
+                )
+
+    def _update_intervals(self, new, old, transaction_time):
+        'Open or close the active interval of the task of the transaction'
+        self._updated.add(new['uuid'])
+        if new.get('start') and new.get('start') != old.get('start'):
+            intervals = self.intervals.setdefault(new['uuid'], [])
+            if intervals and intervals[-1][1] is None:
+                intervals[-1][1] = transaction_time
+            intervals.append([int(new['start']), None])
+        elif old.get('start') and not new.get('start'):
+            intervals = self.intervals.get(new['uuid'], [])
+            if intervals and intervals[-1][1] is None:
+                intervals[-1][1] = transaction_time
+
+    def active_time(self, uuid, start=None, end=None):
+        '''Return the seconds the task has been active between the start and
+        end datetimes, if they are None the window is unbounded'''
+        return self.index.active_time(uuid, start, end)
+
+    def active_times(self, start=None, end=None):
+        '''Return a dictionary with the seconds each task has been active
+        between the start and end datetimes'''
+        return self.index.active_times(start, end)
+
+
+def _to_epoch(date):
+    'Convert a datetime to the epoch in seconds used by Taskwarrior'
+    if date is None:
+        return None
+    return int(date.timestamp())
+
+
+class ActiveTimeIndex():
+    """Index of the active intervals of each task.
+
+    For each task uuid it stores the sorted arrays of interval starts and
+    stops and the prefix sums of their durations, so the active time inside
+    any [start, end) window is found with two binary searches. Intervals
+    still open are closed at the moment the index is built or updated"""
+
+    def __init__(self, intervals, now=None):
+        self.tasks = {}
+        # Tasks with an interval that hasn't been stopped yet
+        self.open_uuids = set()
+        self.update(intervals, intervals.keys(), now)
+
+    def update(self, intervals, uuids, now=None):
+        '''Index again the intervals of the uuids and of the tasks with open
+        intervals, which are closed at now'''
+        if now is None:
+            now = _to_epoch(datetime.datetime.now())
+        self.now = now
+        for uuid in set(uuids) | self.open_uuids:
+            self._index_task(uuid, intervals.get(uuid, []))
+
+    def _index_task(self, uuid, task_intervals):
+        starts = []
+        stops = []
+        durations = [0]
+        self.open_uuids.discard(uuid)
+        for interval_start, interval_stop in sorted(
+            task_intervals,
+            key=lambda k: k[0],
+        ):
+            if interval_stop is None:
+                interval_stop = self.now
+                self.open_uuids.add(uuid)
+            if starts and interval_start < stops[-1]:
+                # Overlapping intervals are merged to keep stops sorted
+                interval_start = stops[-1]
+            if interval_stop <= interval_start:
+                continue
+            starts.append(interval_start)
+            stops.append(interval_stop)
+            durations.append(
+                durations[-1] + interval_stop - interval_start,
+            )
+        if starts:
+            self.tasks[uuid] = (starts, stops, durations)
+        else:
+            self.tasks.pop(uuid, None)
+
+    def active_times(self, start=None, end=None):
+        '''Return a dictionary with the seconds each task has been active
+        between the start and end datetimes'''
+        return {
+            uuid: self.active_time(uuid, start, end)
+            for uuid in self.tasks
+        }
+
+    def active_time(self, uuid, start=None, end=None):
+        '''Return the seconds the task has been active between the start and
+        end datetimes, if they are None the window is unbounded'''
+        try:
+            starts, stops, durations = self.tasks[uuid]
+        except KeyError:
+            return 0
+
+        start = _to_epoch(start)
+        end = _to_epoch(end)
+        if start is None:
+            first = 0
+        else:
+            first = bisect.bisect_right(stops, start)
+        if end is None:
+            last = len(starts)
+        else:
+            last = bisect.bisect_left(starts, end)
+        if first >= last:
+            return 0
+
+        active_time = durations[last] - durations[first]
+        if start is not None and starts[first] < start:
+            active_time -= start - starts[first]
+        if end is not None and stops[last - 1] > end:
+            active_time -= stops[last - 1] - end
+        return active_time
+
+
+class VectorActiveTimeIndex(ActiveTimeIndex):
+    """ActiveTimeIndex that also stores all the intervals in flat NumPy int64
+    arrays with a task id column, so the active time of every task inside a
+    window is computed in one vectorized operation.
+
+    It requires NumPy, History.index falls back to ActiveTimeIndex if it's
+    not installed"""
+
+    def update(self, intervals, uuids, now=None):
+        '''Index again the intervals of the uuids and of the tasks with open
+        intervals, and rebuild the flat arrays'''
+        super(VectorActiveTimeIndex, self).update(intervals, uuids, now)
+        self.uuids = list(self.tasks.keys())
+        task_ids = []
+        starts = []
+        stops = []
+        for task_id, uuid in enumerate(self.uuids):
+            task_starts, task_stops, _ = self.tasks[uuid]
+            task_ids.extend([task_id] * len(task_starts))
+            starts.extend(task_starts)
+            stops.extend(task_stops)
+        self.task_ids = numpy.array(task_ids, dtype=numpy.int64)
+        self.starts = numpy.array(starts, dtype=numpy.int64)
+        self.stops = numpy.array(stops, dtype=numpy.int64)
+
+    def active_times(self, start=None, end=None):
+        '''Return a dictionary with the seconds each task has been active
+        between the start and end datetimes'''
+        starts = self.starts
+        stops = self.stops
+        if start is not None:
+            starts = numpy.maximum(starts, _to_epoch(start))
+        if end is not None:
+            stops = numpy.minimum(stops, _to_epoch(end))
+        durations = numpy.maximum(stops - starts, 0)
+        totals = numpy.bincount(
+            self.task_ids,
+            weights=durations,
+            minlength=len(self.uuids),
+        ).astype(numpy.int64)
+        return dict(zip(self.uuids, totals.tolist()))
@@ -0,0 +1,209 @@
+import sys
+import json
+import time
+import resource
+import functools
+import contextlib
+import collections
+from taskban.spawns import log as spawn_log
+
+# Profiler of the running command, None when --profile isn't used
+_profiler = None
+
+
+class _NullSpan():
+    'Context manager that does nothing, returned by span() without profiler'
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_null_span = _NullSpan()
+
+
+def span(name):
+    '''Context manager that times the block as the phase name if a profiler
+    is running, and does nothing otherwise'''
+    if _profiler is None:
+        return _null_span
+    return _profiler.span(name)
+
+
+def profiled(name):
+    '''Decorator to time each call of the function as the phase name if a
+    profiler is running'''
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return function(*args, **kwargs)
+            with _profiler.span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Profiler():
+    """Collect the wall time, CPU time, number of calls and memory of the
+    phases of a command.
+
+    The phases are nested, each one is stored under the path of the phases
+    that were running when it started, and the values of every call of the
+    same path are added up.
+
+    The memory is measured as the growth of the peak RSS of the process
+    during the phase, which has no cost. If trace_memory is True the memory
+    allocated during the phase and still held when it ends is also measured
+    with tracemalloc, which slows down the command a lot while it is traced.
+
+    The processes started during each phase are counted, and the external
+    commands run while the profiler is active are taken from the spawn log.
+
+    It's used as a context manager, the span() and profiled() functions of
+    this module only record the phases while it's active"""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.phases = collections.OrderedDict()
+        self._stack = []
+        # ru_maxrss is in bytes in macOS and in KiB in Linux
+        self._rss_unit = 1 if sys.platform == 'darwin' else 1024
+
+    def __enter__(self):
+        global _profiler
+        if self.trace_memory:
+            import tracemalloc
+            self._tracemalloc = tracemalloc
+            tracemalloc.start()
+        _profiler = self
+        spawn_log.start()
+        self.commands = []
+        return self
+
+    def __exit__(self, *exc_info):
+        global _profiler
+        _profiler = None
+        spawn_log.stop()
+        self.commands = list(spawn_log.records)
+        if self.trace_memory:
+            self._tracemalloc.stop()
+
+    def _peak_rss(self):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * \
+            self._rss_unit
+
+    def _memory(self):
+        if self.trace_memory:
+            return self._tracemalloc.get_traced_memory()[0]
+        return 0
+
+    @contextlib.contextmanager
+    def span(self, name):
+        self._stack.append(name)
+        path = tuple(self._stack)
+        # Register the phase on entry so the phases are in the order they
+        # started, with the parents before their children
+        phase = self.phases.setdefault(path, [0, 0.0, 0.0, 0, 0, 0])
+        processes = spawn_log.processes
+        peak_rss = self._peak_rss()
+        memory = self._memory()
+        cpu_time = time.process_time()
+        wall_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            phase[0] += 1
+            phase[1] += time.perf_counter() - wall_time
+            phase[2] += time.process_time() - cpu_time
+            phase[3] += self._peak_rss() - peak_rss
+            phase[4] += self._memory() - memory
+            phase[5] += spawn_log.processes - processes
+            self._stack.pop()
+
+    def results(self):
+        '''Return a list with a dictionary per phase, in the order they
+        started'''
+        return [
+            {
+                'phase': path[-1],
+                'path': list(path),
+                'calls': calls,
+                'wall_seconds': wall_time,
+                'cpu_seconds': cpu_time,
+                'peak_rss_growth_bytes': peak_rss,
+                'allocated_bytes': memory if self.trace_memory else None,
+                'processes': processes,
+            }
+            for path, (calls, wall_time, cpu_time, peak_rss, memory, processes)
+            in self.phases.items()
+        ]
+
+    def write_json(self, out):
+        'Write the phases, the external commands and their totals as JSON'
+        json.dump(
+            {
+                'phases': self.results(),
+                'commands': self.commands,
+                'spawn_totals': spawn_log.totals(self.commands),
+            },
+            out,
+            indent=2,
+        )
+        out.write('\n')
+
+    def write_table(self, out=sys.stderr):
+        'Write a table of the phases, indented under their parents'
+        from taskban.tables import Table
+
+        headers = ['Phase', 'Calls', 'Wall ms', 'CPU ms', 'Peak RSS +KiB',
+                   'Spawns']
+        if self.trace_memory:
+            headers.append('Alloc KiB')
+        table = Table(headers)
+        for result in self.results():
+            indent = '. ' * (len(result['path']) - 1)
+            row = [
+                '{}{}'.format(indent, result['phase']),
+                result['calls'],
+                '{:.1f}'.format(result['wall_seconds'] * 1000),
+                '{:.1f}'.format(result['cpu_seconds'] * 1000),
+                '{:.1f}'.format(result['peak_rss_growth_bytes'] / 1024),
+                result['processes'],
+            ]
+            if self.trace_memory:
+                row.append('{:.1f}'.format(result['allocated_bytes'] / 1024))
+            table.add_row(row)
+        table.write(out)
+        out.write('\n')
+        self.write_commands_table(out)
+
+    def write_commands_table(self, out=sys.stderr):
+        '''Write a table of the external commands and their totals, the
+        commands started out of the known call sites have no duration'''
+        from taskban.tables import Table
+
+        totals = spawn_log.totals(self.commands)
+        out.write('\n{processes} processes started by {commands} external '
+                  'commands in {milliseconds:.1f} ms\n'.format(
+                      milliseconds=totals['seconds'] * 1000,
+                      **totals
+                  ))
+        if len(self.commands) == 0:
+            return
+        out.write('\n')
+        table = Table(['Command', 'Processes', 'ms', 'Output KiB'])
+        for command in self.commands:
+            line = ' '.join([command['command']] + command['arguments'])
+            table.add_row([
+                line if len(line) <= 60 else line[:57] + '...',
+                command['processes'],
+                '' if command['seconds'] is None else
+                '{:.1f}'.format(command['seconds'] * 1000),
+                '' if command['output_bytes'] is None else
+                '{:.1f}'.format(command['output_bytes'] / 1024),
+            ])
+        table.write(out)
+        out.write('\n')
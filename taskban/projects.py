@@ -0,0 +1,280 @@
+import os
+import json
+import logging
+from taskban.data import files_fingerprint
+
+log = logging.getLogger('Main')
+
+PROJECT_CACHE_VERSION = 2
+
+
+def projects_from_names(names):
+    '''Build the nested dictionary of projects, in the tasklib format, from
+    the full names of the projects. The parents of each project are added
+    even if they don't have tasks'''
+    projects = {}
+    for name in names:
+        node = projects
+        for project in name.split('.'):
+            node = node.setdefault(project, {})
+    return projects
+
+
+def project_stats(tasks):
+    '''Return a dictionary of project name to the number of tasks of the
+    project and the sum of their est and ov, computed in one pass'''
+    stats = {}
+    for task in tasks:
+        if task['project'] is None:
+            continue
+        task_stats = stats.setdefault(task['project'], [0, 0, 0])
+        task_stats[0] += 1
+        task_stats[1] += task['est'] or 0
+        task_stats[2] += task['ov'] or 0
+    return stats
+
+
+class ProjectTree():
+    """Index of the project hierarchy, of any depth.
+
+    The projects are stored in depth first order, sorted by name at each
+    level, in self.names. self.index maps each project name to its position
+    in that list, and the parents, first_children, next_siblings and
+    previous_siblings lists hold the position of the related project, or None
+    if it doesn't exist.
+
+    It's built once from the nested dictionary of projects of tasklib, for
+    example {'my-first-project': {'my-first-subproject': {}}}, after that
+    every navigation is a constant time lookup.
+
+    If the stats returned by project_stats() are given, self.stats holds the
+    [count, est, ov] of the tasks of each project and self.subtree_stats the
+    same values rolled up with all the subprojects. The navigation methods
+    can then skip the projects without tasks in their subtree"""
+
+    def __init__(self, projects, stats=None):
+        self.names = []
+        self.index = {}
+        self.parents = []
+        self.first_children = []
+        self.next_siblings = []
+        self.previous_siblings = []
+        self.ranks = []
+        self.children = {None: []}
+        self._add_projects(projects, None)
+        self.stats = None
+        self.subtree_stats = None
+        if stats is not None:
+            self._add_stats(stats)
+
+    def _add_projects(self, projects, parent):
+        previous = None
+        for project in sorted(projects):
+            position = len(self.names)
+            if parent is None:
+                name = project
+            else:
+                name = '{}.{}'.format(self.names[parent], project)
+
+            self.names.append(name)
+            self.index[name] = position
+            self.parents.append(parent)
+            self.first_children.append(None)
+            self.next_siblings.append(None)
+            self.previous_siblings.append(previous)
+            self.ranks.append(len(self.children[parent]))
+            self.children[parent].append(position)
+            self.children[position] = []
+            if previous is None:
+                if parent is not None:
+                    self.first_children[parent] = position
+            else:
+                self.next_siblings[previous] = position
+            previous = position
+
+            self._add_projects(projects[project], position)
+
+    def _add_stats(self, stats):
+        self.stats = [list(stats.get(name, [0, 0, 0])) for name in self.names]
+        self.subtree_stats = [list(project) for project in self.stats]
+        # Children are after their parent in depth first order
+        for position in reversed(range(len(self.names))):
+            parent = self.parents[position]
+            if parent is not None:
+                for stat in range(3):
+                    self.subtree_stats[parent][stat] += \
+                        self.subtree_stats[position][stat]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def _name(self, position):
+        'Return the name of the project, raise IndexError if it is None'
+        if position is None:
+            raise IndexError
+        return self.names[position]
+
+    def _with_tasks(self, position, links):
+        '''Follow the sibling links from the position until a project with
+        tasks in its subtree is found'''
+        if self.subtree_stats is None:
+            return position
+        while position is not None and self.subtree_stats[position][0] == 0:
+            position = links[position]
+        return position
+
+    def first(self, skip_empty=False):
+        '''Return the first root project. If skip_empty is True the projects
+        without tasks in their subtree are skipped.
+
+        Raise IndexError if it doesn't exist'''
+        position = 0 if len(self.names) > 0 else None
+        if skip_empty:
+            position = self._with_tasks(position, self.next_siblings)
+        return self._name(position)
+
+    def child(self, name, direction=1, skip_empty=False):
+        '''Return the first child of the project if direction is 1, or the
+        first child of the previous sibling if direction is -1. If skip_empty
+        is True the projects without tasks in their subtree are skipped.
+
+        Raise IndexError if it doesn't exist'''
+        position = self.index[name]
+        if direction == -1:
+            position = self.previous_siblings[position]
+            if skip_empty:
+                position = self._with_tasks(position, self.previous_siblings)
+            if position is None:
+                raise IndexError
+        position = self.first_children[position]
+        if skip_empty:
+            position = self._with_tasks(position, self.next_siblings)
+        return self._name(position)
+
+    def sibling(self, name, direction=1, skip_empty=False):
+        '''Return the next sibling of the project if direction is 1 or the
+        previous one if direction is -1. If skip_empty is True the projects
+        without tasks in their subtree are skipped.
+
+        Raise IndexError if it doesn't exist'''
+        links = self.next_siblings if direction == 1 else \
+            self.previous_siblings
+        position = links[self.index[name]]
+        if skip_empty:
+            position = self._with_tasks(position, links)
+        return self._name(position)
+
+    def parent(self, name, direction=1, skip_empty=False):
+        '''Return the parent of the project if direction is -1, or the next
+        project after the parent if direction is 1, that is the next sibling
+        of the closest ancestor that has one. If skip_empty is True the
+        projects without tasks in their subtree are skipped.
+
+        Raise IndexError if it doesn't exist'''
+        position = self.index[name]
+        if self.parents[position] is None:
+            raise IndexError
+        if direction == -1:
+            return self.names[self.parents[position]]
+
+        position = self.parents[position]
+        while position is not None:
+            sibling = self.next_siblings[position]
+            if skip_empty:
+                sibling = self._with_tasks(sibling, self.next_siblings)
+            if sibling is not None:
+                return self.names[sibling]
+            position = self.parents[position]
+        raise IndexError
+
+    def position(self, name):
+        '''Return the position of the project in the tree as a list of the
+        index of the top project followed by the index plus one of each
+        subproject, padded with zeros to three levels. For example:
+
+        my-first-project                  [0, 0, 0]
+            my-first-subproject           [0, 1, 0]
+                my-first-subsubproject    [0, 1, 1]
+            my-second-subproject          [0, 2, 0]
+        my-second-project                 [1, 0, 0]
+
+        Raise KeyError if the project doesn't exist'''
+        position = self.index[name]
+        key_position = []
+        while position is not None:
+            key_position.insert(0, self.ranks[position] + 1)
+            position = self.parents[position]
+        key_position[0] -= 1
+        return key_position + [0] * (3 - len(key_position))
+
+    def project(self, key_position):
+        '''Return the name of the project of a position returned by
+        self.position().
+
+        Raise IndexError if it doesn't exist'''
+        if key_position[0] < 0:
+            raise IndexError
+        position = self.children[None][key_position[0]]
+        for rank in key_position[1:]:
+            if rank == 0:
+                break
+            elif rank < 0:
+                raise IndexError
+            position = self.children[position][rank - 1]
+        return self.names[position]
+
+
+class ProjectCache():
+    """Cache of the nested dictionary of projects saved as JSON.
+
+    It's tagged with the size, modification time and inode of the Taskwarrior
+    data files it was built from, so it's valid until any of them change"""
+
+    def __init__(self, cache_path, data_file_paths):
+        self.cache_path = os.path.expanduser(cache_path)
+        self.data_file_paths = [
+            os.path.expanduser(path) for path in data_file_paths
+        ]
+
+    def fingerprint(self):
+        'Return the size, mtime and inode of each data file'
+        return files_fingerprint(self.data_file_paths)
+
+    def load(self):
+        '''Return the cached projects and their stats, or None if there is no
+        cache or the data files have changed since it was saved'''
+        try:
+            with open(self.cache_path, 'r') as f:
+                cache = json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            log.warning(
+                'Corrupted project cache {}, rebuilding it'.format(
+                    self.cache_path,
+                ),
+            )
+            return None
+
+        if cache.get('version') != PROJECT_CACHE_VERSION or \
+                cache.get('data_files') != self.data_file_paths or \
+                cache.get('fingerprint') != self.fingerprint():
+            return None
+        return cache['projects'], cache['stats']
+
+    def save(self, projects, stats):
+        cache = {
+            'version': PROJECT_CACHE_VERSION,
+            'data_files': self.data_file_paths,
+            'fingerprint': self.fingerprint(),
+            'projects': projects,
+            'stats': stats,
+        }
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = '{}.tmp'.format(self.cache_path)
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, self.cache_path)
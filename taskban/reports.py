@@ -1,14 +1,50 @@
 import os
 import re
 import sys
+import glob
+import json
+import math
+import stat
 import yaml
+import bisect
 import tasklib
 import logging
+import hashlib
 import datetime
+import tempfile
 from tabulate import tabulate
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from taskban.data import TaskData, LocalTask, UnrecognisedTaskData, \
+    load_taskrc, files_fingerprint
+from taskban.history import History
+from taskban.tables import Table
+from taskban.profiler import span, profiled
+from taskban.spawns import instrument_backend
+from taskban.exports import write_records, RECORD_FIELDS, \
+    TEAM_RECORD_FIELDS
+from taskban.dates import convert_datetime_string
+from taskban.completion import save_index, load_index
+from taskban.projects import ProjectTree, ProjectCache, \
+    projects_from_names, project_stats
 
 log = logging.getLogger('Main')
 
+KANBAN_HEADERS = ['ID', 'OV', 'Est', 'Active', 'Progress %', 'Description']
+TEAM_HEADERS = ['Person'] + KANBAN_HEADERS
+TEAM_TOTAL_HEADERS = ['Person', 'OV', 'Est', 'Active']
+
+# Taskwarrior processes run at the same time when taskban can't read the
+# data files, overridden with max_task_workers in the config
+MAX_TASK_WORKERS = 4
+
+REFINEMENT_COLUMNS = ['id', 'project', 'ov', 'est', 'urgency', 'description']
+REFINEMENT_HEADERS = {
+    'id': 'ID',
+    'ov': 'OV',
+    'est': 'Est',
+    'urgency': 'Urg',
+}
+
 
 class Report():
     """Abstract class to write reports"""
@@ -20,21 +56,32 @@ class Report():
         taskrc_path=None,
         config_path=None,
         data_path=None,
+        task_data=None,
+        history=None,
     ):
-        self.config = self.load_yaml(config_path)
-        self.update_config_with_arguments(
-            start_date,
-            task_data_path,
-            taskrc_path,
-            config_path,
-        )
-        self.backend = tasklib.TaskWarrior(
-            data_location=os.path.expanduser(task_data_path),
-            taskrc_location=os.path.expanduser(taskrc_path),
-        )
+        with span('load config'):
+            self.config = self.load_yaml(config_path)
+            self.update_config_with_arguments(
+                start_date,
+                task_data_path,
+                taskrc_path,
+                config_path,
+            )
+        self.data_path = data_path
+        self._backend = None
+        # The server passes the tasks and history it keeps in memory
+        self._history = history
+        self._history_loaded = history is not None
+        self._projects = None
+        self._project_stats = None
+        self.task_data = task_data
+        if task_data is None:
+            self.task_data = TaskData(
+                self.config['task_data_path'],
+                self.config['taskrc_path'],
+            )
+        self._end = convert_datetime_string('now')
         self.start = self.config['start_date']
-        self.backend.history.get_history()
-        self._end = self.backend.convert_datetime_string('now')
         self.title = ''
         self.content = {}
 
@@ -67,6 +114,246 @@ class Report():
             if value is not None:
                 self.config[argument] = value
 
+    @profiled('filter tasks')
+    def _filter_tasks(self, **filters):
+        '''Filter the tasks reading the Taskwarrior data files directly, if
+        their format isn't recognised fall back to the Taskwarrior binary'''
+        if self.task_data is not None:
+            try:
+                return self.task_data.filter(**filters)
+            except UnrecognisedTaskData as e:
+                log.debug('{}, falling back to Taskwarrior'.format(e))
+                self.task_data = None
+        return self.backend.tasks.filter(**filters)
+
+    @profiled('filter tasks')
+    def _filter_tasks_concurrently(self, *queries):
+        '''Return the tasks of each dictionary of filters, in the order of the
+        queries. If the tasks come from Taskwarrior its exports are run at the
+        same time, at most max_task_workers of them, so the queries take as
+        long as the slowest one instead of the sum of all'''
+        if self.task_data is not None:
+            try:
+                return [
+                    self.task_data.filter(**filters) for filters in queries
+                ]
+            except UnrecognisedTaskData as e:
+                log.debug('{}, falling back to Taskwarrior'.format(e))
+                self.task_data = None
+
+        backend = self.backend
+
+        def export(filters):
+            # The query set is lazy, it runs `task export` when it's read
+            return list(backend.tasks.filter(**filters))
+
+        workers = min(
+            len(queries),
+            self.config.get('max_task_workers', MAX_TASK_WORKERS),
+        )
+        if workers <= 1:
+            return [export(filters) for filters in queries]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map returns the results in the order of the queries, whatever
+            # the order the exports finish in
+            return list(executor.map(export, queries))
+
+    @property
+    def backend(self):
+        'Taskwarrior backend, created on first access'
+        if self._backend is None:
+            self._backend = instrument_backend(tasklib.TaskWarrior(
+                data_location=os.path.expanduser(
+                    self.config['task_data_path'],
+                ),
+                taskrc_location=os.path.expanduser(self.config['taskrc_path']),
+            ))
+        return self._backend
+
+    @property
+    def history(self):
+        '''Active time history of the tasks, loaded on first access. It's None
+        if undo.data can't be parsed by taskban'''
+        if not self._history_loaded:
+            self.load_history()
+        return self._history
+
+    @property
+    def projects(self):
+        '''Project tree of the pending Taskwarrior tasks, loaded on first
+        access'''
+        if self._projects is None:
+            self.load_projects()
+        return self._projects
+
+    @property
+    def project_stats(self):
+        '''Dictionary of project name to the number of pending tasks of the
+        project and the sum of their est and ov, loaded with the projects'''
+        if self._projects is None:
+            self.load_projects()
+        return self._project_stats
+
+    @profiled('project tree')
+    def load_projects(self):
+        '''Load the project tree and the project stats with one pass over the
+        pending tasks. If data_path is set, they are cached there until the
+        Taskwarrior data files change'''
+        cache = None
+        cached = None
+        if self.data_path is not None:
+            task_data_path = os.path.expanduser(self.config['task_data_path'])
+            cache = ProjectCache(
+                os.path.join(
+                    os.path.expanduser(self.data_path),
+                    'projects.json',
+                ),
+                [
+                    os.path.join(task_data_path, 'pending.data'),
+                    os.path.join(task_data_path, 'completed.data'),
+                ],
+            )
+            cached = cache.load()
+
+        if cached is None:
+            tasks = self._filter_tasks(status='pending')
+            cached = (
+                projects_from_names(
+                    {task['project'] for task in tasks if task['project']},
+                ),
+                project_stats(tasks),
+            )
+            if cache is not None:
+                cache.save(*cached)
+        self._projects, self._project_stats = cached
+
+    @profiled('completion index')
+    def update_completion_index(self):
+        '''Save the projects, the pending tasks and the pm states for the shell
+        completion. It's only done if taskban can read the data files, so it
+        never starts Taskwarrior.
+
+        If the pending tasks aren't loaded, the index is only rebuilt when the
+        data files or the states have changed since it was saved'''
+        if self.data_path is None or self.task_data is None:
+            return
+        task_data_path = os.path.expanduser(self.config['task_data_path'])
+        fingerprint = files_fingerprint([
+            os.path.join(task_data_path, 'pending.data'),
+            os.path.join(task_data_path, 'completed.data'),
+        ])
+        states = list(self.config['available_states'])
+        if not self.task_data.pending_loaded:
+            index = load_index(self.data_path)
+            if index.get('fingerprint') == fingerprint and \
+                    index['states'] == states:
+                return
+        try:
+            tasks = self.task_data.filter(status='pending')
+        except UnrecognisedTaskData:
+            return
+        save_index(
+            self.data_path,
+            ProjectTree(self.projects).names,
+            {task['id']: task['description'] for task in tasks},
+            states,
+            fingerprint,
+        )
+
+    @profiled('load history')
+    def load_history(self):
+        '''Load the active time history of the tasks. If data_path is set, the
+        parsed history is checkpointed there so the next runs only parse the
+        new entries of undo.data'''
+        checkpoint_path = None
+        if self.data_path is not None:
+            checkpoint_path = os.path.join(
+                os.path.expanduser(self.data_path),
+                'history.json',
+            )
+        self._history = History(
+            os.path.join(
+                os.path.expanduser(self.config['task_data_path']),
+                'undo.data',
+            ),
+            checkpoint_path,
+        )
+        self._history_loaded = True
+        try:
+            self._history.load()
+        except UnrecognisedTaskData as e:
+            log.debug('{}, falling back to Taskwarrior'.format(e))
+            self._history = None
+            self.task_data = None
+            self.backend.history.get_history()
+
+    @profiled('active time')
+    def _get_active_times(self, tasks):
+        '''Return two dictionaries of task uuid to the active time of the
+        task, the first of all time and the second since the start of the
+        report'''
+        if self.history is not None:
+            return (
+                self.history.active_times(),
+                self.history.active_times(self.start),
+            )
+        return (
+            {task['uuid']: task.active_time() for task in tasks},
+            {
+                task['uuid']: task.active_time(self._start_tw_string)
+                for task in tasks
+            },
+        )
+
+    @profiled('task import')
+    def import_tasks(self, tasks):
+        '''Save the changes of the tasks with a single `task import`'''
+        if len(tasks) == 0:
+            return
+        exported_tasks = []
+        for task in tasks:
+            if isinstance(task, LocalTask):
+                exported_tasks.append(task.export())
+            else:
+                exported_tasks.append(json.loads(task.export_data()))
+
+        with tempfile.NamedTemporaryFile(
+            'w',
+            suffix='.json',
+            delete=False,
+        ) as f:
+            json.dump(exported_tasks, f)
+        try:
+            self.backend.execute_command(['import', f.name])
+        finally:
+            os.remove(f.name)
+
+    @profiled('update taskrc')
+    def update_taskrc(self, settings):
+        '''Set the settings in the taskrc file with one atomic write, instead
+        of a `task config` per setting.
+
+        If the taskrc is a symlink its target is replaced, keeping its mode'''
+        taskrc_path = os.path.realpath(
+            os.path.expanduser(self.config['taskrc_path'])
+        )
+        with open(taskrc_path, 'r') as f:
+            lines = f.read().splitlines()
+
+        settings = dict(settings)
+        for index, line in enumerate(lines):
+            key = line.split('=', 1)[0].strip()
+            if '=' in line and key in settings:
+                lines[index] = '{}={}'.format(key, settings.pop(key))
+        for key, value in settings.items():
+            lines.append('{}={}'.format(key, value))
+
+        tmp_path = '{}.taskban.tmp'.format(taskrc_path)
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.chmod(tmp_path, stat.S_IMODE(os.stat(taskrc_path).st_mode))
+        os.replace(tmp_path, taskrc_path)
+
     @property
     def start(self):
         return self._start
@@ -87,7 +374,20 @@ class Report():
             datetime_string = 'now - {}'.format(value)
 
         self._start_tw_string = datetime_string
-        self._start = self.backend.convert_datetime_string(datetime_string)
+        self._start = self._convert_datetime_string(datetime_string)
+
+    @profiled('convert dates')
+    def _convert_datetime_string(self, datetime_string):
+        '''Convert a Taskwarrior date expression to a datetime in process,
+        relative to the moment the report was created. Expressions not
+        supported by taskban are evaluated by Taskwarrior'''
+        try:
+            return convert_datetime_string(datetime_string, now=self._end)
+        except ValueError:
+            log.debug(
+                'Evaluating {} with Taskwarrior'.format(datetime_string),
+            )
+            return self.backend.convert_datetime_string(datetime_string)
 
     def seconds_to_readable(self, seconds):
         second = seconds % 60
@@ -122,6 +422,9 @@ class KanbanReport(Report):
 
     Each state is subdivided in projects"""
 
+    headers = KANBAN_HEADERS
+    record_fields = RECORD_FIELDS
+
     def __init__(
         self,
         start_date=None,
@@ -129,6 +432,8 @@ class KanbanReport(Report):
         taskrc_path=None,
         config_path=None,
         data_path=None,
+        task_data=None,
+        history=None,
     ):
 
         super(KanbanReport, self).__init__(
@@ -137,6 +442,8 @@ class KanbanReport(Report):
             taskrc_path,
             config_path,
             data_path,
+            task_data,
+            history,
         )
 
         self.title = 'Kanban evolution since {}'.format(self.start.isoformat())
@@ -145,44 +452,74 @@ class KanbanReport(Report):
     def _get_tasks_of_state(self, state):
         '''Get a list of tasks that are in the selected state '''
         if state != 'done':
-            return self.backend.tasks.filter(
+            return self._filter_tasks(
                 status='pending',
                 pm=state,
                 modified__after=self.start,
             )
         else:
-            return self.backend.tasks.filter(
+            return self._filter_tasks(
                 status='completed',
                 modified__after=self.start,
             )
 
+    def _get_task_state(self, task):
+        '''Get the Kanban state of the task, or None if it isn't shown in the
+        report'''
+        if task['status'] == 'completed':
+            return 'done'
+        elif task['pm'] == 'done':
+            return None
+        return task['pm']
+
+    @profiled('snapshot')
     def save(self):
         '''Create a snapshot of the current kanban board, save it on
         self.snapshot in a dictionary where the keys are the states, and in
-        each state the keys are the projects'''
+        each state the keys are the projects
+
+        The tasks are extracted with one query for the pending and other for
+        the completed tasks, and are classified in the same pass'''
+
+        # The history is loaded before extracting the tasks because if
+        # undo.data can't be parsed the tasks must come from Taskwarrior
+        if self.history is None:
+            log.debug('Using the Taskwarrior active time of the tasks')
+
+        # Extract the tasks, the pending before the completed ones
+        queries = [{'status': 'pending', 'modified__after': self.start}]
+        if 'done' in self.config['available_states']:
+            queries.append(
+                {'status': 'completed', 'modified__after': self.start},
+            )
+        tasks = []
+        for query_tasks in self._filter_tasks_concurrently(*queries):
+            tasks.extend(query_tasks)
+
+        total_active_times, period_active_times = \
+            self._get_active_times(tasks)
 
-        # Extract the tasks
         self.snapshot = {}
-        for state in self.config['available_states'].keys():
-            for task in self._get_tasks_of_state(state):
-                try:
-                    self.snapshot[state]
-                except KeyError:
-                    self.snapshot[state] = {}
-                try:
-                    self.snapshot[state][task['project']]
-                except KeyError:
-                    self.snapshot[state][task['project']] = []
-                try:
-                    task['total_active_percent'] = \
-                        round(100*task.active_time()/(task['est']*3600), 1)
-                except TypeError:
-                    task['total_active_percent'] = ''
-                except ZeroDivisionError:
-                    task['total_active_percent'] = 'NoEstimate'
-                task['active_time'] = \
-                    round(task.active_time(self._start_tw_string))
-                self.snapshot[state][task['project']].append(task)
+        for task in tasks:
+            state = self._get_task_state(task)
+            if state not in self.config['available_states']:
+                continue
+            try:
+                task['total_active_percent'] = round(
+                    100 * total_active_times.get(task['uuid'], 0) /
+                    (task['est']*3600),
+                    1,
+                )
+            except TypeError:
+                task['total_active_percent'] = ''
+            except ZeroDivisionError:
+                task['total_active_percent'] = 'NoEstimate'
+            task['active_time'] = \
+                round(period_active_times.get(task['uuid'], 0))
+            self.snapshot.setdefault(state, {}).setdefault(
+                task['project'],
+                [],
+            ).append(task)
 
         # Order the tasks
         for state in self.snapshot.keys():
@@ -190,6 +527,63 @@ class KanbanReport(Report):
                 self.snapshot[state][project] = sorted(
                     self.snapshot[state][project], key=lambda k: k['urgency'])
 
+    def _states(self, show_backlog):
+        'Return the states of the snapshot to show, in the configured order'
+        return [
+            state for state in self.config['states_order']
+            if state in self.snapshot.keys() and
+            (state != 'backlog' or show_backlog)
+        ]
+
+    def _project_tasks(self, state, show_inactive):
+        '''Yield each project of the state with the tasks to show, at most
+        max_tasks_per_state of them, and the sum of their active time. The
+        projects without tasks to show are skipped'''
+        for project in sorted(self.snapshot[state].keys()):
+            dataset = []
+            total_active_time = 0
+            for task in self.snapshot[state][project]:
+                if task['active_time'] > 0 or show_inactive:
+                    dataset.append(task)
+                    total_active_time += task['active_time']
+                if len(dataset) == self.config['max_tasks_per_state']:
+                    break
+            if len(dataset) > 0:
+                yield project, dataset, total_active_time
+
+    def _sorted_tasks(self, dataset):
+        'Return the tasks of a project in the order they are shown'
+        return sorted(dataset, key=lambda k: k['description'])
+
+    def _task_row(self, task):
+        'Return the cells of the row of a task in the printed tables'
+        return [
+            task['id'],
+            task['ov'],
+            task['est'],
+            self.seconds_to_readable(task['active_time']),
+            task['total_active_percent'],
+            task['description'],
+        ]
+
+    def _separator_row(self):
+        return ['-----', '---', '---', '--------', '----', '----']
+
+    def _total_row(self, dataset, total_active_time):
+        'Return the cells of the total row of a project'
+        return [
+            'Total',
+            sum([task['ov'] for task in dataset if task['ov'] is not None]),
+            sum([task['est'] for task in dataset if task['est'] is not None]),
+            self.seconds_to_readable(total_active_time),
+            '',
+            '',
+        ]
+
+    def _write_summary(self, out, show_backlog, show_inactive):
+        'Write the sections printed after the states, none by default'
+
+    @profiled('render')
     def print_report(
         self,
         show_backlog=True,
@@ -205,63 +599,377 @@ class KanbanReport(Report):
             ),
         )
 
-        for state in self.config['states_order']:
-            if state not in self.snapshot.keys() or \
-               (state == 'backlog' and show_backlog is False):
-                continue
+        for state in self._states(show_backlog):
             out.write('\n\n## {}'.format(state))
-            for project in sorted(self.snapshot[state].keys()):
-                dataset = []
-                total_active_time = 0
-                for task in self.snapshot[state][project]:
-                    if task['active_time'] > 0 or show_inactive:
-                        dataset.append([task['id'],
-                                        task['ov'],
-                                        task['est'],
-                                        self.seconds_to_readable(
-                                            task['active_time']),
-                                        task['total_active_percent'],
-                                        task['description']])
-                        total_active_time += task['active_time']
-                    if len(dataset) == self.config['max_tasks_per_state']:
-                        break
-                total_ov = sum([i[1] for i in dataset if i[1] is not None])
-                total_est = sum([i[2] for i in dataset if i[2] is not None])
-                from operator import itemgetter
-                sorted_dataset = sorted(dataset, key=itemgetter(5))
-                sorted_dataset.append([
-                    '-----',
-                    '---',
-                    '---',
-                    '--------',
-                    '----',
-                    '----',
-                ])
-                sorted_dataset.append([
-                    'Total',
-                    total_ov,
-                    total_est,
-                    self.seconds_to_readable(total_active_time),
-                    '',
-                    '',
-                ])
-                if len(dataset) > 0:
-                    out.write('\n\n### {}\n\n'.format(project))
-                    out.write(
-                        tabulate(
-                            sorted_dataset,
-                            headers=[
-                                'ID',
-                                'OV',
-                                'Est',
-                                'Active',
-                                'Progress %',
-                                'Description'
-                            ]
-                        )
-                    )
+            for project, dataset, total_active_time in self._project_tasks(
+                state,
+                show_inactive,
+            ):
+                table = Table(self.headers)
+                for task in self._sorted_tasks(dataset):
+                    table.add_row(self._task_row(task))
+                table.add_row(self._separator_row())
+                table.add_row(self._total_row(dataset, total_active_time))
+                out.write('\n\n### {}\n\n'.format(project))
+                table.write(out)
+        self._write_summary(out, show_backlog, show_inactive)
         out.write('\n')
 
+    def _task_record(self, state, project, task):
+        'Return the record of a task'
+        progress = task['total_active_percent']
+        return {
+            'type': 'task',
+            'state': state,
+            'project': project,
+            'id': task['id'],
+            'ov': task['ov'],
+            'est': task['est'],
+            'active': task['active_time'],
+            'progress': progress if isinstance(progress, float) else None,
+            'description': task['description'],
+        }
+
+    def _total_record(self, state, project, dataset, total_active_time):
+        'Return the total record of a project'
+        return {
+            'type': 'total',
+            'state': state,
+            'project': project,
+            'id': None,
+            'ov': sum([task['ov'] for task in dataset
+                       if task['ov'] is not None]),
+            'est': sum([task['est'] for task in dataset
+                        if task['est'] is not None]),
+            'active': total_active_time,
+            'progress': None,
+            'description': None,
+        }
+
+    def records(self, show_backlog=True, show_inactive=False):
+        '''Yield the rows of the report as dictionaries with the
+        record_fields, a task record for each task followed by the total
+        record of its project. The active time is in seconds and the progress
+        is None when it can't be computed'''
+        for state in self._states(show_backlog):
+            for project, dataset, total_active_time in self._project_tasks(
+                state,
+                show_inactive,
+            ):
+                for task in self._sorted_tasks(dataset):
+                    yield self._task_record(state, project, task)
+                yield self._total_record(
+                    state,
+                    project,
+                    dataset,
+                    total_active_time,
+                )
+
+    @profiled('export')
+    def export_report(
+        self,
+        output_format,
+        show_backlog=True,
+        show_inactive=False,
+        out=sys.stdout,
+    ):
+        '''Write the records of the report to out in one of the
+        EXPORT_FORMATS, record by record'''
+        write_records(
+            output_format,
+            self.records(show_backlog, show_inactive),
+            out,
+            self.record_fields,
+        )
+
+
+def _person_name(task_data_path):
+    '''Name of the owner of a data directory, the name of the directory or of
+    its parent if it's hidden, like ~/alice/.task'''
+    path = os.path.abspath(os.path.expanduser(task_data_path))
+    name = os.path.basename(path)
+    if name.startswith('.'):
+        name = os.path.basename(os.path.dirname(path)) or name
+    return name
+
+
+def team_members(specs, taskrc_path):
+    '''Return the members of a team out of a list of
+    task_data_path[:taskrc_path] strings. The task_data_path can be a glob
+    that matches several directories, and taskrc_path is used for the members
+    without one.
+
+    Each member is a dictionary with its name, task_data_path and
+    taskrc_path. A directory matched by several specs is only added once,
+    with the taskrc of the first one. The names clashing with other members
+    are replaced by the full path of their data directory.
+
+    Raise ValueError if a spec doesn't match any directory'''
+    members = []
+    seen_paths = set()
+    for spec in specs:
+        pattern, _, member_taskrc_path = spec.partition(':')
+        paths = sorted(
+            path for path in glob.glob(os.path.expanduser(pattern))
+            if os.path.isdir(path)
+        )
+        if len(paths) == 0:
+            raise ValueError(
+                'No Taskwarrior data directory matches {}'.format(pattern),
+            )
+        for path in paths:
+            absolute_path = os.path.abspath(path)
+            if absolute_path in seen_paths:
+                continue
+            seen_paths.add(absolute_path)
+            members.append({
+                'name': _person_name(path),
+                'task_data_path': path,
+                'taskrc_path': member_taskrc_path or taskrc_path,
+            })
+
+    names = [member['name'] for member in members]
+    for member in members:
+        if names.count(member['name']) > 1:
+            member['name'] = os.path.abspath(member['task_data_path'])
+    return members
+
+
+def _member_board(member, start_date, config_path, data_path):
+    '''Return the tasks of the board of a team member as a list of
+    dictionaries, in the order of the snapshot. It's run in the processes of
+    the TeamReport pool, so it only returns plain data'''
+    member_data_path = None
+    if data_path is not None:
+        # Each member keeps its caches apart, they depend on its data files
+        member_data_path = os.path.join(
+            os.path.expanduser(data_path),
+            'team',
+            hashlib.sha1(
+                os.path.abspath(member['task_data_path']).encode('utf-8'),
+            ).hexdigest()[:12],
+        )
+        os.makedirs(member_data_path, exist_ok=True)
+    report = KanbanReport(
+        start_date=start_date,
+        task_data_path=member['task_data_path'],
+        taskrc_path=member['taskrc_path'],
+        config_path=config_path,
+        data_path=member_data_path,
+    )
+    return [
+        {
+            'person': member['name'],
+            'state': state,
+            'project': project,
+            'id': task['id'],
+            'ov': task['ov'],
+            'est': task['est'],
+            'active_time': task['active_time'],
+            'total_active_percent': task['total_active_percent'],
+            'description': task['description'],
+        }
+        for state in sorted(report.snapshot.keys())
+        for project in sorted(report.snapshot[state].keys())
+        for task in report.snapshot[state][project]
+    ]
+
+
+class TeamReport(KanbanReport):
+    """Kanban report of a team that keeps a Taskwarrior data directory per
+    person.
+
+    The board of each member is built in a process pool, at most workers at
+    the same time, and the boards are merged by state and project. Each
+    project shows the tasks of every member, at most max_tasks_per_state of
+    each one, with the total of the team, and the report ends with the
+    totals of each member and of the whole team.
+
+    The members are dictionaries with their name, task_data_path and
+    taskrc_path, like the ones returned by team_members()"""
+
+    headers = TEAM_HEADERS
+    record_fields = TEAM_RECORD_FIELDS
+
+    def __init__(
+        self,
+        members,
+        start_date=None,
+        config_path=None,
+        data_path=None,
+        workers=None,
+    ):
+        self.members = members
+        self.workers = workers
+        self._member_order = {
+            member['name']: index for index, member in enumerate(members)
+        }
+        super(TeamReport, self).__init__(
+            start_date=start_date,
+            config_path=config_path,
+            data_path=data_path,
+        )
+        self.title = 'Team kanban evolution since {}'.format(
+            self.start.isoformat(),
+        )
+
+    def _boards(self):
+        'Return the board of each member, in the order of the members'
+        arguments = [
+            (member, self.config['start_date'], self.config['config_path'],
+             self.data_path)
+            for member in self.members
+        ]
+        workers = min(len(arguments), self.workers or os.cpu_count() or 1)
+        if workers <= 1:
+            return [_member_board(*member) for member in arguments]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map returns the boards in the order of the members, whatever
+            # the order they are built in
+            return list(executor.map(_member_board, *zip(*arguments)))
+
+    @profiled('snapshot')
+    def save(self):
+        '''Build the boards of the members and merge them in self.snapshot,
+        where the keys are the states and in each state the projects. The
+        tasks of each project are grouped by member, in the order of the
+        members'''
+        self.snapshot = {}
+        for board in self._boards():
+            for task in board:
+                self.snapshot.setdefault(task['state'], {}).setdefault(
+                    task['project'],
+                    [],
+                ).append(task)
+
+    def _project_tasks(self, state, show_inactive):
+        '''Yield each project of the state with the tasks to show, at most
+        max_tasks_per_state of each member, and the sum of their active time.
+        The projects without tasks to show are skipped'''
+        for project in sorted(self.snapshot[state].keys()):
+            dataset = []
+            shown = {}
+            total_active_time = 0
+            for task in self.snapshot[state][project]:
+                if shown.get(task['person'], 0) == \
+                        self.config['max_tasks_per_state']:
+                    continue
+                if task['active_time'] > 0 or show_inactive:
+                    dataset.append(task)
+                    shown[task['person']] = shown.get(task['person'], 0) + 1
+                    total_active_time += task['active_time']
+            if len(dataset) > 0:
+                yield project, dataset, total_active_time
+
+    def _sorted_tasks(self, dataset):
+        'Return the tasks of a project sorted by member and description'
+        return sorted(
+            dataset,
+            key=lambda k: (self._member_order[k['person']], k['description']),
+        )
+
+    def _task_row(self, task):
+        return [task['person']] + super(TeamReport, self)._task_row(task)
+
+    def _separator_row(self):
+        return ['------'] + super(TeamReport, self)._separator_row()
+
+    def _total_row(self, dataset, total_active_time):
+        return ['Total', ''] + super(TeamReport, self)._total_row(
+            dataset,
+            total_active_time,
+        )[1:]
+
+    def _with_person(self, record, person):
+        'Return the record with the person, in the order of record_fields'
+        record['person'] = person
+        return {field: record[field] for field in self.record_fields}
+
+    def _task_record(self, state, project, task):
+        return self._with_person(
+            super(TeamReport, self)._task_record(state, project, task),
+            task['person'],
+        )
+
+    def _total_record(self, state, project, dataset, total_active_time):
+        return self._with_person(
+            super(TeamReport, self)._total_record(
+                state,
+                project,
+                dataset,
+                total_active_time,
+            ),
+            None,
+        )
+
+    def _member_records(self, show_backlog, show_inactive):
+        '''Return a person record with the totals of the tasks shown of each
+        member and a team record with the totals of the whole team'''
+        totals = {
+            member['name']: {'ov': 0, 'est': 0, 'active': 0}
+            for member in self.members
+        }
+        team_totals = {'ov': 0, 'est': 0, 'active': 0}
+        for state in self._states(show_backlog):
+            for project, dataset, total_active_time in self._project_tasks(
+                state,
+                show_inactive,
+            ):
+                for task in dataset:
+                    for row_totals in [totals[task['person']], team_totals]:
+                        row_totals['ov'] += task['ov'] or 0
+                        row_totals['est'] += task['est'] or 0
+                        row_totals['active'] += task['active_time']
+
+        rows = [
+            ('person', member['name'], totals[member['name']])
+            for member in self.members
+        ]
+        rows.append(('team', None, team_totals))
+        return [
+            {
+                'type': record_type,
+                'person': person,
+                'state': None,
+                'project': None,
+                'id': None,
+                'ov': row_totals['ov'],
+                'est': row_totals['est'],
+                'active': row_totals['active'],
+                'progress': None,
+                'description': None,
+            }
+            for record_type, person, row_totals in rows
+        ]
+
+    def records(self, show_backlog=True, show_inactive=False):
+        '''Yield the records of the KanbanReport with the person of each
+        task, followed by a person record with the totals of each member and
+        a team record with the totals of the whole team. The totals only count
+        the tasks shown'''
+        for record in super(TeamReport, self).records(
+            show_backlog,
+            show_inactive,
+        ):
+            yield record
+        for record in self._member_records(show_backlog, show_inactive):
+            yield record
+
+    def _write_summary(self, out, show_backlog, show_inactive):
+        'Write the totals of each member and of the team'
+        table = Table(TEAM_TOTAL_HEADERS)
+        for record in self._member_records(show_backlog, show_inactive):
+            if record['type'] == 'team':
+                table.add_row(['------', '---', '---', '--------'])
+            table.add_row([
+                record['person'] if record['type'] == 'person' else 'Total',
+                record['ov'],
+                record['est'],
+                self.seconds_to_readable(record['active']),
+            ])
+        out.write('\n\n## Team\n\n')
+        table.write(out)
+
 
 class RefinementReport(Report):
     """Refinement report, it represents the status of the backlog at the moment
@@ -275,6 +983,7 @@ class RefinementReport(Report):
         taskrc_path=None,
         config_path=None,
         data_path=None,
+        skip_empty=False,
     ):
 
         super(RefinementReport, self).__init__(
@@ -288,18 +997,50 @@ class RefinementReport(Report):
             os.path.expanduser(data_path),
             'refinement.yaml',
         )
-        self.backend.get_projects()
+        self._project_tree = None
+        self.skip_empty = skip_empty
         self.load()
 
-    def print_report(self):
-        'Print the report'
-        os.system(
-            'TASKDATA={} task rc:{} project:{} list'.format(
-                self.config['task_data_path'],
-                self.config['taskrc_path'],
-                self.state['project'],
+    @profiled('render')
+    def print_report(self, out=sys.stdout):
+        '''Print the pending tasks of the current project and its
+        subprojects sorted by urgency, with the columns of the
+        refinement_columns configuration'''
+        columns = self.config.get('refinement_columns', REFINEMENT_COLUMNS)
+        tasks = sorted(
+            self._filter_tasks(
+                status='pending',
+                project=self.state['project'],
             ),
+            key=lambda k: k['urgency'],
+            reverse=True,
+        )
+        if len(tasks) == 0:
+            out.write('No matches.\n')
+            return
+
+        out.write(
+            tabulate(
+                [
+                    [self._format_value(task[column]) for column in columns]
+                    for task in tasks
+                ],
+                headers=[
+                    REFINEMENT_HEADERS.get(column, column.capitalize())
+                    for column in columns
+                ],
+            )
         )
+        out.write('\n\n{} tasks\n'.format(len(tasks)))
+
+    def _format_value(self, value):
+        if isinstance(value, datetime.datetime):
+            return value.strftime('%Y-%m-%d')
+        elif isinstance(value, float):
+            return round(value, 2)
+        elif isinstance(value, (set, list)):
+            return ' '.join(sorted(str(element) for element in value))
+        return value
 
     def end(self):
         'End the refinement, deleting the state file'
@@ -310,16 +1051,44 @@ class RefinementReport(Report):
         self.save_yaml(self.state_file, self.state)
 
     def load(self):
-        'Load the state of the report'
+        '''Load the state of the report. A new refinement starts on the first
+        project, or on the first with tasks if self.skip_empty is True'''
         try:
             self.state = self.load_yaml(self.state_file, no_fail=True)
         except FileNotFoundError:
+            try:
+                project = self.project_tree.first(self.skip_empty)
+            except IndexError:
+                project = self.project_tree.first()
             self.state = {
                 'start': datetime.datetime.now().strftime('%Y-%m-%dT%H:%M'),
-                'project': sorted(self.backend.projects)[0],
+                'project': project,
             }
             self.save()
 
+    @property
+    def project_tree(self):
+        'Index of the project hierarchy, built on first access'
+        if self._project_tree is None:
+            self._project_tree = ProjectTree(
+                self.projects,
+                self.project_stats,
+            )
+        return self._project_tree
+
+    def summary(self):
+        '''Return the number of pending tasks of the current project and its
+        subprojects and the sum of their est and ov'''
+        count, est, ov = self.project_tree.subtree_stats[
+            self.project_tree.index[self.state['project']]
+        ]
+        return '{}: {} tasks, {} est, {} ov'.format(
+            self.state['project'],
+            count,
+            est,
+            ov,
+        )
+
     def find_project_position(self, search_key):
         '''Find the position of the project inside the projects. For example in:
 
@@ -336,90 +1105,21 @@ class RefinementReport(Report):
         ) == [0, 1, 0]
         self.find_project_position(
             my-first-project.my-first-subproject.my-first-subsubproject,
-        ) == [0, 0, 1]
+        ) == [0, 1, 1]
 
         If it doesn't exist it will raise an error
         '''
-
-        for key, value in self.backend.projects.items():
-            key_position = sorted(self.backend.projects).index(key)
-            if key == search_key:
-                return [key_position, 0, 0]
-            elif value != {}:
-                for subkey, subvalue in value.items():
-                    subkey_position = sorted(value).index(subkey)
-                    if '{}.{}'.format(key, subkey) == search_key:
-                        return [key_position, subkey_position + 1, 0]
-                    elif subvalue != {}:
-                        for subsubkey, subsubvalue in subvalue.items():
-                            subsubkey_position = sorted(subvalue).index(
-                                subsubkey,
-                            )
-                            if '{}.{}.{}'.format(
-                                key,
-                                subkey,
-                                subsubkey,
-                            ) == search_key:
-                                return [
-                                    key_position,
-                                    subkey_position + 1,
-                                    subsubkey_position + 1,
-                                ]
-        raise KeyError
+        return self.project_tree.position(search_key)
 
     def find_project(self, key_position):
-        key = sorted(self.backend.projects)[key_position[0]]
-        if key_position[1] == 0:
-            return key
-        else:
-            subkey = sorted(self.backend.projects[key])[key_position[1] - 1]
-            if key_position[2] == 0:
-                return '{}.{}'.format(key, subkey)
-            else:
-                subsubkey = sorted(self.backend.projects[key][subkey])[
-                    key_position[2] - 1
-                ]
-                return '{}.{}.{}'.format(key, subkey, subsubkey)
-
-    def _next_child(self, parentage, direction):
-        '''Set the next child'''
-        if self.project_position[1] == 0:
-            self.project_position[1] += direction
-            if direction == -1:
-                self.project_position[0] += direction
-        elif self.project_position[2] == 0:
-            self.project_position[2] += direction
-            if direction == -1:
-                self.project_position[1] += direction
-        else:
-            raise IndexError
-
-    def _next_sibling(self, parentage, direction):
-        '''Set the next sibling'''
-        if self.project_position[1] == 0:
-            self.project_position[0] += direction
-        else:
-            if self.project_position[2] == 0:
-                self.project_position[1] += direction
-            else:
-                self.project_position[2] += direction
-
-    def _next_parent(self, parentage, direction):
-        '''Set the next sibling'''
-        if self.project_position[1] == 0:
-            raise IndexError
-        elif self.project_position[2] == 0:
-            if direction == 1:
-                self.project_position[0] += direction
-            self.project_position[1] = 0
-        else:
-            if direction == 1:
-                self.project_position[1] += direction
-            self.project_position[2] = 0
+        return self.project_tree.project(key_position)
 
     def next(self, parentage, direction=1):
         '''Set the next project in the state
 
+        If self.skip_empty is True the projects without pending tasks in
+        their subtree are skipped.
+
         Variable types and examples:
 
         - parentage:
@@ -427,17 +1127,27 @@ class RefinementReport(Report):
             - choices: parent, sibling, child
         '''
 
-        self.project_position = self.find_project_position(
-            self.state['project'],
-        )
+        project = self.state['project']
         if parentage == 'sibling':
-            self._next_sibling(parentage, direction)
+            project = self.project_tree.sibling(
+                project,
+                direction,
+                self.skip_empty,
+            )
         elif parentage == 'child':
-            self._next_child(parentage, direction)
+            project = self.project_tree.child(
+                project,
+                direction,
+                self.skip_empty,
+            )
         elif parentage == 'parent':
-            self._next_parent(parentage, direction)
+            project = self.project_tree.parent(
+                project,
+                direction,
+                self.skip_empty,
+            )
 
-        self.state['project'] = self.find_project(self.project_position)
+        self.state['project'] = project
         self.save()
 
     def jump(self, project_name):
@@ -471,101 +1181,316 @@ class PlanningReport(Report):
             config_path,
             data_path,
         )
-        self.backend = tasklib.TaskWarrior(
-            data_location=os.path.expanduser(task_data_path),
-            taskrc_location=os.path.expanduser(taskrc_path),
-        )
+        self._changed_tasks = {}
+        self._new_settings = {}
+        self._taskrc_settings = None
+        self.urgencies = {}
         self.get_affected_tasks(task_state, project)
 
+    @profiled('load planning')
     def get_affected_tasks(self, task_state='todo', project=None):
         '''Get all tasks filtered by task_state and possibly by project'''
         if project is None:
-            self.tasks = self.backend.tasks.filter(
+            self.tasks = self._filter_tasks(
                 pm=task_state,
                 status='pending',
             )
         else:
-            self.tasks = self.backend.tasks.filter(
+            self.tasks = self._filter_tasks(
                 project=project,
                 pm=task_state,
                 status='pending',
             )
-        self.tasks = sorted(
-            self.tasks, key=lambda k: k['urgency'],
-            reverse=True,
-        )
+        # Keep the urgencies changed by this report, the tasks still have
+        # the ones they were loaded with
+        for task in self.tasks:
+            self.urgencies.setdefault(task['uuid'], task['urgency'])
+        self._sort_tasks()
+
+    @property
+    def taskrc_settings(self):
+        'Settings of the taskrc, loaded on first access'
+        if self._taskrc_settings is None:
+            self._taskrc_settings = load_taskrc(self.config['taskrc_path'])
+        return self._taskrc_settings
 
     def _get_task_position(self, task_id):
-        'Get task index inside the self.tasks list for a given task_id'
-        return [
-            index for index, value in enumerate(self.tasks)
-            if value['id'] == task_id
-        ][0]
+        '''Get task index inside the self.tasks list for a given task_id.
+
+        Raise ValueError if the task is not in the planning'''
+        for index, task in enumerate(self.tasks):
+            if task['id'] == task_id:
+                return index
+        raise ValueError('Task {} is not in the planning'.format(task_id))
+
+    def _get_urgency(self, task_index):
+        'Get the urgency of a task, with the ord changes not yet committed'
+        return self.urgencies[self.tasks[task_index]['uuid']]
 
     def _increase_task_ord(self, task_id, ord_delta):
-        '''Method to increase the ord of a desired task'''
-        ord_delta = round(ord_delta, 2)
-        task_index = self._get_task_position(task_id)
-        if self.tasks[task_index]['ord'] is None:
-            self.tasks[task_index]['ord'] = ord_delta
-        else:
-            self.tasks[task_index]['ord'] += ord_delta
-        self.tasks[task_index].save()
-        try:
-            self.backend.config[
-                'urgency.uda.ord.{}.coefficient'.format(
-                    self.tasks[task_index]['ord'],
-                ),
+        '''Method to increase the ord of a desired task.
+
+        The change is kept in memory until self.commit() is called'''
+        task = self.tasks[self._get_task_position(task_id)]
+        self._set_task_ord(
+            task,
+            round((task['ord'] or 0) + round(ord_delta, 2), 2),
+        )
+
+    def _set_task_ord(self, task, new_ord):
+        '''Set the ord of a task, updating its urgency and the ord
+        coefficients the taskrc needs.
+
+        The change is kept in memory until self.commit() is called'''
+        old_ord = task['ord'] or 0
+        task['ord'] = new_ord
+        self.urgencies[task['uuid']] += new_ord - old_ord
+        self._changed_tasks[task['uuid']] = task
+
+        for coefficient in [
+            'urgency.uda.ord.{}.coefficient'.format(task['ord']),
+            'urgency.uda.ord.{0:06f}.coefficient'.format(task['ord']),
+        ]:
+            if coefficient not in self.taskrc_settings:
+                self._new_settings[coefficient] = task['ord']
+
+    @profiled('commit')
+    def commit(self):
+        '''Save the ord changes of the tasks with one `task import` and the
+        new ord coefficients with one update of the taskrc'''
+        if len(self._new_settings) > 0:
+            self.update_taskrc(self._new_settings)
+            self.taskrc_settings.update(self._new_settings)
+        self.import_tasks(list(self._changed_tasks.values()))
+        self._changed_tasks = {}
+        self._new_settings = {}
+
+    def _spread_urgencies(self, window, upper, lower, direction):
+        '''Return the target urgencies of the tasks of the window, ordered
+        from the most to the least urgent, so they are evenly spaced between
+        the upper and lower urgency bounds. A bound is None if the window
+        reaches that end of the list.
+
+        Return None if there is no room to leave a gap of minimum_ord_step
+        between the tasks'''
+        step = self.config['minimum_ord_step']
+        slots = len(window)
+
+        if upper is not None and lower is not None:
+            spacing = (upper - lower) / (slots + 1)
+            if spacing < step:
+                return None
+            return [upper - spacing * (slot + 1) for slot in range(slots)]
+        elif slots == 1:
+            # Moving past the task at one end of the list
+            neighbour = lower if upper is None else upper
+            spacing = max(
+                abs(neighbour - self.urgencies[window[0]['uuid']]) / 2,
+                step,
+            )
+            if upper is None:
+                return [lower + spacing]
+            return [upper - spacing]
+        elif upper is None and lower is not None:
+            return [lower + step * (slots - slot) for slot in range(slots)]
+        elif upper is not None:
+            return [upper - step * (slot + 1) for slot in range(slots)]
+        elif direction == 1:
+            # The whole list is renumbered keeping the least urgent task
+            bottom = self.urgencies[window[-1]['uuid']]
+            return [
+                bottom + step * (slots - slot - 1) for slot in range(slots)
             ]
-        except KeyError:
-            self.backend.execute_command([
-                'config',
-                'urgency.uda.ord.{}.coefficient'.format(
-                    self.tasks[task_index]['ord'],
-                ),
-                self.tasks[task_index]['ord'],
-            ])
-            self.backend.execute_command([
-                'config',
-                'urgency.uda.ord.{0:06f}.coefficient'.format(
-                    self.tasks[task_index]['ord'],
-                ),
-                self.tasks[task_index]['ord'],
-            ])
+        top = self.urgencies[window[0]['uuid']]
+        return [top - step * slot for slot in range(slots)]
 
     def _move_task(self, task_id, direction):
+        '''Move the task one position up (direction 1) or down (direction -1)
+        changing the ords as little as possible.
+
+        The task is placed in the middle of the gap between its new
+        neighbours. If the gap is smaller than twice minimum_ord_step, a
+        window of tasks around the gap, that doubles its size until there is
+        enough room, is renumbered with evenly spaced urgencies. The ords are
+        multiples of minimum_ord_step, so the taskrc coefficients are reused
+        instead of getting ever finer decimals, and most of the moves only
+        change one task.'''
         task_index = self._get_task_position(task_id)
         if task_index-direction < 0 or \
                 task_index-direction > len(self.tasks) - 1:
             # If it's on the extremes return
             return
 
-        urg_delta_to_next_task = (self.tasks[task_index-direction]['urgency'] -
-                                  self.tasks[task_index]['urgency'])
+        task = self.tasks[task_index]
+        others = self.tasks[:task_index] + self.tasks[task_index + 1:]
+        gap = task_index - direction if direction == 1 else task_index + 1
+        self._place_tasks(
+            others[:gap] + [task] + others[gap:],
+            gap,
+            gap + 1,
+            direction,
+        )
+        self._sort_tasks()
+
+    def _place_tasks(self, order, first, last, direction):
+        '''Change the ords of the tasks order[first:last] so they fit between
+        their neighbours in the order list.
 
-        if task_index-2*direction < 0 or \
-                task_index-2*direction > len(self.tasks) - 1:
-            # If it's one before the last return half the step
-            urg_step_above_next_task = urg_delta_to_next_task/2
+        If there is no room, the window grows to both sides doubling its size
+        until the tasks can be evenly spaced'''
+        while True:
+            window = order[first:last]
+            ords = self._window_ords(order, first, last, direction)
+            if ords is not None:
+                break
+            size = last - first
+            first = max(0, first - size)
+            last = min(len(order), last + size)
+
+        for window_task, new_ord in zip(window, ords):
+            if abs(new_ord - (window_task['ord'] or 0)) >= 1e-6:
+                self._set_task_ord(window_task, new_ord)
+
+    def _window_ords(self, order, first, last, direction):
+        '''Return the new ords of the tasks order[first:last] evenly spaced
+        between their neighbours, or None if they don't fit'''
+        window = order[first:last]
+        upper = None
+        lower = None
+        if first > 0:
+            upper = self.urgencies[order[first - 1]['uuid']]
+        if last < len(order):
+            lower = self.urgencies[order[last]['uuid']]
+        targets = self._spread_urgencies(window, upper, lower, direction)
+        if targets is None:
+            return None
+        return self._grid_ords(window, targets, upper, lower, direction)
+
+    def _grid_ords(self, window, targets, upper, lower, direction):
+        '''Return the ords of the tasks of the window that take them as close
+        to their target urgencies as the ord grid allows.
+
+        The urgency also has terms like the age or the due date that aren't
+        multiples of minimum_ord_step, so the ords are snapped to the step
+        instead of the urgencies. The tasks are placed one by one from the
+        bound the window is attached to, at least minimum_ord_step away from
+        the previous one.
+
+        Return None if the tasks don't fit above the lower bound'''
+        step = self.config['minimum_ord_step']
+        upwards = upper is None and (lower is not None or direction == 1)
+        tasks = list(zip(window, targets))
+        if upwards:
+            tasks.reverse()
+            previous = lower
         else:
-            urg_step_above_next_task = (
-                self.tasks[task_index-2*direction]['urgency'] -
-                self.tasks[task_index-direction]['urgency']
-            )/2
-            if abs(urg_step_above_next_task) < self.config['minimum_ord_step']:
-                self._increase_task_ord(
-                    self.tasks[task_index-2*direction]['id'],
-                    2 * direction * self.config['minimum_ord_step'],
-                )
-                urg_step_above_next_task = \
-                    self.config['minimum_ord_step'] * direction
-        self._increase_task_ord(
-            self.tasks[task_index]['id'],
-            urg_delta_to_next_task + urg_step_above_next_task,
+            previous = upper
+
+        ords = []
+        for index, (task, target) in enumerate(tasks):
+            base = self.urgencies[task['uuid']] - (task['ord'] or 0)
+            if upwards:
+                if previous is not None:
+                    target = max(target, previous + step)
+                task_ord = math.ceil(round((target - base) / step, 6)) * step
+            else:
+                if previous is not None:
+                    target = min(target, previous - step)
+                task_ord = math.floor(round((target - base) / step, 6)) * step
+                # Round up instead if it leaves room for the tasks below
+                if lower is not None and round(
+                    base + task_ord - lower, 6,
+                ) < step * (len(tasks) - index) and (
+                    previous is None or
+                    round(previous - base - task_ord, 6) >= 2 * step
+                ):
+                    task_ord += step
+            task_ord = round(task_ord, 6)
+            ords.append(task_ord)
+            previous = base + task_ord
+
+        if upwards:
+            ords.reverse()
+        elif lower is not None and round(previous - lower, 6) < step:
+            return None
+        return ords
+
+    def _sort_tasks(self):
+        self.tasks = sorted(
+            self.tasks, key=lambda k: self.urgencies[k['uuid']],
+            reverse=True,
+        )
+
+    def reorder(self, task_ids, commit=True):
+        '''Sort the tasks of task_ids in the given order, reusing the
+        positions they already have in the list, and save the changes in one
+        commit.
+
+        The tasks that form the longest run already in the desired order keep
+        their ords, only the rest are placed in the gaps between them. If
+        commit is False the changes are kept in memory until self.commit()'''
+        positions = sorted(
+            self._get_task_position(task_id) for task_id in task_ids
         )
+        if len(set(positions)) != len(positions):
+            raise ValueError('The tasks to reorder are duplicated')
+        order = list(self.tasks)
+        for position, task_id in zip(positions, task_ids):
+            order[position] = self.tasks[self._get_task_position(task_id)]
+
+        # Tasks with the same urgency are ordered by their current position
+        current_positions = {
+            task['uuid']: index for index, task in enumerate(self.tasks)
+        }
+        kept = self._longest_ordered_run([
+            (-self.urgencies[task['uuid']], current_positions[task['uuid']])
+            for task in order
+        ])
+        index = 0
+        while index < len(order):
+            if index in kept:
+                index += 1
+                continue
+            last = index
+            while last < len(order) and last not in kept:
+                last += 1
+            self._place_tasks(order, index, last, 1)
+            index = last
+
+        self._sort_tasks()
+        if commit:
+            self.commit()
+
+    def _longest_ordered_run(self, keys):
+        '''Return the set of indexes of the longest strictly increasing
+        subsequence of keys, in O(n log n)'''
+        tails = []
+        tail_indexes = []
+        previous = [None] * len(keys)
+        for index, key in enumerate(keys):
+            position = bisect.bisect_left(tails, key)
+            if position > 0:
+                previous[index] = tail_indexes[position - 1]
+            if position == len(tails):
+                tails.append(key)
+                tail_indexes.append(index)
+            else:
+                tails[position] = key
+                tail_indexes[position] = index
+
+        kept = set()
+        index = tail_indexes[-1] if tail_indexes else None
+        while index is not None:
+            kept.add(index)
+            index = previous[index]
+        return kept
 
-    def move_task_up(self, task_id):
+    def move_task_up(self, task_id, commit=True):
         self._move_task(task_id, 1)
+        if commit:
+            self.commit()
 
-    def move_task_down(self, task_id):
+    def move_task_down(self, task_id, commit=True):
         self._move_task(task_id, -1)
+        if commit:
+            self.commit()
@@ -0,0 +1,230 @@
+import os
+import json
+import socket
+import logging
+import socketserver
+from io import StringIO
+from taskban.data import TaskData, UnrecognisedTaskData, files_fingerprint
+from taskban.history import History
+from taskban.reports import KanbanReport
+
+log = logging.getLogger('Main')
+
+SOCKET_NAME = 'taskban.sock'
+
+
+class ServerUnavailable(Exception):
+    """Raised when the taskban server isn't running"""
+
+
+class ServerError(Exception):
+    """Raised when the taskban server got the request but failed to answer"""
+
+
+def socket_path(data_path):
+    'Path of the Unix socket of the server of the data_path directory'
+    return os.path.join(os.path.expanduser(data_path), SOCKET_NAME)
+
+
+def request(data_path, command, arguments, timeout=10):
+    '''Send a command to the taskban server and return its output.
+
+    The timeout only applies to the connection, once the request is sent it
+    waits for the answer however long the command takes.
+
+    Raise ServerUnavailable if the server isn't running, so the command can
+    be run in process instead, and ServerError if it fails once it got the
+    request, as running the command again would take as long'''
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with client:
+        try:
+            client.settimeout(timeout)
+            client.connect(socket_path(data_path))
+        except OSError as e:
+            raise ServerUnavailable('Server not available: {}'.format(e))
+
+        try:
+            client.settimeout(None)
+            client.sendall(
+                json.dumps(
+                    {'command': command, 'arguments': arguments},
+                ).encode('utf-8') + b'\n',
+            )
+            client.shutdown(socket.SHUT_WR)
+            response = b''
+            while True:
+                chunk = client.recv(65536)
+                if not chunk:
+                    break
+                response += chunk
+        except OSError as e:
+            raise ServerError('Server connection lost: {}'.format(e))
+
+    try:
+        response = json.loads(response.decode('utf-8'))
+    except ValueError:
+        raise ServerError('Invalid server response')
+    if 'error' in response:
+        raise ServerError('Server error: {}'.format(response['error']))
+    return response['output']
+
+
+class TaskState():
+    """Taskwarrior data of a data directory kept in memory by the server.
+
+    The tasks are parsed again only when pending.data, completed.data or the
+    taskrc change, and the history only parses the transactions appended to
+    undo.data since the last request"""
+
+    def __init__(self, task_data_path, taskrc_path, data_path):
+        self.task_data_path = task_data_path
+        self.taskrc_path = taskrc_path
+        self.data_path = data_path
+        self.task_data = None
+        self.fingerprint = None
+        self.history = None
+
+    def _new_history(self):
+        return History(
+            os.path.join(self.task_data_path, 'undo.data'),
+            os.path.join(self.data_path, 'history.json'),
+        )
+
+    def refresh(self):
+        'Reload the files that have changed since the last refresh'
+        fingerprint = files_fingerprint([
+            os.path.join(self.task_data_path, 'pending.data'),
+            os.path.join(self.task_data_path, 'completed.data'),
+            self.taskrc_path,
+        ])
+        if fingerprint != self.fingerprint:
+            log.debug('Loading the tasks of {}'.format(self.task_data_path))
+            self.task_data = TaskData(self.task_data_path, self.taskrc_path)
+            self.fingerprint = fingerprint
+
+        if self.history is None:
+            self.history = self._new_history()
+        try:
+            self.history.load()
+        except UnrecognisedTaskData as e:
+            # The report will fall back to Taskwarrior
+            log.debug('{}, history not cached'.format(e))
+            self.history = None
+
+
+class TaskbanServer(socketserver.UnixStreamServer):
+    """Server that answers the taskban commands through a Unix socket in the
+    data_path directory, keeping the Taskwarrior data in memory between
+    requests.
+
+    The requests are handled one after the other, so the state is never
+    shared between threads"""
+
+    def __init__(self, data_path):
+        self.data_path = os.path.expanduser(data_path)
+        self.states = {}
+        path = socket_path(self.data_path)
+        if os.path.exists(path):
+            self._remove_stale_socket(path)
+        os.makedirs(self.data_path, exist_ok=True)
+        old_umask = os.umask(0o077)
+        try:
+            super(TaskbanServer, self).__init__(path, RequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    def _remove_stale_socket(self, path):
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        with client:
+            try:
+                client.connect(path)
+            except OSError:
+                os.remove(path)
+                return
+        raise RuntimeError('A taskban server is already running on {}'.format(
+            path,
+        ))
+
+    def serve(self):
+        'Serve the requests until interrupted, then remove the socket'
+        log.info('Serving on {}'.format(self.server_address))
+        try:
+            self.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server_close()
+            os.remove(self.server_address)
+
+    def state(self, task_data_path, taskrc_path):
+        'Return the refreshed state of a Taskwarrior data directory'
+        key = (task_data_path, taskrc_path)
+        if key not in self.states:
+            self.states[key] = TaskState(
+                task_data_path,
+                taskrc_path,
+                self.data_path,
+            )
+        self.states[key].refresh()
+        return self.states[key]
+
+    def run(self, command, arguments):
+        'Run a command and return its output'
+        if command == 'ocupation':
+            return self.ocupation(**arguments)
+        raise ValueError('Unknown command {}'.format(command))
+
+    def ocupation(
+        self,
+        period,
+        task_data_path,
+        taskrc_path,
+        config_path,
+        show_backlog=False,
+        show_inactive=False,
+        output_format='markdown',
+    ):
+        state = self.state(task_data_path, taskrc_path)
+        report = KanbanReport(
+            start_date=period,
+            task_data_path=task_data_path,
+            taskrc_path=taskrc_path,
+            config_path=config_path,
+            data_path=self.data_path,
+            task_data=state.task_data,
+            history=state.history,
+        )
+        out = StringIO()
+        if output_format == 'markdown':
+            report.print_report(
+                show_backlog=show_backlog,
+                show_inactive=show_inactive,
+                out=out,
+            )
+        else:
+            report.export_report(
+                output_format,
+                show_backlog=show_backlog,
+                show_inactive=show_inactive,
+                out=out,
+            )
+        return out.getvalue()
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Handle one JSON request with the command and its arguments, and answer
+    with a JSON object with its output or the error"""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+            response = {
+                'output': self.server.run(
+                    request['command'],
+                    request['arguments'],
+                ),
+            }
+        except Exception as e:
+            log.exception('Error handling the request')
+            response = {'error': str(e)}
+        self.wfile.write(json.dumps(response).encode('utf-8'))
@@ -0,0 +1,171 @@
+import cmd
+import logging
+
+log = logging.getLogger('Main')
+
+PARENTAGES = ['child', 'sibling', 'parent']
+
+
+class Session(cmd.Cmd):
+    """Interactive refinement and planning session.
+
+    The reports are loaded once and kept in memory, so each command is a
+    lookup in the project tree or a change of the in memory ords. The ord
+    changes of the planning are saved in one batch with `w` or when the
+    session ends with `q`"""
+
+    intro = 'Taskban session, type ? to list the commands'
+
+    def __init__(
+        self,
+        refinement,
+        planning,
+        task_state='todo',
+        stdin=None,
+        stdout=None,
+    ):
+        super(Session, self).__init__(stdin=stdin, stdout=stdout)
+        self.refinement = refinement
+        self.planning = planning
+        self.task_state = task_state
+        # Share the parsed tasks between both reports
+        self.refinement.task_data = self.planning.task_data
+        self._load_planning()
+
+    @property
+    def prompt(self):
+        return '({}{}) '.format(
+            self.refinement.state['project'],
+            '*' if self.changed else '',
+        )
+
+    @property
+    def changed(self):
+        'True if there are planning changes not yet saved'
+        return len(self.planning._changed_tasks) > 0
+
+    def _print(self, message):
+        self.stdout.write('{}\n'.format(message))
+
+    def _load_planning(self):
+        self.planning.get_affected_tasks(
+            self.task_state,
+            self.refinement.state['project'],
+        )
+
+    def _task_ids(self, arg):
+        try:
+            return [int(task_id) for task_id in arg.split()]
+        except ValueError:
+            self._print('The task IDs must be numbers')
+            return []
+
+    def _next(self, arg, direction):
+        parentage = arg.strip()
+        if parentage != '' and parentage not in PARENTAGES:
+            self._print('Use one of {}'.format(', '.join(PARENTAGES)))
+            return
+
+        try:
+            if parentage != '':
+                self.refinement.next(parentage, direction)
+            else:
+                self._next_project(direction)
+        except IndexError:
+            self._print('There are no more projects in that direction')
+            return
+        self._load_planning()
+        self._print(self.refinement.summary())
+
+    def _next_project(self, direction):
+        'Try the next child, sibling and parent in that order'
+        for parentage in PARENTAGES[:-1]:
+            try:
+                return self.refinement.next(parentage, direction)
+            except IndexError:
+                pass
+        self.refinement.next('parent', direction)
+
+    def emptyline(self):
+        'Do nothing on an empty line instead of repeating the last command'
+        pass
+
+    def default(self, line):
+        self._print('Unknown command {}, type ? to list them'.format(line))
+
+    def do_n(self, arg):
+        'n [child|sibling|parent]: Go to the next project'
+        self._next(arg, 1)
+
+    def do_p(self, arg):
+        'p [child|sibling|parent]: Go to the previous project'
+        self._next(arg, -1)
+
+    def do_j(self, arg):
+        'j project: Jump to a project'
+        try:
+            self.refinement.jump(arg.strip())
+        except KeyError:
+            self._print('Project {} not found'.format(arg.strip()))
+            return
+        self._load_planning()
+        self._print(self.refinement.summary())
+
+    def do_l(self, arg):
+        'l: List the pending tasks of the project'
+        self.refinement.print_report(out=self.stdout)
+
+    def do_s(self, arg):
+        'Show the summary of the project'
+        self._print(self.refinement.summary())
+
+    def do_t(self, arg):
+        't [state]: Show the planning order of the tasks of the project'
+        if arg.strip() != '':
+            self.task_state = arg.strip()
+            self._load_planning()
+        for task in self.planning.tasks:
+            self._print('{:>4}  {:>6.2f}  {}'.format(
+                task['id'],
+                self.planning.urgencies[task['uuid']],
+                task['description'],
+            ))
+
+    def _move(self, arg, move):
+        for task_id in self._task_ids(arg):
+            try:
+                move(task_id, commit=False)
+            except ValueError as e:
+                self._print(e)
+
+    def do_u(self, arg):
+        'u task_id: Move the task up'
+        self._move(arg, self.planning.move_task_up)
+
+    def do_d(self, arg):
+        'd task_id: Move the task down'
+        self._move(arg, self.planning.move_task_down)
+
+    def do_o(self, arg):
+        'o task_id task_id ...: Sort the tasks in that order'
+        try:
+            self.planning.reorder(self._task_ids(arg), commit=False)
+        except ValueError as e:
+            self._print(e)
+
+    def do_w(self, arg):
+        'w: Save the planning changes'
+        if self.changed:
+            self.planning.commit()
+        self._print('Saved')
+
+    def do_q(self, arg):
+        'q: Save the planning changes and quit'
+        self.do_w(arg)
+        return True
+
+    def do_x(self, arg):
+        'x: Quit without saving the planning changes'
+        return True
+
+    do_EOF = do_q
@@ -0,0 +1,180 @@
+import sys
+import time
+import functools
+import threading
+import contextlib
+
+# Audit events raised when Python starts a process
+SPAWN_EVENTS = {
+    'os.fork',
+    'os.posix_spawn',
+    'os.spawn',
+    'os.system',
+    'subprocess.Popen',
+}
+
+
+def _text(argument):
+    if isinstance(argument, bytes):
+        return argument.decode('utf-8', 'replace')
+    return str(argument)
+
+
+class SpawnLog():
+    """Record of the external commands run by taskban.
+
+    Every process started by Python is seen through an audit hook, so even
+    the commands run by the libraries are recorded. The call sites that
+    taskban knows about, like the Taskwarrior commands of tasklib, are
+    wrapped with command(), which also records their duration and the size
+    of their output and takes the processes started inside it. The
+    processes started elsewhere are recorded without duration.
+
+    Nothing is recorded until start() is called, the profiler starts it when
+    it's entered and stops it when it exits. The audit hook is only
+    installed by the first start(), and while the log is stopped it returns
+    on the first check.
+
+    Each record is a dictionary with the command, its arguments, the
+    seconds and output_bytes, None if unknown, and the number of processes
+    it started"""
+
+    def __init__(self):
+        self.records = []
+        self.processes = 0
+        self.audited = False
+        self.active = False
+        # The commands running in each thread
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def _running(self):
+        if not hasattr(self._local, 'running'):
+            self._local.running = []
+        return self._local.running
+
+    def clear(self):
+        with self._lock:
+            self.records = []
+            self.processes = 0
+
+    def install(self):
+        'Start seeing the processes through an audit hook, once'
+        if not self.audited and hasattr(sys, 'addaudithook'):
+            sys.addaudithook(self._audit)
+            self.audited = True
+
+    def start(self):
+        'Clear the log and record the commands run from now on'
+        self.clear()
+        self.install()
+        self.active = True
+
+    def stop(self):
+        'Stop recording, the records are kept until the next start'
+        self.active = False
+
+    def _audit(self, event, arguments):
+        if not self.active or event not in SPAWN_EVENTS:
+            return
+        with self._lock:
+            self.processes += 1
+        if len(self._running) > 0:
+            self._running[-1]['processes'] += 1
+            return
+        if event == 'subprocess.Popen':
+            command = arguments[1]
+            if isinstance(command, (str, bytes)):
+                command = [command]
+            command = [_text(argument) for argument in command]
+        elif event == 'os.system':
+            command = _text(arguments[0]).split()
+        else:
+            command = [event]
+        self.records.append({
+            'command': command[0] if len(command) > 0 else event,
+            'arguments': command[1:],
+            'seconds': None,
+            'output_bytes': None,
+            'processes': 1,
+        })
+
+    @contextlib.contextmanager
+    def command(self, command, arguments):
+        '''Record the external command run inside the block with its
+        duration. The block can set the output_bytes of the yielded record.
+
+        If the block didn't start any process or the log is stopped the
+        command isn't recorded'''
+        record = {
+            'command': command,
+            'arguments': [str(argument) for argument in arguments],
+            'seconds': None,
+            'output_bytes': None,
+            'processes': 0,
+        }
+        self._running.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            self._running.pop()
+            if self.active:
+                self._record(record)
+
+    def _record(self, record):
+        if not self.audited:
+            # Without audit hooks assume the command started a process
+            record['processes'] = 1
+            with self._lock:
+                self.processes += 1
+        if record['processes'] > 0:
+            self.records.append(record)
+
+    def totals(self, records=None):
+        '''Return the number of processes, commands, seconds and output bytes
+        of the records, all of them by default'''
+        if records is None:
+            records = self.records
+        return {
+            'processes': sum(record['processes'] for record in records),
+            'commands': len(records),
+            'seconds': sum(record['seconds'] or 0 for record in records),
+            'output_bytes': sum(
+                record['output_bytes'] or 0 for record in records
+            ),
+        }
+
+
+log = SpawnLog()
+
+
+def _output_bytes(output):
+    'Size of the output of tasklib execute_command'
+    if isinstance(output, tuple):
+        output = output[0]
+    if isinstance(output, (str, bytes)):
+        return len(output)
+    try:
+        return sum(len(line) + 1 for line in output)
+    except TypeError:
+        return None
+
+
+def instrument_backend(backend):
+    '''Record the commands of a tasklib TaskWarrior. All of its Taskwarrior
+    calls, the task filters and saves, the imports, the date conversions or
+    the projects, go through its execute_command'''
+    execute_command = backend.execute_command
+
+    @functools.wraps(execute_command)
+    def recorded_execute_command(args, *other_args, **kwargs):
+        with log.command('task', args) as record:
+            output = execute_command(args, *other_args, **kwargs)
+            record['output_bytes'] = _output_bytes(output)
+        return output
+
+    backend.execute_command = recorded_execute_command
+    return backend
@@ -0,0 +1,91 @@
+import re
+
+try:
+    import wcwidth
+except ImportError:
+    wcwidth = None
+
+# Extra space of each column over the width of its header
+MIN_PADDING = 2
+COLUMN_SEPARATOR = '  '
+
+_invisible_codes = re.compile(r'\x1b\[\d+[;\d]*m|\x1b\[\d*\;\d*\;\d*m')
+
+
+def text_width(text):
+    '''Width of the text once printed, ignoring the ANSI color codes and
+    counting the wide characters twice if wcwidth is installed'''
+    text = _invisible_codes.sub('', text)
+    if wcwidth is not None:
+        return wcwidth.wcswidth(text)
+    return len(text)
+
+
+def format_cell(value):
+    'Text of a cell, empty for None'
+    if value is None:
+        return ''
+    return '{}'.format(value).strip()
+
+
+class Table():
+    """Fixed width text table with the layout of the simple format of
+    tabulate when every column is aligned to the left, which is what the
+    reports get as their columns mix numbers and text.
+
+    The cells are formatted and the column widths updated as the rows are
+    added, so write() only has to pad each cell and send the lines to the
+    output one by one"""
+
+    def __init__(self, headers):
+        self.headers = headers
+        self.minimum_widths = [
+            text_width(header) + MIN_PADDING for header in headers
+        ]
+        self.widths = list(self.minimum_widths)
+        self.rows = []
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add_row(self, row):
+        cells = []
+        for column, value in enumerate(row):
+            cell = format_cell(value)
+            width = text_width(cell)
+            if width > self.widths[column]:
+                self.widths[column] = width
+            cells.append((cell, width))
+        self.rows.append(cells)
+
+    def _line(self, cells, widths):
+        return COLUMN_SEPARATOR.join(
+            cell + ' ' * (widths[column] - width)
+            for column, (cell, width) in enumerate(cells)
+        ).rstrip()
+
+    def _header_widths(self):
+        '''tabulate measures the header of each column against the first cell
+        once padded, whose width is -1 if it has non printable characters'''
+        if len(self.rows) == 0:
+            return self.minimum_widths
+        return [
+            self.widths[column] if width >= 0 else
+            self.minimum_widths[column]
+            for column, (cell, width) in enumerate(self.rows[0])
+        ]
+
+    def write(self, out):
+        'Write the table to out, without the trailing newline'
+        header_widths = self._header_widths()
+        out.write(self._line(
+            [(header, text_width(header)) for header in self.headers],
+            header_widths,
+        ))
+        out.write('\n')
+        out.write(
+            COLUMN_SEPARATOR.join('-' * width for width in header_widths),
+        )
+        for cells in self.rows:
+            out.write('\n')
+            out.write(self._line(cells, self.widths))
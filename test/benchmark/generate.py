@@ -0,0 +1,323 @@
+'''Generate a synthetic Taskwarrior data directory to benchmark taskban.
+
+The directory mirrors the layout of test/: data/ holds pending.data,
+completed.data and undo.data, config/ the taskrc and the taskban config, and
+taskban/ is the taskban data directory.
+
+    python -m test.benchmark.generate /tmp/bench --tasks 100000
+
+The tasks are spread over a tree of projects, and each one has a history of
+start and stop transactions in undo.data. The transactions are written in
+time order, in windows of CHUNK_SIZE tasks, like Taskwarrior appends them'''
+
+import os
+import sys
+import time
+import uuid
+import random
+import shutil
+import argparse
+
+CHUNK_SIZE = 1000
+PENDING_STATES = ['backlog', 'backlog', 'backlog', 'todo', 'todo', 'doing',
+                  'test', 'blocked']
+ESTIMATES = ['0.5', '1', '2', '3', '5', '8']
+ORDS = [round(step * 0.1, 1) for step in range(-20, 41)]
+WORDS = ['fix', 'add', 'review', 'refactor', 'document', 'deploy', 'test',
+         'the', 'parser', 'report', 'backup', 'server', 'invoice', 'meeting',
+         'migration', 'dashboard', '"quoted"', '[bracketed]', 'élan']
+
+CONFIG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'config',
+)
+
+
+def project_names(depth, fanout):
+    '''Return the names of a tree of projects with fanout children per
+    project, depth levels deep'''
+    names = []
+    level = [None]
+    for depth_level in range(depth):
+        next_level = []
+        for parent in level:
+            for child in range(fanout):
+                if parent is None:
+                    name = 'project-{}'.format(child)
+                else:
+                    name = '{}.sub-{}-{}'.format(parent, depth_level, child)
+                next_level.append(name)
+        names.extend(next_level)
+        level = next_level
+    return names
+
+
+def _encode_value(value):
+    'Escape the value like Taskwarrior does in the FF4 format'
+    return value.replace(
+        '"', '&dquot;',
+    ).replace(
+        '[', '&open;',
+    ).replace(
+        ']', '&close;',
+    )
+
+
+def format_task(task):
+    'Return the FF4 line of a task, with the attributes sorted by name'
+    return '[{}]'.format(' '.join(
+        '{}:"{}"'.format(key, _encode_value(value))
+        for key, value in sorted(task.items())
+    ))
+
+
+class Generator():
+    """Writer of a synthetic data directory.
+
+    Each task is created with an entry date inside the time window of its
+    chunk, worked on with up to max_starts start and stop transactions and,
+    with a probability of completed_ratio, completed. The last chunk ends
+    at the end timestamp, so the most recent tasks are the ones modified in
+    the last days"""
+
+    def __init__(
+        self,
+        path,
+        tasks=10000,
+        completed_ratio=0.7,
+        depth=3,
+        fanout=5,
+        max_starts=20,
+        days=90,
+        seed=0,
+        end=None,
+    ):
+        self.path = path
+        self.tasks = tasks
+        self.completed_ratio = completed_ratio
+        self.projects = project_names(depth, fanout)
+        self.max_starts = max_starts
+        self.days = days
+        self.random = random.Random(seed)
+        self.end = int(time.time()) if end is None else end
+        self.stats = {
+            'pending': 0,
+            'completed': 0,
+            'projects': len(self.projects),
+            'transactions': 0,
+        }
+
+    @property
+    def data_path(self):
+        return os.path.join(self.path, 'data')
+
+    @property
+    def config_path(self):
+        return os.path.join(self.path, 'config')
+
+    @property
+    def taskban_path(self):
+        return os.path.join(self.path, 'taskban')
+
+    def _description(self):
+        return ' '.join(
+            self.random.choice(WORDS)
+            for word in range(self.random.randint(2, 8))
+        ).capitalize()
+
+    def _task(self, entry):
+        task = {
+            'description': self._description(),
+            'entry': str(entry),
+            'modified': str(entry),
+            'pm': self.random.choice(PENDING_STATES),
+            'project': self.random.choice(self.projects),
+            'status': 'pending',
+            'uuid': str(uuid.UUID(
+                int=self.random.getrandbits(128),
+                version=4,
+            )),
+        }
+        if self.random.random() < 0.7:
+            task['est'] = self.random.choice(ESTIMATES)
+        if self.random.random() < 0.5:
+            task['ov'] = self.random.choice(ESTIMATES)
+        if self.random.random() < 0.2:
+            task['ord'] = str(self.random.choice(ORDS))
+        return task
+
+    def _transactions(self, entry, window_end):
+        '''Return the task and the list of (time, old, new) transactions of
+        its life between entry and window_end'''
+        task = self._task(entry)
+        transactions = [(entry, None, dict(task))]
+        starts = sorted(
+            self.random.randint(entry + 1, window_end - 1)
+            for start in range(self.random.randint(0, self.max_starts))
+            if window_end - entry > 2
+        )
+        last = entry
+        for index, start in enumerate(starts):
+            if start <= last:
+                continue
+            old = dict(task)
+            task['start'] = str(start)
+            task['modified'] = str(start)
+            transactions.append((start, old, dict(task)))
+
+            if index + 1 < len(starts):
+                next_start = starts[index + 1]
+            else:
+                next_start = window_end
+            stop = start + self.random.randint(300, 3 * 3600)
+            last = max(start + 1, min(stop, next_start - 1))
+            old = dict(task)
+            del task['start']
+            task['modified'] = str(last)
+            transactions.append((last, old, dict(task)))
+
+        if self.random.random() < self.completed_ratio:
+            end = self.random.randint(last, max(last, window_end - 1))
+            old = dict(task)
+            task['status'] = 'completed'
+            task['end'] = str(end)
+            task['modified'] = str(end)
+            transactions.append((end, old, dict(task)))
+        return task, transactions
+
+    def _write_chunk(self, first_entry, window_end, size, files):
+        pending, completed, undo = files
+        transactions = []
+        for index in range(size):
+            entry = self.random.randint(first_entry, window_end - 1)
+            task, task_transactions = self._transactions(entry, window_end)
+            if task['status'] == 'completed':
+                completed.write(format_task(task) + '\n')
+                self.stats['completed'] += 1
+            else:
+                pending.write(format_task(task) + '\n')
+                self.stats['pending'] += 1
+            transactions.extend(task_transactions)
+
+        transactions.sort(key=lambda transaction: transaction[0])
+        for transaction_time, old, new in transactions:
+            undo.write('time {}\n'.format(transaction_time))
+            if old is not None:
+                undo.write('old {}\n'.format(format_task(old)))
+            undo.write('new {}\n---\n'.format(format_task(new)))
+        self.stats['transactions'] += len(transactions)
+
+    def write_config(self):
+        '''Copy the test configuration, adding the ov UDA and the urgency
+        coefficients of the ords of the tasks to the taskrc'''
+        os.makedirs(self.config_path, exist_ok=True)
+        shutil.copy(
+            os.path.join(CONFIG_PATH, 'config.yaml'),
+            os.path.join(self.config_path, 'config.yaml'),
+        )
+        with open(os.path.join(CONFIG_PATH, 'taskrc'), 'r') as f:
+            lines = [
+                line for line in f.read().splitlines()
+                if not line.startswith('urgency.uda.ord.') and
+                not line.startswith('history.cache')
+            ]
+        lines.extend(['uda.ov.type=numeric', 'uda.ov.label=Overestimate'])
+        for task_ord in ORDS:
+            lines.append('urgency.uda.ord.{}.coefficient={}'.format(
+                task_ord,
+                task_ord,
+            ))
+            lines.append('urgency.uda.ord.{0:06f}.coefficient={0}'.format(
+                task_ord,
+            ))
+        with open(os.path.join(self.config_path, 'taskrc'), 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def write(self):
+        'Write the data directory and return the stats of what was written'
+        os.makedirs(self.data_path, exist_ok=True)
+        os.makedirs(self.taskban_path, exist_ok=True)
+        self.write_config()
+
+        chunks = max(1, -(-self.tasks // CHUNK_SIZE))
+        first_entry = self.end - self.days * 86400
+        window = (self.end - first_entry) // chunks
+        pending = open(os.path.join(self.data_path, 'pending.data'), 'w')
+        completed = open(os.path.join(self.data_path, 'completed.data'), 'w')
+        undo = open(os.path.join(self.data_path, 'undo.data'), 'w')
+        with pending, completed, undo:
+            for chunk in range(chunks):
+                size = min(CHUNK_SIZE, self.tasks - chunk * CHUNK_SIZE)
+                window_start = first_entry + chunk * window
+                window_end = self.end if chunk == chunks - 1 else \
+                    window_start + window
+                self._write_chunk(
+                    window_start,
+                    window_end,
+                    size,
+                    (pending, completed, undo),
+                )
+        return self.stats
+
+
+def add_arguments(parser):
+    'Add the arguments of the size and shape of the data to the parser'
+    parser.add_argument('--tasks', type=int, default=10000)
+    parser.add_argument('--completed_ratio', type=float, default=0.7)
+    parser.add_argument('--depth', type=int, default=3, help='Project levels')
+    parser.add_argument(
+        '--fanout',
+        type=int,
+        default=5,
+        help='Subprojects of each project',
+    )
+    parser.add_argument(
+        '--max_starts',
+        type=int,
+        default=20,
+        help='Maximum start and stop cycles of each task',
+    )
+    parser.add_argument(
+        '--days',
+        type=int,
+        default=90,
+        help='Days of history to generate',
+    )
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def load_parser():
+    parser = argparse.ArgumentParser(
+        description='Generate a synthetic Taskwarrior data directory',
+    )
+    parser.add_argument('path', help='Directory to write the data to')
+    add_arguments(parser)
+    return parser
+
+
+def generator_arguments(args):
+    'Return the Generator keyword arguments of the parsed arguments'
+    return {
+        'tasks': args.tasks,
+        'completed_ratio': args.completed_ratio,
+        'depth': args.depth,
+        'fanout': args.fanout,
+        'max_starts': args.max_starts,
+        'days': args.days,
+        'seed': args.seed,
+    }
+
+
+def main(argv=None):
+    args = load_parser().parse_args(argv)
+    stats = Generator(args.path, **generator_arguments(args)).write()
+    sys.stdout.write(
+        'Written {pending} pending and {completed} completed tasks in '
+        '{projects} projects, with {transactions} transactions\n'.format(
+            **stats
+        ),
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,491 @@
+'''Benchmark the taskban subcommands on a synthetic data directory.
+
+    python -m test.benchmark.run --tasks 100000
+    python -m test.benchmark.run --data /tmp/bench --repeat 5 --format json
+
+Without --data a directory is generated with test.benchmark.generate in a
+temporary directory, removed at the end unless --keep is used.
+
+Each subcommand is run end to end in its own process, first without the
+taskban caches (cold) and then --repeat times with them (warm), measuring
+the wall and CPU time and the peak RSS of the process. Then the phases of
+each report are timed in process, in a fresh process per report so its
+peak RSS is not mixed with the others. The throughput is the number of
+tasks, or undo.data transactions for the history, processed per second.
+
+The processes spawned by each command are counted in one more cold run with
+--profile_json. With --check the benchmark fails if a command spawns more
+than its MAX_SPAWNS'''
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import statistics
+import subprocess
+from io import StringIO
+from test.benchmark.generate import Generator, add_arguments, \
+    generator_arguments
+
+REPOSITORY_PATH = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+)
+CACHE_FILES = [
+    'history.json',
+    'projects.json',
+    'completion.json',
+    'refinement.yaml',
+]
+REPORTS = ['ocupation', 'refine', 'plan']
+# Processes each end to end command may spawn: the reports read the data
+# files in process, `plan up` only needs `task --version` and `task import`
+MAX_SPAWNS = {
+    'ocupation': 0,
+    'refine next': 0,
+    'plan up': 2,
+}
+
+
+class Paths():
+    'Paths of a directory written by test.benchmark.generate'
+
+    def __init__(self, path):
+        self.path = path
+        self.data_path = os.path.join(path, 'data')
+        self.taskrc_path = os.path.join(path, 'config', 'taskrc')
+        self.config_path = os.path.join(path, 'config', 'config.yaml')
+        self.taskban_path = os.path.join(path, 'taskban')
+
+    def report_arguments(self):
+        return {
+            'task_data_path': self.data_path,
+            'taskrc_path': self.taskrc_path,
+            'config_path': self.config_path,
+            'data_path': self.taskban_path,
+        }
+
+    def command(self, arguments):
+        'Command line to run taskban with the subcommand arguments'
+        return [
+            sys.executable,
+            '-c',
+            'import taskban; taskban.main()',
+            '-q',
+            '-d', self.data_path,
+            '--taskrc_path', self.taskrc_path,
+            '-f', self.config_path,
+            '-D', self.taskban_path,
+        ] + arguments
+
+    def clear_caches(self):
+        for cache_file in CACHE_FILES:
+            try:
+                os.remove(os.path.join(self.taskban_path, cache_file))
+            except FileNotFoundError:
+                pass
+
+
+def count_lines(path):
+    with open(path, 'rb') as f:
+        return sum(1 for line in f)
+
+
+def peak_rss():
+    'Peak resident memory of the process in KiB'
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return rss // 1024
+    return rss
+
+
+def run_process(command):
+    '''Run the command and return its wall time, CPU time and peak RSS in
+    KiB, raising CalledProcessError if it fails'''
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [REPOSITORY_PATH] + [
+            path for path in env.get('PYTHONPATH', '').split(os.pathsep)
+            if path != ''
+        ]
+    )
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        env=env,
+    )
+    stderr = process.stderr.read()
+    pid, status, usage = os.wait4(process.pid, 0)
+    wall_time = time.perf_counter() - start
+    if os.WIFSIGNALED(status):
+        process.returncode = -os.WTERMSIG(status)
+    else:
+        process.returncode = os.WEXITSTATUS(status)
+    if process.returncode != 0:
+        sys.stderr.write(stderr.decode('utf-8'))
+        raise subprocess.CalledProcessError(
+            process.returncode,
+            command,
+            stderr=stderr,
+        )
+    rss = usage.ru_maxrss // 1024 if sys.platform == 'darwin' else \
+        usage.ru_maxrss
+    return wall_time, usage.ru_utime + usage.ru_stime, rss
+
+
+def todo_tasks(paths):
+    'Pending tasks in the todo state, the ones planned by default'
+    from taskban.data import TaskData
+    return TaskData(paths.data_path, paths.taskrc_path).filter(
+        status='pending',
+        pm='todo',
+    )
+
+
+def plan_task_id(tasks):
+    'Id of the least urgent task, so `plan up` has somewhere to go'
+    return min(tasks, key=lambda task: task['urgency'])['id']
+
+
+def end_to_end_commands(paths):
+    '''Return the name, arguments and requirement of each command. The
+    requirement is the binary it needs to run, if any'''
+    return [
+        ('ocupation', ['ocupation', '-p', '1w'], None),
+        ('refine next', ['refine', 'next', 'sibling'], None),
+        (
+            'plan up',
+            ['plan', str(plan_task_id(todo_tasks(paths))), 'up'],
+            'task',
+        ),
+    ]
+
+
+def count_spawns(paths, arguments):
+    '''Run the command without the taskban caches and return the totals of
+    the external commands it ran'''
+    paths.clear_caches()
+    profile_file, profile_path = tempfile.mkstemp(suffix='.json')
+    os.close(profile_file)
+    try:
+        run_process(paths.command(['--profile_json', profile_path]) +
+                    arguments)
+        with open(profile_path, 'r') as f:
+            return json.load(f)['spawn_totals']
+    finally:
+        os.remove(profile_path)
+
+
+def benchmark_end_to_end(paths, tasks, repeat):
+    results = []
+    for name, arguments, requirement in end_to_end_commands(paths):
+        if requirement is not None and shutil.which(requirement) is None:
+            results.append({
+                'name': name,
+                'skipped': '{} not installed'.format(requirement),
+            })
+            continue
+        paths.clear_caches()
+        runs = [run_process(paths.command(arguments))
+                for run in range(repeat + 1)]
+        spawns = count_spawns(paths, arguments)
+        cold = runs[0]
+        warm = [statistics.median(measures) for measures in zip(*runs[1:])] \
+            if repeat > 0 else cold
+        results.append({
+            'name': name,
+            'cold_seconds': cold[0],
+            'warm_seconds': warm[0],
+            'warm_cpu_seconds': warm[1],
+            'tasks_per_second': tasks / warm[0],
+            'peak_rss_kib': max(run[2] for run in runs),
+            'spawns': spawns['processes'],
+            'max_spawns': MAX_SPAWNS[name],
+        })
+    return results
+
+
+def spawn_failures(results):
+    'Return the messages of the commands that spawned too many processes'
+    return [
+        '{name} spawned {spawns} processes, the maximum is '
+        '{max_spawns}'.format(**command)
+        for command in results['end_to_end']
+        if 'skipped' not in command and
+        command['spawns'] > command['max_spawns']
+    ]
+
+
+class PhaseTimer():
+    'Time the phases of a report run in this process'
+
+    def __init__(self):
+        self.phases = []
+
+    def time(self, name, function, items):
+        '''Run the function and record its time, the throughput of the items
+        it processes and the peak RSS of the process after it'''
+        start = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start
+        self.phases.append({
+            'name': name,
+            'seconds': seconds,
+            'items_per_second': items / seconds if seconds > 0 else None,
+            'peak_rss_kib': peak_rss(),
+        })
+        return result
+
+
+def ocupation_phases(paths, timer):
+    from taskban.data import TaskData
+    from taskban.history import History
+    from taskban.reports import KanbanReport
+
+    task_data = TaskData(paths.data_path, paths.taskrc_path)
+    pending = timer.time(
+        'parse pending.data',
+        lambda: task_data.pending,
+        count_lines(os.path.join(paths.data_path, 'pending.data')),
+    )
+    completed = timer.time(
+        'parse completed.data',
+        lambda: task_data.completed,
+        count_lines(os.path.join(paths.data_path, 'completed.data')),
+    )
+    tasks = len(pending) + len(completed)
+    with open(os.path.join(paths.data_path, 'undo.data'), 'rb') as f:
+        transactions = sum(1 for line in f if line == b'---\n')
+    history = History(
+        os.path.join(paths.data_path, 'undo.data'),
+        os.path.join(paths.taskban_path, 'history.json'),
+    )
+    timer.time('parse undo.data', history.load, transactions)
+    report = timer.time(
+        'snapshot',
+        lambda: KanbanReport(
+            start_date='1w',
+            task_data=task_data,
+            history=history,
+            **paths.report_arguments()
+        ),
+        tasks,
+    )
+    timer.time(
+        'render markdown',
+        lambda: report.print_report(show_inactive=True, out=StringIO()),
+        tasks,
+    )
+    timer.time(
+        'render jsonl',
+        lambda: report.export_report(
+            'jsonl',
+            show_inactive=True,
+            out=StringIO(),
+        ),
+        tasks,
+    )
+
+
+def refine_phases(paths, timer):
+    from taskban.reports import RefinementReport
+
+    # The report parses pending.data and builds the project tree on load
+    report = timer.time(
+        'load refinement',
+        lambda: RefinementReport(**paths.report_arguments()),
+        count_lines(os.path.join(paths.data_path, 'pending.data')),
+    )
+    tasks = len(report.task_data.pending)
+    timer.time('next', lambda: report.next('sibling'), tasks)
+    timer.time('render', lambda: report.print_report(out=StringIO()), tasks)
+
+
+def plan_phases(paths, timer):
+    from taskban.reports import PlanningReport
+
+    tasks = todo_tasks(paths)
+    task_id = plan_task_id(tasks)
+    tasks = len(tasks)
+    report = timer.time(
+        'load planning',
+        lambda: PlanningReport(**paths.report_arguments()),
+        tasks,
+    )
+    timer.time(
+        'move up',
+        lambda: report.move_task_up(task_id, commit=False),
+        tasks,
+    )
+    timer.time(
+        'reorder',
+        lambda: report.reorder(
+            [task['id'] for task in reversed(report.tasks)],
+            commit=False,
+        ),
+        tasks,
+    )
+
+
+PHASES = {
+    'ocupation': ocupation_phases,
+    'refine': refine_phases,
+    'plan': plan_phases,
+}
+
+
+def benchmark_phases(paths):
+    'Time the phases of each report in its own process'
+    results = []
+    for report in REPORTS:
+        paths.clear_caches()
+        output = subprocess.check_output(
+            [
+                sys.executable,
+                '-m',
+                'test.benchmark.run',
+                '--data', paths.path,
+                '--phases_of', report,
+            ],
+            cwd=REPOSITORY_PATH,
+        )
+        for phase in json.loads(output.decode('utf-8')):
+            phase['report'] = report
+            results.append(phase)
+    return results
+
+
+def _number(value, digits=3):
+    if value is None:
+        return ''
+    return round(value, digits)
+
+
+def print_results(results, out=sys.stdout):
+    from taskban.tables import Table
+
+    out.write('# Benchmark of {tasks} tasks\n\n'.format(**results))
+    out.write('## End to end\n\n')
+    table = Table(['Command', 'Cold s', 'Warm s', 'Warm CPU s', 'Tasks/s',
+                   'Peak RSS MiB', 'Spawns'])
+    for command in results['end_to_end']:
+        if 'skipped' in command:
+            table.add_row([command['name'], 'skipped: {}'.format(
+                command['skipped'],
+            ), '', '', '', '', ''])
+            continue
+        table.add_row([
+            command['name'],
+            _number(command['cold_seconds']),
+            _number(command['warm_seconds']),
+            _number(command['warm_cpu_seconds']),
+            _number(command['tasks_per_second'], 0),
+            _number(command['peak_rss_kib'] / 1024, 1),
+            '{spawns}/{max_spawns}'.format(**command),
+        ])
+    table.write(out)
+
+    out.write('\n\n## Phases\n\n')
+    table = Table(['Report', 'Phase', 'Seconds', 'Items/s', 'Peak RSS MiB'])
+    for phase in results['phases']:
+        table.add_row([
+            phase['report'],
+            phase['name'],
+            _number(phase['seconds']),
+            _number(phase['items_per_second'], 0),
+            _number(phase['peak_rss_kib'] / 1024, 1),
+        ])
+    table.write(out)
+    out.write('\n')
+
+
+def load_parser():
+    parser = argparse.ArgumentParser(
+        description='Benchmark taskban on a synthetic data directory',
+    )
+    add_arguments(parser)
+    parser.add_argument(
+        '--data',
+        help='Directory written by test.benchmark.generate, if not given a '
+        'new one is generated',
+    )
+    parser.add_argument(
+        '--keep',
+        action='store_true',
+        help='Keep the generated directory',
+    )
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=3,
+        help='Warm runs of each command',
+    )
+    parser.add_argument(
+        '--format',
+        dest='output_format',
+        choices=['table', 'json'],
+        default='table',
+    )
+    parser.add_argument(
+        '--check',
+        action='store_true',
+        help='Fail if a command spawns more processes than its maximum',
+    )
+    parser.add_argument('--phases_of', choices=REPORTS, help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = load_parser().parse_args(argv)
+
+    if args.phases_of is not None:
+        timer = PhaseTimer()
+        PHASES[args.phases_of](Paths(args.data), timer)
+        sys.stdout.write(json.dumps(timer.phases))
+        return
+
+    path = args.data
+    if path is None:
+        path = tempfile.mkdtemp(prefix='taskban-benchmark-')
+        sys.stderr.write('Generating {} tasks in {}\n'.format(
+            args.tasks,
+            path,
+        ))
+        Generator(path, **generator_arguments(args)).write()
+    paths = Paths(path)
+
+    try:
+        from taskban.data import TaskData
+        task_data = TaskData(paths.data_path, paths.taskrc_path)
+        tasks = len(task_data.pending) + len(task_data.completed)
+        del task_data
+
+        results = {
+            'tasks': tasks,
+            'end_to_end': benchmark_end_to_end(paths, tasks, args.repeat),
+            'phases': benchmark_phases(paths),
+        }
+    finally:
+        if args.data is None and not args.keep:
+            shutil.rmtree(path)
+
+    if args.output_format == 'json':
+        sys.stdout.write(json.dumps(results, indent=2) + '\n')
+    else:
+        print_results(results)
+
+    if args.check:
+        failures = spawn_failures(results)
+        for failure in failures:
+            sys.stderr.write(failure + '\n')
+        if len(failures) > 0:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+import os
+import sys
+import shutil
+import taskban
+import unittest
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+from taskban.spawns import log as spawn_log
+from taskban.data import TaskData, parse_line
+from taskban.history import History
+from test.benchmark.run import MAX_SPAWNS, Paths, end_to_end_commands
+from test.benchmark.generate import Generator, project_names, format_task
+
+
+class TestGenerator(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.generator = Generator(
+            self.tmp,
+            tasks=50,
+            depth=2,
+            fanout=3,
+            max_starts=5,
+            days=10,
+            end=1528908861,
+        )
+        self.stats = self.generator.write()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_project_names(self):
+        self.assertEqual(
+            project_names(2, 2),
+            [
+                'project-0',
+                'project-1',
+                'project-0.sub-1-0',
+                'project-0.sub-1-1',
+                'project-1.sub-1-0',
+                'project-1.sub-1-1',
+            ],
+        )
+
+    def test_format_task_is_parsed_back(self):
+        task = {'description': 'Fix "the" [parser]', 'uuid': 'uuid'}
+        self.assertEqual(parse_line(format_task(task)), task)
+
+    def test_generated_tasks_are_parsed_by_taskban(self):
+        task_data = TaskData(
+            self.generator.data_path,
+            os.path.join(self.generator.config_path, 'taskrc'),
+        )
+        self.assertEqual(len(task_data.pending), self.stats['pending'])
+        self.assertEqual(len(task_data.completed), self.stats['completed'])
+        self.assertEqual(self.stats['pending'] + self.stats['completed'], 50)
+        self.assertTrue(
+            all(task['project'] in project_names(2, 3)
+                for task in task_data.pending),
+        )
+
+    def test_generated_history_is_parsed_by_taskban(self):
+        history = History(
+            os.path.join(self.generator.data_path, 'undo.data'),
+            os.path.join(self.generator.taskban_path, 'history.json'),
+        )
+        history.load()
+        self.assertGreater(len(history.intervals), 0)
+        for intervals in history.intervals.values():
+            for start, stop in intervals:
+                self.assertLess(start, stop)
+                self.assertLessEqual(stop, 1528908861)
+
+    def test_generator_is_deterministic(self):
+        other_tmp = tempfile.mkdtemp()
+        try:
+            Generator(
+                other_tmp,
+                tasks=50,
+                depth=2,
+                fanout=3,
+                max_starts=5,
+                days=10,
+                end=1528908861,
+            ).write()
+            for data_file in ['pending.data', 'completed.data', 'undo.data']:
+                with open(os.path.join(self.tmp, 'data', data_file)) as f:
+                    expected = f.read()
+                with open(os.path.join(other_tmp, 'data', data_file)) as f:
+                    self.assertEqual(f.read(), expected)
+        finally:
+            shutil.rmtree(other_tmp)
+
+
+class TestSpawns(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        Generator(
+            self.tmp,
+            tasks=50,
+            depth=2,
+            fanout=3,
+            max_starts=5,
+            days=10,
+        ).write()
+        self.paths = Paths(self.tmp)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_commands_do_not_spawn_more_than_their_maximum(self):
+        for name, arguments, requirement in end_to_end_commands(self.paths):
+            if requirement is not None and shutil.which(requirement) is None:
+                continue
+            spawn_log.start()
+            argv = ['taskban'] + self.paths.command(arguments)[3:]
+            with patch.object(sys, 'argv', argv), \
+                    patch('sys.stdout', new_callable=StringIO):
+                taskban.main()
+            spawn_log.stop()
+            self.assertLessEqual(
+                spawn_log.processes,
+                MAX_SPAWNS[name],
+                '{} spawned {}'.format(name, spawn_log.records),
+            )
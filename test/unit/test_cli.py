@@ -55,6 +55,22 @@ class TestArgparse(unittest.TestCase):
         with self.assertRaises(SystemExit):
             self.parser.parse_args('')
 
+    def test_profile_is_off_by_default(self):
+        parsed = self.parser.parse_args(['ocupation'])
+        self.assertFalse(parsed.profile)
+        self.assertIsNone(parsed.profile_json)
+        self.assertFalse(parsed.profile_memory)
+
+    def test_can_specify_profile(self):
+        parsed = self.parser.parse_args(['--profile', 'ocupation'])
+        self.assertTrue(parsed.profile)
+
+    def test_can_specify_profile_json(self):
+        parsed = self.parser.parse_args(
+            ['--profile_json', 'profile.json', 'ocupation'],
+        )
+        self.assertEqual(parsed.profile_json, 'profile.json')
+
     def test_has_subcommand_ocupation(self):
         parsed = self.parser.parse_args(['ocupation'])
         self.assertEqual(parsed.subcommand, 'ocupation')
@@ -75,6 +91,25 @@ class TestArgparse(unittest.TestCase):
         parsed = self.parser.parse_args(['ocupation'])
         self.assertFalse(parsed.backlog)
 
+    def test_ocupation_default_format_is_markdown(self):
+        parsed = self.parser.parse_args(['ocupation'])
+        self.assertEqual(parsed.output_format, 'markdown')
+
+    def test_ocupation_can_specify_format(self):
+        parsed = self.parser.parse_args(['ocupation', '--format', 'csv'])
+        self.assertEqual(parsed.output_format, 'csv')
+
+    def test_ocupation_can_specify_members(self):
+        parsed = self.parser.parse_args(
+            ['ocupation', '-m', 'alice/.task', '--member', 'bob/*:taskrc'],
+        )
+        self.assertEqual(parsed.members, ['alice/.task', 'bob/*:taskrc'])
+        self.assertIsNone(parsed.workers)
+
+    def test_ocupation_can_specify_workers(self):
+        parsed = self.parser.parse_args(['ocupation', '--workers', '2'])
+        self.assertEqual(parsed.workers, 2)
+
     def test_has_subcommand_snapshot(self):
         parsed = self.parser.parse_args(['snapshot'])
         self.assertEqual(parsed.subcommand, 'snapshot')
@@ -128,6 +163,10 @@ class TestArgparse(unittest.TestCase):
         self.assertEqual(parsed.next_subcommand, 'jump')
         self.assertEqual(parsed.jump_project, 'my-first-project')
 
+    def test_refine_can_skip_empty_projects(self):
+        parsed = self.parser.parse_args(['refine', '--skip_empty', 'next'])
+        self.assertTrue(parsed.skip_empty)
+
     def test_has_subcommand_plan(self):
         parsed = self.parser.parse_args(['plan', '1', 'up'])
         self.assertEqual(parsed.subcommand, 'plan')
@@ -166,6 +205,34 @@ class TestArgparse(unittest.TestCase):
         )
         self.assertEqual(parsed.project, 'test')
 
+    def test_has_subcommand_reorder(self):
+        parsed = self.parser.parse_args(['reorder', '3', '1', '2'])
+        self.assertEqual(parsed.subcommand, 'reorder')
+        self.assertEqual(parsed.task_ids, [3, 1, 2])
+
+    def test_reorder_can_read_the_order_from_a_file(self):
+        parsed = self.parser.parse_args(['reorder', '--file', 'order.txt'])
+        self.assertEqual(parsed.order_file, 'order.txt')
+
+    def test_reorder_can_edit_the_order(self):
+        parsed = self.parser.parse_args(['reorder', '--edit'])
+        self.assertTrue(parsed.edit)
+
+    def test_reorder_cant_edit_and_read_a_file(self):
+        with self.assertRaises(SystemExit):
+            self.parser.parse_args(
+                ['reorder', '--edit', '--file', 'order.txt'],
+            )
+
+    def test_has_subcommand_session(self):
+        parsed = self.parser.parse_args(['session'])
+        self.assertEqual(parsed.subcommand, 'session')
+        self.assertEqual(parsed.task_status, 'todo')
+
+    def test_has_subcommand_serve(self):
+        parsed = self.parser.parse_args(['serve'])
+        self.assertEqual(parsed.subcommand, 'serve')
+
 class TestLogger(unittest.TestCase):
     @patch('taskban.cli.logging')
     def test_logger_is_configured_by_default(self, logMock):
@@ -0,0 +1,51 @@
+import os
+import shutil
+import unittest
+import tempfile
+from argparse import Namespace
+from taskban.completion import save_index, load_index, index_path, \
+    complete_projects, complete_task_ids, complete_states
+
+
+class TestCompletion(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.parsed_args = Namespace(data_path=self.tmp)
+        save_index(
+            self.tmp,
+            ['my-first-project', 'my-first-project.sub', 'my-second-project'],
+            {1: 'Backlog task 1', 12: 'Subproject task 2'},
+            ['todo', 'doing', 'done'],
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_load_index_without_index_is_empty(self):
+        os.remove(index_path(self.tmp))
+        self.assertEqual(
+            load_index(self.tmp),
+            {'projects': [], 'tasks': {}, 'states': []},
+        )
+
+    def test_complete_projects(self):
+        self.assertEqual(
+            complete_projects('my-first', self.parsed_args),
+            ['my-first-project', 'my-first-project.sub'],
+        )
+
+    def test_complete_task_ids_with_descriptions(self):
+        self.assertEqual(
+            complete_task_ids('1', self.parsed_args),
+            {'1': 'Backlog task 1', '12': 'Subproject task 2'},
+        )
+        self.assertEqual(
+            complete_task_ids('12', self.parsed_args),
+            {'12': 'Subproject task 2'},
+        )
+
+    def test_complete_states(self):
+        self.assertEqual(
+            complete_states('do', self.parsed_args),
+            ['doing', 'done'],
+        )
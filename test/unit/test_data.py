@@ -0,0 +1,178 @@
+import os
+import shutil
+import unittest
+import datetime
+import tempfile
+from taskban.data import TaskData, LocalTask, UnrecognisedTaskData, \
+    parse_line, load_taskrc
+
+
+class TestParseLine(unittest.TestCase):
+
+    def test_parse_line_returns_dictionary(self):
+        self.assertEqual(
+            parse_line('[description:"Task 1" pm:"backlog"]'),
+            {'description': 'Task 1', 'pm': 'backlog'},
+        )
+
+    def test_parse_line_decodes_escaped_values(self):
+        self.assertEqual(
+            parse_line(r'[description:"A \"quoted\" &open;task&close;"]'),
+            {'description': 'A "quoted" [task]'},
+        )
+
+    def test_parse_line_raises_on_unknown_format(self):
+        with self.assertRaises(UnrecognisedTaskData):
+            parse_line('{"description": "Task 1"}')
+
+    def test_parse_line_raises_on_garbage_between_attributes(self):
+        with self.assertRaises(UnrecognisedTaskData):
+            parse_line('[description:"Task 1" garbage pm:"backlog"]')
+
+
+class TestTaskData(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        shutil.rmtree(self.tmp)
+        shutil.copytree('test/data', os.path.join(self.tmp, 'data'))
+        shutil.copytree('test/config', os.path.join(self.tmp, 'config'))
+        self.config_path = os.path.join(self.tmp, 'config')
+        self.data_path = os.path.join(self.tmp, 'data')
+        self.task_data = TaskData(
+            self.data_path,
+            os.path.join(self.config_path, 'taskrc'),
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_load_taskrc(self):
+        config = load_taskrc(os.path.join(self.config_path, 'taskrc'))
+        self.assertEqual(config['uda.est.type'], 'numeric')
+        self.assertEqual(config['urgency.uda.ord.2.5.coefficient'], '2.5')
+
+    def test_pending_tasks_have_ids_in_file_order(self):
+        self.assertEqual(len(self.task_data.pending), 14)
+        self.assertEqual(self.task_data.pending[0]['id'], 1)
+        self.assertEqual(str(self.task_data.pending[0]), 'Backlog task 1')
+        self.assertEqual(self.task_data.pending[13]['id'], 14)
+
+    def test_completed_tasks_have_id_0(self):
+        self.assertEqual(self.task_data.completed[0]['id'], 0)
+
+    def write_pending(self, statuses):
+        with open(os.path.join(self.data_path, 'pending.data'), 'w') as f:
+            for index, status in enumerate(statuses):
+                f.write(
+                    '[description:"Task {0}" entry:"1517438251" '
+                    'status:"{1}" uuid:"{0}"]\n'.format(index, status),
+                )
+
+    def test_recurring_templates_have_ids(self):
+        self.write_pending(['recurring', 'pending', 'waiting'])
+        self.assertEqual(
+            [task['id'] for task in self.task_data.pending],
+            [1, 2, 3],
+        )
+
+    def test_pending_completed_tasks_have_ids_only_without_gc(self):
+        self.write_pending(['completed', 'pending', 'deleted', 'pending'])
+        self.assertEqual(
+            [task['id'] for task in self.task_data.pending],
+            [0, 1, 0, 2],
+        )
+        with open(os.path.join(self.config_path, 'taskrc'), 'a') as f:
+            f.write('gc=off\n')
+        task_data = TaskData(
+            self.data_path,
+            os.path.join(self.config_path, 'taskrc'),
+        )
+        self.assertEqual(
+            [task['id'] for task in task_data.pending],
+            [1, 2, 3, 4],
+        )
+
+    def test_tasks_are_local_tasks(self):
+        self.assertIsInstance(self.task_data.pending[0], LocalTask)
+
+    def test_unset_attributes_are_none(self):
+        self.assertEqual(self.task_data.pending[1]['est'], None)
+
+    def test_numeric_udas_are_deserialized(self):
+        self.assertEqual(self.task_data.pending[0]['est'], 0)
+        self.assertEqual(self.task_data.pending[0]['ord'], 3)
+        self.assertEqual(self.task_data.pending[7]['ord'], -0.5)
+
+    def test_dates_are_deserialized(self):
+        self.assertEqual(
+            self.task_data.pending[0]['entry'].timestamp(),
+            1517438251,
+        )
+
+    def test_urgency_uses_the_taskrc_coefficients(self):
+        self.assertEqual(self.task_data.pending[0]['urgency'], 4)
+        self.assertEqual(self.task_data.pending[3]['urgency'], 1)
+        self.assertEqual(self.task_data.pending[7]['urgency'], 0.5)
+
+    def test_urgency_of_user_tags_projects_and_uda_values(self):
+        with open(os.path.join(self.config_path, 'taskrc'), 'a') as f:
+            f.write(
+                'urgency.user.tag.urgent.coefficient=10\n'
+                'urgency.user.project.my-first.coefficient=20\n'
+                'urgency.uda.pm.coefficient=30\n'
+                'urgency.uda.pm.doing.coefficient=40\n'
+            )
+        with open(os.path.join(self.data_path, 'pending.data'), 'w') as f:
+            f.write(
+                '[description:"Task" pm:"doing" project:"my-first-project" '
+                'status:"pending" tags:"urgent" uuid:"1"]\n'
+            )
+        task_data = TaskData(
+            self.data_path,
+            os.path.join(self.config_path, 'taskrc'),
+        )
+        # Project 1, tags 0.8 times 1 and the user and uda coefficients
+        self.assertEqual(
+            round(task_data.pending[0]['urgency'], 3),
+            1 + 0.8 + 10 + 20 + 30 + 40,
+        )
+
+    def test_completed_tasks_urgency_is_computed_when_used(self):
+        task = self.task_data.completed[0]
+        self.assertNotIn('urgency', task._data)
+        self.assertIsInstance(task['urgency'], float)
+        self.assertIn('urgency', task._data)
+
+    def test_filter_by_status_and_pm(self):
+        tasks = self.task_data.filter(status='pending', pm='doing')
+        self.assertEqual(
+            [str(task) for task in tasks],
+            ['Doing task 1', 'Doing task 2'],
+        )
+
+    def test_filter_by_project_includes_subprojects(self):
+        tasks = self.task_data.filter(
+            status='pending',
+            pm='backlog',
+            project='my-first-project',
+        )
+        self.assertEqual(len(tasks), 6)
+
+    def test_filter_by_modified_after(self):
+        tasks = self.task_data.filter(
+            status='pending',
+            modified__after=datetime.datetime(
+                2018, 6, 1, tzinfo=datetime.timezone.utc,
+            ),
+        )
+        self.assertEqual(
+            [str(task) for task in tasks],
+            ['Backlog task 1', 'Backlog task 2', 'Backlog task 3',
+             'Doing task 2'],
+        )
+
+    def test_filter_raises_if_data_files_are_missing(self):
+        os.remove(os.path.join(self.data_path, 'pending.data'))
+        with self.assertRaises(UnrecognisedTaskData):
+            self.task_data.filter(status='pending')
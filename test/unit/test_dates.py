@@ -0,0 +1,80 @@
+import time
+import unittest
+import datetime
+from taskban.dates import convert_datetime_string, parse_date, \
+    parse_duration, local_now
+
+
+def local(*date_parts):
+    'Local datetime of the date parts, built through the epoch'
+    return datetime.datetime.fromtimestamp(
+        time.mktime(datetime.datetime(*date_parts).timetuple()),
+        tz=datetime.timezone.utc,
+    )
+
+
+class TestDates(unittest.TestCase):
+
+    def setUp(self):
+        self.now = local(2018, 6, 20, 15, 30)
+
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration('7d'), datetime.timedelta(days=7))
+        self.assertEqual(parse_duration('1w'), datetime.timedelta(days=7))
+        self.assertEqual(parse_duration('2 hours'), datetime.timedelta(hours=2))
+        self.assertEqual(parse_duration('1mo'), datetime.timedelta(days=30))
+        self.assertEqual(parse_duration('1y'), datetime.timedelta(days=365))
+
+    def test_parse_duration_raises_on_unknown_unit(self):
+        with self.assertRaises(ValueError):
+            parse_duration('7 fortnights')
+
+    def test_parse_date_now(self):
+        self.assertEqual(parse_date('now', self.now), self.now)
+
+    def test_parse_date_today(self):
+        self.assertEqual(
+            parse_date('today', self.now),
+            local(2018, 6, 20),
+        )
+
+    def test_parse_date_iso_date(self):
+        self.assertEqual(
+            parse_date('1984-01-01'),
+            local(1984, 1, 1),
+        )
+
+    def test_parse_date_returns_timezone_aware_datetimes(self):
+        self.assertIsNotNone(parse_date('1984-01-01').tzinfo)
+        self.assertEqual(
+            parse_date('1984-01-01').utcoffset(),
+            local(1984, 1, 1).astimezone().utcoffset(),
+        )
+
+    def test_local_now_is_timezone_aware(self):
+        now = local_now()
+        self.assertIsNotNone(now.tzinfo)
+        self.assertEqual(now.microsecond, 0)
+        self.assertLess(abs(now.timestamp() - time.time()), 2)
+
+    def test_convert_now_minus_duration(self):
+        self.assertEqual(
+            convert_datetime_string('now - 7d', self.now),
+            self.now - datetime.timedelta(days=7),
+        )
+
+    def test_convert_date_plus_duration(self):
+        self.assertEqual(
+            convert_datetime_string('1984-01-01 + 1d', self.now),
+            local(1984, 1, 2),
+        )
+
+    def test_convert_bare_duration_is_subtracted_from_now(self):
+        self.assertEqual(
+            convert_datetime_string('1w', self.now),
+            self.now - datetime.timedelta(weeks=1),
+        )
+
+    def test_convert_raises_on_unsupported_expressions(self):
+        with self.assertRaises(ValueError):
+            convert_datetime_string('eom', self.now)
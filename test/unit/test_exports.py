@@ -0,0 +1,77 @@
+import json
+import unittest
+from io import StringIO
+from taskban.exports import RECORD_FIELDS, TEAM_RECORD_FIELDS, \
+    write_records
+
+RECORDS = [
+    {
+        'type': 'task',
+        'state': 'done',
+        'project': 'my-first-project',
+        'id': 0,
+        'ov': None,
+        'est': 1.5,
+        'active': 69,
+        'progress': 1.3,
+        'description': 'Done task 1',
+    },
+    {
+        'type': 'total',
+        'state': 'done',
+        'project': 'my-first-project',
+        'id': None,
+        'ov': 0,
+        'est': 1.5,
+        'active': 69,
+        'progress': None,
+        'description': None,
+    },
+]
+
+
+class TestWriteRecords(unittest.TestCase):
+    def write(self, output_format, records=RECORDS):
+        out = StringIO()
+        write_records(output_format, iter(records), out)
+        return out.getvalue()
+
+    def test_write_json(self):
+        self.assertEqual(json.loads(self.write('json')), RECORDS)
+
+    def test_write_json_without_records(self):
+        self.assertEqual(json.loads(self.write('json', [])), [])
+
+    def test_write_jsonl(self):
+        self.assertEqual(
+            [json.loads(line) for line in self.write('jsonl').splitlines()],
+            RECORDS,
+        )
+
+    def test_write_csv(self):
+        lines = self.write('csv').splitlines()
+        self.assertEqual(lines[0], ','.join(RECORD_FIELDS))
+        self.assertEqual(
+            lines[1],
+            'task,done,my-first-project,0,,1.5,69,1.3,Done task 1',
+        )
+        self.assertEqual(lines[2], 'total,done,my-first-project,,0,1.5,69,,')
+
+    def test_write_csv_with_other_fields(self):
+        out = StringIO()
+        write_records(
+            'csv',
+            [dict(RECORDS[0], person='alice')],
+            out,
+            TEAM_RECORD_FIELDS,
+        )
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], ','.join(TEAM_RECORD_FIELDS))
+        self.assertEqual(
+            lines[1],
+            'task,alice,done,my-first-project,0,,1.5,69,1.3,Done task 1',
+        )
+
+    def test_write_unknown_format_raises_error(self):
+        with self.assertRaises(ValueError):
+            self.write('xml')
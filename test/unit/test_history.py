@@ -0,0 +1,261 @@
+import os
+import json
+import random
+import shutil
+import unittest
+import datetime
+import tempfile
+from unittest.mock import patch
+from taskban.history import History, ActiveTimeIndex, \
+    VectorActiveTimeIndex, numpy
+
+DONE_TASK_UUID = '13c2ea35-b7c1-4fe2-9945-b8dc16d58996'
+STARTED_TRANSACTION = \
+    'time 1600000000\n' \
+    'old [description:"Backlog task 1" status:"pending" ' \
+    'uuid:"fc840176-420c-477f-a1e2-4c021b8bc1e9"]\n' \
+    'new [description:"Backlog task 1" start:"1600000000" ' \
+    'status:"pending" uuid:"fc840176-420c-477f-a1e2-4c021b8bc1e9"]\n' \
+    '---\n'
+
+
+class TestHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        shutil.rmtree(self.tmp)
+        shutil.copytree('test/data', os.path.join(self.tmp, 'data'))
+        self.data_path = os.path.join(self.tmp, 'data')
+        self.undo_path = os.path.join(self.data_path, 'undo.data')
+        self.checkpoint_path = os.path.join(self.tmp, 'history.json')
+        self.history = History(self.undo_path, self.checkpoint_path).load()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_history_extracts_active_intervals(self):
+        self.assertEqual(
+            self.history.intervals[DONE_TASK_UUID],
+            [[1517438373, 1517438442]],
+        )
+
+    def test_history_active_time_of_all_time(self):
+        self.assertEqual(self.history.active_time(DONE_TASK_UUID), 69)
+
+    def test_history_active_time_since_date(self):
+        self.assertEqual(
+            self.history.active_time(
+                DONE_TASK_UUID,
+                datetime.datetime.fromtimestamp(
+                    1517438400,
+                    tz=datetime.timezone.utc,
+                ),
+            ),
+            42,
+        )
+
+    def test_history_active_time_of_unknown_task_is_0(self):
+        self.assertEqual(self.history.active_time('unknown'), 0)
+
+    @patch('taskban.history.numpy', None)
+    def test_history_index_falls_back_to_pure_python_without_numpy(self):
+        self.assertEqual(type(self.history.index), ActiveTimeIndex)
+
+    def test_history_active_times_of_all_tasks(self):
+        self.assertEqual(
+            self.history.active_times(),
+            {DONE_TASK_UUID: 69},
+        )
+
+    def test_history_without_undo_file_is_empty(self):
+        history = History(os.path.join(self.tmp, 'undo.data')).load()
+        self.assertEqual(history.intervals, {})
+
+    def test_history_saves_checkpoint(self):
+        with open(self.checkpoint_path, 'r') as f:
+            checkpoint = json.load(f)
+        self.assertEqual(checkpoint['offset'], os.path.getsize(self.undo_path))
+
+    @patch('taskban.history.History._parse_transaction')
+    def test_history_parses_only_appended_transactions(self, parseMock):
+        with open(self.undo_path, 'a') as f:
+            f.write(STARTED_TRANSACTION)
+        History(self.undo_path, self.checkpoint_path).load()
+        self.assertEqual(parseMock.call_count, 1)
+
+    def test_history_loads_appended_transactions(self):
+        with open(self.undo_path, 'a') as f:
+            f.write(STARTED_TRANSACTION)
+        history = History(self.undo_path, self.checkpoint_path).load()
+        self.assertEqual(
+            history.intervals['fc840176-420c-477f-a1e2-4c021b8bc1e9'],
+            [[1600000000, None]],
+        )
+        self.assertEqual(
+            history.intervals[DONE_TASK_UUID],
+            [[1517438373, 1517438442]],
+        )
+
+    def test_history_ignores_incomplete_transactions(self):
+        with open(self.undo_path, 'a') as f:
+            f.write(STARTED_TRANSACTION[:-4])
+        history = History(self.undo_path, self.checkpoint_path).load()
+        self.assertNotIn(
+            'fc840176-420c-477f-a1e2-4c021b8bc1e9',
+            history.intervals,
+        )
+
+    def test_history_rebuilds_if_undo_file_is_rewritten(self):
+        with open(self.undo_path, 'w') as f:
+            f.write(STARTED_TRANSACTION)
+        history = History(self.undo_path, self.checkpoint_path).load()
+        self.assertNotIn(DONE_TASK_UUID, history.intervals)
+        self.assertEqual(history.offset, len(STARTED_TRANSACTION))
+
+    @patch('taskban.history.History._load_checkpoint')
+    def test_history_loaded_again_parses_only_appended_transactions(
+        self,
+        checkpointMock,
+    ):
+        with open(self.undo_path, 'a') as f:
+            f.write(STARTED_TRANSACTION)
+        with patch(
+            'taskban.history.History._parse_transaction',
+            wraps=self.history._parse_transaction,
+        ) as parseMock:
+            self.history.load()
+        self.assertFalse(checkpointMock.called)
+        self.assertEqual(parseMock.call_count, 1)
+        self.assertEqual(
+            self.history.intervals['fc840176-420c-477f-a1e2-4c021b8bc1e9'],
+            [[1600000000, None]],
+        )
+
+    def test_history_loaded_again_updates_its_index(self):
+        index = self.history.index
+        with open(self.undo_path, 'a') as f:
+            f.write(STARTED_TRANSACTION)
+        self.history.load()
+        self.assertIs(self.history.index, index)
+        self.assertGreater(
+            self.history.active_time('fc840176-420c-477f-a1e2-4c021b8bc1e9'),
+            0,
+        )
+        self.assertEqual(self.history.active_time(DONE_TASK_UUID), 69)
+
+    def test_history_loaded_again_rebuilds_if_undo_file_is_rewritten(self):
+        self.history.index
+        with open(self.undo_path, 'w') as f:
+            f.write(STARTED_TRANSACTION)
+        self.history.load()
+        self.assertNotIn(DONE_TASK_UUID, self.history.intervals)
+        self.assertEqual(self.history.active_time(DONE_TASK_UUID), 0)
+
+
+class TestActiveTimeIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = ActiveTimeIndex(
+            {
+                'task': [[100, 200], [300, 400], [500, None]],
+                'empty': [],
+            },
+            now=600,
+        )
+
+    def _datetime(self, epoch):
+        return datetime.datetime.fromtimestamp(epoch, tz=datetime.timezone.utc)
+
+    def test_index_active_time_of_all_time(self):
+        self.assertEqual(self.index.active_time('task'), 300)
+
+    def test_index_active_time_since_date(self):
+        self.assertEqual(
+            self.index.active_time('task', self._datetime(350)),
+            150,
+        )
+
+    def test_index_active_time_inside_window(self):
+        self.assertEqual(
+            self.index.active_time(
+                'task',
+                self._datetime(150),
+                self._datetime(550),
+            ),
+            200,
+        )
+
+    def test_index_active_time_of_window_between_intervals(self):
+        self.assertEqual(
+            self.index.active_time(
+                'task',
+                self._datetime(200),
+                self._datetime(300),
+            ),
+            0,
+        )
+
+    def test_index_active_time_of_task_without_intervals(self):
+        self.assertEqual(self.index.active_time('empty'), 0)
+        self.assertEqual(self.index.active_time('unknown'), 0)
+
+    def test_index_active_times(self):
+        self.assertEqual(
+            self.index.active_times(self._datetime(350)),
+            {'task': 150},
+        )
+
+    def test_index_update_indexes_the_updated_and_open_tasks(self):
+        self.index.update(
+            {
+                'task': [[100, 200], [300, 400], [500, None]],
+                'new': [[600, None]],
+            },
+            ['new'],
+            now=700,
+        )
+        self.assertEqual(self.index.active_time('task'), 400)
+        self.assertEqual(self.index.active_time('new'), 100)
+        self.assertEqual(self.index.open_uuids, {'task', 'new'})
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class TestVectorActiveTimeIndex(unittest.TestCase):
+
+    def setUp(self):
+        generator = random.Random(0)
+        self.intervals = {}
+        for task in range(50):
+            start = generator.randint(0, 1000)
+            self.intervals['task-{}'.format(task)] = []
+            for interval in range(generator.randint(0, 5)):
+                stop = start + generator.randint(0, 100)
+                self.intervals['task-{}'.format(task)].append([start, stop])
+                start = stop + generator.randint(0, 100)
+        self.intervals['task-0'].append([2000, None])
+
+    def _datetime(self, epoch):
+        return datetime.datetime.fromtimestamp(epoch, tz=datetime.timezone.utc)
+
+    def test_vector_index_matches_pure_python_index(self):
+        index = ActiveTimeIndex(self.intervals, now=2500)
+        vector_index = VectorActiveTimeIndex(self.intervals, now=2500)
+        for start, end in [(None, None), (300, None), (200, 800), (900, 400)]:
+            if start is not None:
+                start = self._datetime(start)
+            if end is not None:
+                end = self._datetime(end)
+            self.assertEqual(
+                vector_index.active_times(start, end),
+                index.active_times(start, end),
+            )
+
+    def test_updated_vector_index_matches_pure_python_index(self):
+        vector_index = VectorActiveTimeIndex(self.intervals, now=2500)
+        self.intervals['task-1'] = [[100, 150]]
+        self.intervals['task-new'] = [[300, None]]
+        vector_index.update(self.intervals, ['task-1', 'task-new'], now=3000)
+        self.assertEqual(
+            vector_index.active_times(),
+            ActiveTimeIndex(self.intervals, now=3000).active_times(),
+        )
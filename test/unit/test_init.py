@@ -1,29 +1,51 @@
+import os
+import sys
+import json
 import pytest
+import shutil
 import unittest
+import tempfile
+import subprocess
+from io import StringIO
 from unittest.mock import patch, call
 
+import taskban
 from taskban import main
+from taskban.server import ServerUnavailable, ServerError
+
+
+def parsed_arguments(parserMock):
+    'Arguments returned by the mocked parser, without profiling nor team'
+    arguments = parserMock.return_value.parse_args.return_value
+    arguments.profile = False
+    arguments.profile_json = None
+    arguments.profile_memory = False
+    arguments.members = None
+    return arguments
 
 
 class TestMain(unittest.TestCase):
 
     @patch('taskban.load_parser')
     def test_main_loads_parser(self, parserMock):
-        parserMock.parse_args = True
+        parsed_arguments(parserMock)
         main()
         self.assertTrue(parserMock.called)
 
     @patch('taskban.load_parser')
     @patch('taskban.load_logger')
     def test_main_loads_logger(self, loggerMock, parserMock):
-        parserMock.parse_args = True
+        parsed_arguments(parserMock)
         main()
         self.assertTrue(loggerMock.called)
 
     @patch('taskban.load_parser')
-    @patch('taskban.KanbanReport', autospect=True)
-    def test_sync_subcommand(self, taskbanMock, parserMock):
-        parserMock.return_value.parse_args.return_value.subcommand = 'ocupation'
+    @patch('taskban.server.request', side_effect=ServerUnavailable)
+    @patch('taskban.reports.KanbanReport', autospect=True)
+    def test_sync_subcommand(self, taskbanMock, requestMock, parserMock):
+        parser = parsed_arguments(parserMock)
+        parser.subcommand = 'ocupation'
+        parser.output_format = 'markdown'
         main()
         self.assertTrue(taskbanMock.called)
         self.assertTrue(
@@ -31,37 +53,113 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.server.request', side_effect=ServerError('failed'))
+    @patch('taskban.reports.KanbanReport', autospect=True)
+    def test_ocupation_doesnt_run_again_if_the_server_fails(
+        self,
+        taskbanMock,
+        requestMock,
+        parserMock,
+    ):
+        parser = parsed_arguments(parserMock)
+        parser.subcommand = 'ocupation'
+        with self.assertLogs('Main', level='ERROR') as logs:
+            main()
+        self.assertIn('failed', logs.output[0])
+        self.assertFalse(taskbanMock.called)
+
+    @patch('taskban.load_parser')
+    @patch('taskban.server.request', side_effect=ServerUnavailable)
+    @patch('taskban.reports.KanbanReport', autospect=True)
+    def test_ocupation_exports_records_in_other_formats(
+        self,
+        taskbanMock,
+        requestMock,
+        parserMock,
+    ):
+        parser = parsed_arguments(parserMock)
+        parser.subcommand = 'ocupation'
+        parser.output_format = 'jsonl'
+        parser.backlog = False
+        parser.inactive = True
+        main()
+        self.assertFalse(taskbanMock.return_value.print_report.called)
+        self.assertEqual(
+            taskbanMock.return_value.export_report.assert_called_with(
+                'jsonl',
+                show_backlog=False,
+                show_inactive=True,
+            ),
+            None,
+        )
+
+    @patch('taskban.load_parser')
+    @patch('taskban.server.request')
+    @patch('taskban.reports.team_members')
+    @patch('taskban.reports.TeamReport', autospect=True)
+    def test_ocupation_of_members_builds_the_team_report(
+        self,
+        teamMock,
+        membersMock,
+        requestMock,
+        parserMock,
+    ):
+        parser = parsed_arguments(parserMock)
+        parser.subcommand = 'ocupation'
+        parser.members = ['/team/*/.task']
+        parser.taskrc_path = '~/.taskrc'
+        parser.output_format = 'markdown'
+        main()
+        self.assertFalse(requestMock.called)
+        self.assertEqual(
+            membersMock.assert_called_with(['/team/*/.task'], '~/.taskrc'),
+            None,
+        )
+        self.assertEqual(teamMock.call_args[0][0], membersMock.return_value)
+        self.assertTrue(teamMock.return_value.print_report.called)
+
+    @patch('taskban.load_parser')
+    @patch('taskban.reports.team_members', side_effect=ValueError)
+    @patch('taskban.reports.TeamReport', autospect=True)
+    def test_ocupation_of_unknown_members_fails(
+        self,
+        teamMock,
+        membersMock,
+        parserMock,
+    ):
+        parser = parsed_arguments(parserMock)
+        parser.subcommand = 'ocupation'
+        parser.members = ['/nowhere/*']
+        main()
+        self.assertFalse(teamMock.called)
+
+    @patch('taskban.load_parser')
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_has_refine_subcommand(self, taskbanMock, parserMock):
-        parserMock.return_value.parse_args.return_value.subcommand = 'refine'
+        parsed_arguments(parserMock).subcommand = 'refine'
         main()
         self.assertTrue(taskbanMock.called)
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     @patch('taskban.os')
-    def test_refine_executes_task_command_by_default(
+    def test_refine_prints_report_by_default(
         self,
         osMock,
         taskbanMock,
         parserMock,
     ):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
-        parser.taskrc_path = '~/.task/taskrc'
-        taskbanMock.return_value.state = {'project': 'my-first-project'}
+        parser.next_subcommand = None
         main()
-        self.assertEqual(
-            osMock.system.assert_called_with(
-                'task rc:~/.task/taskrc pro:my-first-project list',
-            ),
-            None,
-        )
+        self.assertTrue(taskbanMock.return_value.print_report.called)
+        self.assertFalse(osMock.system.called)
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_jump_to_project(self, taskbanMock, parserMock):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'jump'
         parser.jump_project = 'my-project'
@@ -73,9 +171,9 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_next_parent(self, taskbanMock, parserMock):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'next'
         parser.parentage = 'parent'
@@ -87,13 +185,13 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_next_parent_doesnt_fail_at_end(
         self,
         taskbanMock,
         parserMock,
     ):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'next'
         parser.parentage = 'parent'
@@ -107,9 +205,9 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_next_child(self, taskbanMock, parserMock):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'next'
         parser.parentage = 'child'
@@ -121,13 +219,13 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_next_child_doesnt_fail_at_end(
         self,
         taskbanMock,
         parserMock,
     ):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'next'
         parser.parentage = 'child'
@@ -140,9 +238,9 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_next_sibling(self, taskbanMock, parserMock):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'next'
         parser.parentage = 'sibling'
@@ -154,13 +252,13 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_next_sibling_doesnt_fail_at_end(
         self,
         taskbanMock,
         parserMock,
     ):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'next'
         parser.parentage = 'sibling'
@@ -173,9 +271,9 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_next_to_child_if_it_exists(self, taskbanMock, parserMock):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'next'
         main()
@@ -186,13 +284,13 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_next_to_sibling_if_child_doesnt_exists(
         self,
         taskbanMock,
         parserMock,
     ):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'next'
 
@@ -211,13 +309,13 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_next_to_parent_if_child_and_sibling_dont_exists(
         self,
         taskbanMock,
         parserMock,
     ):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'next'
 
@@ -236,13 +334,13 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_next_dont_error_if_parent_dont_exists(
         self,
         taskbanMock,
         parserMock,
     ):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'next'
 
@@ -256,9 +354,9 @@ class TestMain(unittest.TestCase):
         self.assertTrue(taskbanMock.return_value.end.called)
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_prev_parent(self, taskbanMock, parserMock):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'prev'
         parser.parentage = 'parent'
@@ -270,13 +368,13 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_prev_parent_doesnt_fail_at_beggining(
         self,
         taskbanMock,
         parserMock,
     ):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'prev'
         parser.parentage = 'parent'
@@ -290,9 +388,9 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_prev_child(self, taskbanMock, parserMock):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'prev'
         parser.parentage = 'child'
@@ -304,13 +402,13 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_prev_child_doesnt_fail_at_end(
         self,
         taskbanMock,
         parserMock,
     ):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'prev'
         parser.parentage = 'child'
@@ -323,9 +421,9 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_prev_sibling(self, taskbanMock, parserMock):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'prev'
         parser.parentage = 'sibling'
@@ -337,13 +435,13 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_prev_sibling_doesnt_fail_at_end(
         self,
         taskbanMock,
         parserMock,
     ):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'prev'
         parser.parentage = 'sibling'
@@ -356,9 +454,9 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_prev_to_child_if_it_exists(self, taskbanMock, parserMock):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'prev'
         main()
@@ -369,13 +467,13 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_prev_to_sibling_if_child_doesnt_exists(
         self,
         taskbanMock,
         parserMock,
     ):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'prev'
 
@@ -394,13 +492,13 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_prev_to_parent_if_child_and_sibling_dont_exists(
         self,
         taskbanMock,
         parserMock,
     ):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'prev'
 
@@ -419,13 +517,13 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.RefinementReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
     def test_refine_prev_dont_error_if_parent_dont_exists(
         self,
         taskbanMock,
         parserMock,
     ):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'refine'
         parser.next_subcommand = 'prev'
 
@@ -439,9 +537,9 @@ class TestMain(unittest.TestCase):
         self.assertFalse(taskbanMock.return_value.end.called)
 
     @patch('taskban.load_parser')
-    @patch('taskban.PlanningReport', autospect=True)
+    @patch('taskban.reports.PlanningReport', autospect=True)
     def test_plan_move_task_up(self, taskbanMock, parserMock):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'plan'
         parser.task_id = 1
         parser.plan_direction = 'up'
@@ -453,9 +551,9 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.PlanningReport', autospect=True)
+    @patch('taskban.reports.PlanningReport', autospect=True)
     def test_plan_move_task_down(self, taskbanMock, parserMock):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.subcommand = 'plan'
         parser.task_id = 1
         parser.plan_direction = 'down'
@@ -467,9 +565,26 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.PlanningReport', autospect=True)
+    @patch('taskban.reports.PlanningReport', autospect=True)
+    def test_plan_move_of_an_unknown_task_fails(self, taskbanMock, parserMock):
+        taskbanMock.return_value.move_task_up.side_effect = ValueError(
+            'Task 999 is not in the plan',
+        )
+        parser = parsed_arguments(parserMock)
+        parser.subcommand = 'plan'
+        parser.task_id = 999
+        parser.plan_direction = 'up'
+        with self.assertLogs('Main', level='ERROR') as logs:
+            main()
+        self.assertIn('Task 999', logs.output[0])
+        self.assertFalse(
+            taskbanMock.return_value.update_completion_index.called,
+        )
+
+    @patch('taskban.load_parser')
+    @patch('taskban.reports.PlanningReport', autospect=True)
     def test_plan_move_can_specify_project(self, taskbanMock, parserMock):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.task_data_path = 'task_data'
         parser.taskrc_path = 'taskrc_path'
         parser.config_path = 'config_path'
@@ -494,9 +609,9 @@ class TestMain(unittest.TestCase):
         )
 
     @patch('taskban.load_parser')
-    @patch('taskban.PlanningReport', autospect=True)
+    @patch('taskban.reports.PlanningReport', autospect=True)
     def test_plan_move_can_specify_task_status(self, taskbanMock, parserMock):
-        parser = parserMock.return_value.parse_args.return_value
+        parser = parsed_arguments(parserMock)
         parser.task_data_path = 'task_data'
         parser.taskrc_path = 'taskrc_path'
         parser.config_path = 'config_path'
@@ -519,3 +634,205 @@ class TestMain(unittest.TestCase):
             ),
             None,
         )
+
+    @patch('taskban.load_parser')
+    @patch('taskban.reports.PlanningReport', autospect=True)
+    def test_reorder_subcommand(self, taskbanMock, parserMock):
+        parser = parsed_arguments(parserMock)
+        parser.subcommand = 'reorder'
+        parser.edit = False
+        parser.order_file = None
+        parser.task_ids = [3, 1, 2]
+        main()
+        self.assertEqual(
+            taskbanMock.return_value.reorder.assert_called_with([3, 1, 2]),
+            None,
+        )
+
+    @patch('taskban.load_parser')
+    @patch('taskban.reports.PlanningReport', autospect=True)
+    def test_reorder_reads_the_order_file(self, taskbanMock, parserMock):
+        order_file = tempfile.NamedTemporaryFile(mode='w', delete=False)
+        with order_file:
+            order_file.write('# Comment\n3 Task 3\n\n1 Task 1\n')
+        parser = parsed_arguments(parserMock)
+        parser.subcommand = 'reorder'
+        parser.edit = False
+        parser.order_file = order_file.name
+        main()
+        os.remove(order_file.name)
+        self.assertEqual(
+            taskbanMock.return_value.reorder.assert_called_with([3, 1]),
+            None,
+        )
+
+    @patch('taskban.load_parser')
+    @patch('taskban.reports.PlanningReport', autospect=True)
+    def test_reorder_of_a_wrong_order_file_fails(
+        self,
+        taskbanMock,
+        parserMock,
+    ):
+        order_file = tempfile.NamedTemporaryFile(mode='w', delete=False)
+        with order_file:
+            order_file.write('3 Task 3\nTask 1\n')
+        parser = parsed_arguments(parserMock)
+        parser.subcommand = 'reorder'
+        parser.edit = False
+        parser.order_file = order_file.name
+        with self.assertLogs('Main', level='ERROR') as logs:
+            main()
+        os.remove(order_file.name)
+        self.assertIn('Line 2', logs.output[0])
+        self.assertFalse(taskbanMock.return_value.reorder.called)
+
+    @patch('taskban.load_parser')
+    @patch('taskban.subprocess.call')
+    @patch('taskban.reports.PlanningReport', autospect=True)
+    def test_reorder_edits_the_order_with_the_editor(
+        self,
+        taskbanMock,
+        callMock,
+        parserMock,
+    ):
+        taskbanMock.return_value.tasks = []
+        parser = parsed_arguments(parserMock)
+        parser.subcommand = 'reorder'
+        parser.edit = True
+        with patch.dict(os.environ, {'EDITOR': 'code --wait'}):
+            main()
+        command = callMock.call_args[0][0]
+        self.assertEqual(command[:2], ['code', '--wait'])
+        self.assertTrue(command[2].startswith(tempfile.gettempdir()))
+        self.assertEqual(
+            taskbanMock.return_value.reorder.assert_called_with([]),
+            None,
+        )
+
+    @patch('taskban.load_parser')
+    @patch('taskban.session.Session', autospect=True)
+    @patch('taskban.reports.PlanningReport', autospect=True)
+    @patch('taskban.reports.RefinementReport', autospect=True)
+    def test_session_subcommand(
+        self,
+        refinementMock,
+        planningMock,
+        sessionMock,
+        parserMock,
+    ):
+        parser = parsed_arguments(parserMock)
+        parser.subcommand = 'session'
+        main()
+        self.assertTrue(refinementMock.called)
+        self.assertTrue(planningMock.called)
+        self.assertTrue(sessionMock.return_value.cmdloop.called)
+
+    @patch('taskban.load_parser')
+    @patch('taskban.server.request')
+    @patch('taskban.reports.KanbanReport', autospect=True)
+    @patch('taskban.sys')
+    def test_ocupation_uses_the_server_if_running(
+        self,
+        sysMock,
+        taskbanMock,
+        requestMock,
+        parserMock,
+    ):
+        parser = parsed_arguments(parserMock)
+        parser.subcommand = 'ocupation'
+        parser.task_data_path = '~/.task'
+        parser.taskrc_path = '~/.taskrc'
+        parser.config_path = 'config.yaml'
+        requestMock.return_value = 'report'
+        main()
+        self.assertFalse(taskbanMock.called)
+        self.assertEqual(
+            sysMock.stdout.write.assert_called_with('report'),
+            None,
+        )
+
+    @patch('taskban.load_parser')
+    @patch('taskban.server.TaskbanServer', autospect=True)
+    @patch('taskban.sys')
+    def test_profile_prints_the_phases(
+        self,
+        sysMock,
+        serverMock,
+        parserMock,
+    ):
+        parser = parsed_arguments(parserMock)
+        parser.subcommand = 'serve'
+        parser.profile = True
+        parser.profile_json = None
+        parser.profile_memory = False
+        sysMock.stderr = StringIO()
+        main()
+        self.assertTrue(serverMock.return_value.serve.called)
+        self.assertIn('\nserve ', sysMock.stderr.getvalue())
+
+    @patch('taskban.load_parser')
+    @patch('taskban.server.TaskbanServer', autospect=True)
+    def test_profile_json_writes_the_phases(self, serverMock, parserMock):
+        tmp = tempfile.mkdtemp()
+        profile_path = os.path.join(tmp, 'profile.json')
+        parser = parsed_arguments(parserMock)
+        parser.subcommand = 'serve'
+        parser.profile = False
+        parser.profile_json = profile_path
+        parser.profile_memory = False
+        try:
+            main()
+            with open(profile_path) as f:
+                self.assertEqual(
+                    json.load(f)['phases'][0]['phase'],
+                    'serve',
+                )
+        finally:
+            shutil.rmtree(tmp)
+
+    @patch('taskban.load_parser')
+    @patch('taskban.server.TaskbanServer', autospect=True)
+    def test_serve_subcommand(self, serverMock, parserMock):
+        parser = parsed_arguments(parserMock)
+        parser.subcommand = 'serve'
+        parser.data_path = 'data_path'
+        main()
+        self.assertEqual(serverMock.assert_called_with('data_path'), None)
+        self.assertTrue(serverMock.return_value.serve.called)
+
+
+class TestImportTime(unittest.TestCase):
+
+    def _run_python(self, code):
+        return subprocess.check_output(
+            [sys.executable, '-c', code],
+            stderr=subprocess.DEVNULL,
+        ).decode('utf-8')
+
+    def test_import_doesnt_load_the_reports(self):
+        modules = self._run_python(
+            'import sys, taskban; print(" ".join(sys.modules))',
+        ).split()
+        for module in [
+            'numpy',
+            'tabulate',
+            'tasklib',
+            'taskban.reports',
+            'taskban.server',
+            'taskban.session',
+            'yaml',
+        ]:
+            self.assertNotIn(module, modules)
+
+    @unittest.skipIf(
+        os.environ.get('TASKBAN_SKIP_TIMING') is not None,
+        'Timing tests disabled with TASKBAN_SKIP_TIMING',
+    )
+    def test_import_time_budget(self):
+        import_time = self._run_python(
+            'import time\n'
+            'start = time.perf_counter()\n'
+            'import taskban\n'
+            'print(time.perf_counter() - start)',
+        )
+        self.assertLess(float(import_time), 0.5)
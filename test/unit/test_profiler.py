@@ -0,0 +1,102 @@
+import json
+import unittest
+import subprocess
+from io import StringIO
+from taskban import profiler
+from taskban.profiler import Profiler, span, profiled
+
+
+@profiled('double')
+def double(value):
+    return value * 2
+
+
+class TestProfiler(unittest.TestCase):
+    def test_span_does_nothing_without_profiler(self):
+        with span('phase'):
+            pass
+        self.assertIsNone(profiler._profiler)
+
+    def test_profiled_function_without_profiler(self):
+        self.assertEqual(double(2), 4)
+
+    def test_profiler_records_nested_phases(self):
+        with Profiler() as active_profiler:
+            with span('report'):
+                double(1)
+                double(2)
+            double(3)
+        self.assertIsNone(profiler._profiler)
+        results = active_profiler.results()
+        self.assertEqual(
+            [(result['path'], result['calls']) for result in results],
+            [
+                (['report'], 1),
+                (['report', 'double'], 2),
+                (['double'], 1),
+            ],
+        )
+        self.assertGreaterEqual(
+            results[0]['wall_seconds'],
+            results[1]['wall_seconds'],
+        )
+        self.assertIsNone(results[0]['allocated_bytes'])
+
+    def test_profiler_records_phases_that_raise(self):
+        with Profiler() as active_profiler:
+            with self.assertRaises(ValueError):
+                with span('phase'):
+                    raise ValueError
+        self.assertEqual(active_profiler.results()[0]['calls'], 1)
+
+    def test_profiler_can_trace_memory(self):
+        with Profiler(trace_memory=True) as active_profiler:
+            with span('allocate'):
+                data = [0] * 100000
+        self.assertGreater(
+            active_profiler.results()[0]['allocated_bytes'],
+            100000,
+        )
+        del data
+
+    def test_write_json(self):
+        with Profiler() as active_profiler:
+            double(1)
+        out = StringIO()
+        active_profiler.write_json(out)
+        self.assertEqual(
+            json.loads(out.getvalue())['phases'][0]['phase'],
+            'double',
+        )
+
+    def test_profiler_counts_the_processes_of_each_phase(self):
+        with Profiler() as active_profiler:
+            with span('spawn'):
+                subprocess.check_call(['true'])
+            double(1)
+        results = active_profiler.results()
+        self.assertEqual(results[0]['processes'], 1)
+        self.assertEqual(results[1]['processes'], 0)
+        self.assertEqual(active_profiler.commands[0]['command'], 'true')
+
+    def test_write_table_shows_the_external_commands(self):
+        with Profiler() as active_profiler:
+            subprocess.check_call(['true'])
+        out = StringIO()
+        active_profiler.write_table(out)
+        self.assertIn(
+            '\n1 processes started by 1 external commands in',
+            out.getvalue(),
+        )
+        self.assertIn('\ntrue ', out.getvalue())
+
+    def test_write_table_indents_the_children(self):
+        with Profiler() as active_profiler:
+            with span('report'):
+                double(1)
+        out = StringIO()
+        active_profiler.write_table(out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('Phase'))
+        self.assertTrue(lines[2].startswith('report '))
+        self.assertTrue(lines[3].startswith('. double '))
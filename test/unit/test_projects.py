@@ -0,0 +1,257 @@
+import os
+import json
+import shutil
+import unittest
+import tempfile
+from taskban.projects import ProjectTree, ProjectCache, \
+    projects_from_names, project_stats
+
+PROJECTS = {
+    'my-second-project': {},
+    'my-first-project': {
+        'my-second-subproject': {},
+        'my-first-subproject': {
+            'my-first-subsubproject': {
+                'my-first-subsubsubproject': {},
+            },
+            'my-second-subsubproject': {},
+        },
+    },
+}
+
+STATS = {
+    'my-first-project.my-first-subproject.my-second-subsubproject': [2, 3, 1],
+    'my-second-project': [1, 0, 5],
+}
+
+
+class TestProjectTree(unittest.TestCase):
+    def setUp(self):
+        self.tree = ProjectTree(PROJECTS)
+
+    def test_tree_stores_projects_in_depth_first_order(self):
+        self.assertEqual(
+            self.tree.names,
+            [
+                'my-first-project',
+                'my-first-project.my-first-subproject',
+                'my-first-project.my-first-subproject.my-first-subsubproject',
+                'my-first-project.my-first-subproject.my-first-subsubproject.'
+                'my-first-subsubsubproject',
+                'my-first-project.my-first-subproject.my-second-subsubproject',
+                'my-first-project.my-second-subproject',
+                'my-second-project',
+            ],
+        )
+        self.assertEqual(self.tree.index['my-second-project'], 6)
+
+    def test_tree_child_of_deep_projects(self):
+        self.assertEqual(
+            self.tree.child(
+                'my-first-project.my-first-subproject.my-first-subsubproject',
+            ),
+            'my-first-project.my-first-subproject.my-first-subsubproject.'
+            'my-first-subsubsubproject',
+        )
+
+    def test_tree_child_raises_if_there_are_no_children(self):
+        with self.assertRaises(IndexError):
+            self.tree.child('my-second-project')
+
+    def test_tree_previous_child_is_the_child_of_the_previous_sibling(self):
+        self.assertEqual(
+            self.tree.child('my-second-project', direction=-1),
+            'my-first-project.my-first-subproject',
+        )
+
+    def test_tree_previous_child_raises_on_the_first_sibling(self):
+        with self.assertRaises(IndexError):
+            self.tree.child('my-first-project', direction=-1)
+
+    def test_tree_sibling_raises_on_the_extremes(self):
+        with self.assertRaises(IndexError):
+            self.tree.sibling('my-second-project')
+        with self.assertRaises(IndexError):
+            self.tree.sibling('my-first-project', direction=-1)
+
+    def test_tree_next_parent_goes_to_the_closest_ancestor_sibling(self):
+        self.assertEqual(
+            self.tree.parent(
+                'my-first-project.my-first-subproject.my-first-subsubproject.'
+                'my-first-subsubsubproject',
+            ),
+            'my-first-project.my-first-subproject.my-second-subsubproject',
+        )
+        self.assertEqual(
+            self.tree.parent(
+                'my-first-project.my-first-subproject.my-second-subsubproject',
+            ),
+            'my-first-project.my-second-subproject',
+        )
+        self.assertEqual(
+            self.tree.parent('my-first-project.my-second-subproject'),
+            'my-second-project',
+        )
+
+    def test_tree_previous_parent_is_the_parent(self):
+        self.assertEqual(
+            self.tree.parent(
+                'my-first-project.my-second-subproject',
+                direction=-1,
+            ),
+            'my-first-project',
+        )
+
+    def test_tree_parent_raises_on_top_projects(self):
+        with self.assertRaises(IndexError):
+            self.tree.parent('my-first-project')
+
+    def test_tree_position_of_deep_projects(self):
+        self.assertEqual(
+            self.tree.position(
+                'my-first-project.my-first-subproject.my-first-subsubproject.'
+                'my-first-subsubsubproject',
+            ),
+            [0, 1, 1, 1],
+        )
+        self.assertEqual(self.tree.position('my-second-project'), [1, 0, 0])
+
+    def test_tree_project_of_position(self):
+        self.assertEqual(
+            self.tree.project([0, 1, 2]),
+            'my-first-project.my-first-subproject.my-second-subsubproject',
+        )
+        self.assertEqual(
+            self.tree.project([0, 1, 1, 1]),
+            'my-first-project.my-first-subproject.my-first-subsubproject.'
+            'my-first-subsubsubproject',
+        )
+
+    def test_tree_project_raises_on_unexisting_position(self):
+        with self.assertRaises(IndexError):
+            self.tree.project([2, 0, 0])
+        with self.assertRaises(IndexError):
+            self.tree.project([-1, 0, 0])
+
+    def test_tree_position_raises_on_unexisting_project(self):
+        with self.assertRaises(KeyError):
+            self.tree.position('unexisting-project')
+
+
+class TestProjectTreeStats(unittest.TestCase):
+    def setUp(self):
+        self.tree = ProjectTree(PROJECTS, STATS)
+
+    def test_tree_rolls_up_the_stats_of_the_subprojects(self):
+        self.assertEqual(
+            self.tree.subtree_stats[self.tree.index['my-first-project']],
+            [2, 3, 1],
+        )
+        self.assertEqual(
+            self.tree.stats[self.tree.index['my-first-project']],
+            [0, 0, 0],
+        )
+
+    def test_tree_child_skips_empty_subtrees(self):
+        self.assertEqual(
+            self.tree.child(
+                'my-first-project.my-first-subproject',
+                skip_empty=True,
+            ),
+            'my-first-project.my-first-subproject.my-second-subsubproject',
+        )
+
+    def test_tree_sibling_skips_empty_subtrees(self):
+        with self.assertRaises(IndexError):
+            self.tree.sibling(
+                'my-first-project.my-first-subproject',
+                skip_empty=True,
+            )
+
+    def test_tree_next_parent_skips_empty_subtrees(self):
+        self.assertEqual(
+            self.tree.parent(
+                'my-first-project.my-first-subproject.my-second-subsubproject',
+                skip_empty=True,
+            ),
+            'my-second-project',
+        )
+
+    def test_tree_first_skips_empty_subtrees(self):
+        self.assertEqual(self.tree.first(), 'my-first-project')
+        self.assertEqual(
+            ProjectTree(PROJECTS, {'my-second-project': [1, 0, 0]}).first(
+                skip_empty=True,
+            ),
+            'my-second-project',
+        )
+
+    def test_tree_first_raises_if_all_projects_are_empty(self):
+        with self.assertRaises(IndexError):
+            ProjectTree(PROJECTS, {}).first(skip_empty=True)
+
+    def test_tree_without_stats_doesnt_skip_projects(self):
+        self.assertEqual(
+            ProjectTree(PROJECTS).sibling(
+                'my-first-project.my-first-subproject',
+                skip_empty=True,
+            ),
+            'my-first-project.my-second-subproject',
+        )
+
+
+class TestProjectStats(unittest.TestCase):
+    def test_project_stats_sums_the_tasks_of_each_project(self):
+        self.assertEqual(
+            project_stats([
+                {'project': 'a', 'est': 1, 'ov': None},
+                {'project': 'a', 'est': 2, 'ov': 3},
+                {'project': None, 'est': 5, 'ov': 5},
+            ]),
+            {'a': [2, 3, 3]},
+        )
+
+
+class TestProjectsFromNames(unittest.TestCase):
+    def test_projects_from_names_adds_the_parents(self):
+        self.assertEqual(
+            projects_from_names(['a.b.c', 'd']),
+            {'a': {'b': {'c': {}}}, 'd': {}},
+        )
+
+
+class TestProjectCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.tmp, 'pending.data')
+        with open(self.data_file, 'w') as f:
+            f.write('[project:"a"]\n')
+        self.cache_path = os.path.join(self.tmp, 'projects.json')
+        self.cache = ProjectCache(self.cache_path, [self.data_file])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_cache_loads_saved_projects(self):
+        self.cache.save(PROJECTS, STATS)
+        self.assertEqual(self.cache.load(), (PROJECTS, STATS))
+
+    def test_cache_is_empty_if_it_doesnt_exist(self):
+        self.assertEqual(self.cache.load(), None)
+
+    def test_cache_is_invalid_if_the_data_files_change(self):
+        self.cache.save(PROJECTS, STATS)
+        with open(self.data_file, 'a') as f:
+            f.write('[project:"b"]\n')
+        self.assertEqual(self.cache.load(), None)
+
+    def test_cache_is_invalid_if_it_is_corrupted(self):
+        with open(self.cache_path, 'w') as f:
+            f.write('{')
+        self.assertEqual(self.cache.load(), None)
+
+    def test_cache_tags_missing_data_files(self):
+        os.remove(self.data_file)
+        self.cache.save(PROJECTS, STATS)
+        with open(self.cache_path, 'r') as f:
+            self.assertEqual(json.load(f)['fingerprint'], [None])
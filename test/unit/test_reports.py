@@ -1,13 +1,19 @@
 import os
+import stat
 import shutil
 import pytest
+import random
 import tasklib
 import unittest
 import datetime
 import tempfile
-from unittest.mock import patch
+import threading
+from io import StringIO
+from unittest.mock import patch, PropertyMock
 from taskban.reports import PlanningReport, RefinementReport, KanbanReport, \
-    Report
+    Report, TeamReport, team_members
+from taskban.data import UnrecognisedTaskData
+from taskban.completion import load_index
 
 
 class TestReport(unittest.TestCase):
@@ -50,6 +56,14 @@ class TestReport(unittest.TestCase):
                 'todo',
                 'backlog',
             ],
+            'refinement_columns': [
+                'id',
+                'project',
+                'ov',
+                'est',
+                'urgency',
+                'description',
+            ],
         }
         actual_config = self.report.load_yaml(
             os.path.join(self.config_path, 'config.yaml'),
@@ -71,6 +85,99 @@ class TestReport(unittest.TestCase):
     def test_set_backend_on_initialize(self):
         self.assertIsInstance(self.report.backend, type(tasklib.TaskWarrior()))
 
+    @patch('taskban.reports.tasklib.TaskWarrior')
+    def test_backend_is_created_on_first_access(self, backendMock):
+        self.report = Report(
+            task_data_path=self.data_path,
+            taskrc_path=os.path.join(self.config_path, 'taskrc'),
+            config_path=os.path.join(self.config_path, 'config.yaml'),
+        )
+        self.assertFalse(backendMock.called)
+        self.report.backend
+        self.assertEqual(backendMock.call_count, 1)
+        self.report.backend
+        self.assertEqual(backendMock.call_count, 1)
+
+    def test_filter_tasks_concurrently_reads_the_data_files(self):
+        pending, completed = self.report._filter_tasks_concurrently(
+            {'status': 'pending'},
+            {'status': 'completed'},
+        )
+        self.assertEqual(
+            pending,
+            self.report.task_data.filter(status='pending'),
+        )
+        self.assertEqual(
+            completed,
+            self.report.task_data.filter(status='completed'),
+        )
+
+    @patch('taskban.reports.TaskData.filter')
+    @patch('taskban.reports.tasklib.TaskWarrior')
+    def test_filter_tasks_concurrently_runs_the_exports_at_the_same_time(
+        self,
+        backendMock,
+        filterMock,
+    ):
+        filterMock.side_effect = UnrecognisedTaskData
+        running = []
+        overlapped = threading.Event()
+
+        def export(status):
+            running.append(status)
+            if len(running) > 1:
+                overlapped.set()
+            # The first query waits for the second so it finishes last
+            overlapped.wait(1)
+            return [status]
+
+        backendMock.return_value.tasks.filter.side_effect = export
+        self.assertEqual(
+            self.report._filter_tasks_concurrently(
+                {'status': 'pending'},
+                {'status': 'completed'},
+            ),
+            [['pending'], ['completed']],
+        )
+        self.assertTrue(overlapped.is_set())
+        self.assertIsNone(self.report.task_data)
+
+    @patch('taskban.reports.TaskData.filter')
+    @patch('taskban.reports.tasklib.TaskWarrior')
+    def test_filter_tasks_concurrently_can_limit_the_workers(
+        self,
+        backendMock,
+        filterMock,
+    ):
+        filterMock.side_effect = UnrecognisedTaskData
+        self.report.config['max_task_workers'] = 1
+        threads = set()
+
+        def export(status):
+            threads.add(threading.current_thread())
+            return [status]
+
+        backendMock.return_value.tasks.filter.side_effect = export
+        self.assertEqual(
+            self.report._filter_tasks_concurrently(
+                {'status': 'pending'},
+                {'status': 'completed'},
+            ),
+            [['pending'], ['completed']],
+        )
+        self.assertEqual(threads, {threading.current_thread()})
+
+    @patch('taskban.reports.History.load')
+    def test_history_is_loaded_on_first_access(self, loadMock):
+        self.report = Report(
+            task_data_path=self.data_path,
+            taskrc_path=os.path.join(self.config_path, 'taskrc'),
+            config_path=os.path.join(self.config_path, 'config.yaml'),
+        )
+        self.assertFalse(loadMock.called)
+        self.report.history
+        self.assertTrue(loadMock.called)
+
     def test_end_date_of_report_type_datetime(self):
         self.assertIsInstance(self.report._end, type(datetime.datetime.now()))
 
@@ -112,6 +219,15 @@ class TestReport(unittest.TestCase):
         self.assertIsInstance(self.report.start, type(datetime.datetime.now()))
         self.assertEqual(self.report._start_tw_string, 'now')
 
+    @patch('taskban.reports.tasklib.TaskWarrior.convert_datetime_string')
+    def test_start_date_is_converted_without_taskwarrior(self, convertMock):
+        self.report.start = '7d'
+        self.assertFalse(convertMock.called)
+        self.assertEqual(
+            self.report._end - self.report.start,
+            datetime.timedelta(7),
+        )
+
     def test_start_date_of_report_difference(self):
         self.report = Report(
             '1d',
@@ -125,7 +241,19 @@ class TestReport(unittest.TestCase):
         )
 
     def test_report_has_history(self):
-        self.assertIsInstance(self.report.backend.history.entries, list)
+        self.assertIsInstance(self.report.history.intervals, dict)
+
+    def test_report_saves_history_checkpoint_in_data_path(self):
+        self.report = Report(
+            task_data_path=self.data_path,
+            taskrc_path=os.path.join(self.config_path, 'taskrc'),
+            config_path=os.path.join(self.config_path, 'config.yaml'),
+            data_path=self.tmp,
+        )
+        self.report.history
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.tmp, 'history.json')),
+        )
 
     def test_report_report_has_title(self):
         self.assertIsInstance(self.report.title, str)
@@ -188,6 +316,16 @@ class TestKanbanReport(unittest.TestCase):
         tasks = self.report._get_tasks_of_state('done')
         self.assertTrue(str(tasks[0]) == 'Done task 1')
 
+    @patch('taskban.reports.TaskData.filter')
+    def test_report_falls_back_to_taskwarrior_on_unrecognised_data(
+        self,
+        filterMock,
+    ):
+        filterMock.side_effect = UnrecognisedTaskData
+        tasks = self.report._get_tasks_of_state('backlog')
+        self.assertTrue(str(tasks[0]) == 'Backlog task 1')
+        self.assertIsNone(self.report.task_data)
+
     def test_report_can_make_snapshot(self):
         self.assertTrue(
             str(self.report.snapshot['test']['my-second-project'][0]),
@@ -206,6 +344,75 @@ class TestKanbanReport(unittest.TestCase):
             'Backlog task 3',
         )
 
+    @patch('taskban.reports.TaskData.filter')
+    def test_report_snapshot_queries_tasks_once_per_status(self, filterMock):
+        filterMock.return_value = []
+        self.report.save()
+        self.assertEqual(filterMock.call_count, 2)
+
+    def test_report_snapshot_ignores_states_not_configured(self):
+        del self.report.config['available_states']['backlog']
+        self.report.save()
+        self.assertNotIn('backlog', self.report.snapshot)
+
+    def test_report_prints_project_tables(self):
+        out = StringIO()
+        self.report.print_report(show_backlog=False, out=out)
+        self.assertIn(
+            '\n\n## done\n\n### my-first-project\n\n'
+            'ID     OV    Est    Active    Progress %    Description\n'
+            '-----  ----  -----  --------  ------------  -------------\n'
+            '0                   00:01:09                Done task 1\n'
+            '-----  ---   ---    --------  ----          ----\n'
+            'Total  0     0      00:01:09\n\n## test',
+            out.getvalue(),
+        )
+
+    def test_report_skips_projects_without_active_tasks(self):
+        out = StringIO()
+        self.report.print_report(show_backlog=False, out=out)
+        self.assertNotIn('### my-second-project', out.getvalue())
+
+    def test_report_records_have_tasks_and_project_totals(self):
+        records = list(self.report.records(show_backlog=False))
+        self.assertEqual(records, [
+            {
+                'type': 'task',
+                'state': 'done',
+                'project': 'my-first-project',
+                'id': 0,
+                'ov': None,
+                'est': None,
+                'active': 69,
+                'progress': None,
+                'description': 'Done task 1',
+            },
+            {
+                'type': 'total',
+                'state': 'done',
+                'project': 'my-first-project',
+                'id': None,
+                'ov': 0,
+                'est': 0,
+                'active': 69,
+                'progress': None,
+                'description': None,
+            },
+        ])
+
+    def test_report_exports_records(self):
+        out = StringIO()
+        self.report.export_report(
+            'jsonl',
+            show_backlog=True,
+            show_inactive=True,
+            out=out,
+        )
+        self.assertEqual(
+            len(out.getvalue().splitlines()),
+            len(list(self.report.records(True, True))),
+        )
+
     # @pytest.mark.skip(
     #     reason="difficult to test prints, I leave the work started in case"
     #     "anyone wants to continue")
@@ -218,6 +425,175 @@ class TestKanbanReport(unittest.TestCase):
     #         self.assertEqual(output, f.read())
 
 
+class TestTeamReport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        shutil.rmtree(self.tmp)
+        for person in ['alice', 'bob']:
+            shutil.copytree(
+                'test/data',
+                os.path.join(self.tmp, person, '.task'),
+            )
+        shutil.copytree('test/config', os.path.join(self.tmp, 'config'))
+        self.config_path = os.path.join(self.tmp, 'config')
+        self.taskrc_path = os.path.join(self.config_path, 'taskrc')
+        self.members = team_members(
+            [os.path.join(self.tmp, '*', '.task')],
+            self.taskrc_path,
+        )
+        self.report = TeamReport(
+            self.members,
+            start_date='1984-01-01',
+            config_path=os.path.join(self.config_path, 'config.yaml'),
+            data_path=os.path.join(self.tmp, 'taskban'),
+            workers=1,
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_team_members_expands_globs(self):
+        self.assertEqual(
+            self.members,
+            [
+                {
+                    'name': 'alice',
+                    'task_data_path': os.path.join(self.tmp, 'alice', '.task'),
+                    'taskrc_path': self.taskrc_path,
+                },
+                {
+                    'name': 'bob',
+                    'task_data_path': os.path.join(self.tmp, 'bob', '.task'),
+                    'taskrc_path': self.taskrc_path,
+                },
+            ],
+        )
+
+    def test_team_members_can_have_their_own_taskrc(self):
+        members = team_members(
+            ['{}:bob_taskrc'.format(os.path.join(self.tmp, 'bob', '.task'))],
+            self.taskrc_path,
+        )
+        self.assertEqual(members[0]['name'], 'bob')
+        self.assertEqual(members[0]['taskrc_path'], 'bob_taskrc')
+
+    def test_team_members_are_added_once(self):
+        members = team_members(
+            [
+                os.path.join(self.tmp, 'alice', '.task:alice_taskrc'),
+                os.path.join(self.tmp, '*', '.task'),
+            ],
+            self.taskrc_path,
+        )
+        self.assertEqual(
+            [(member['name'], member['taskrc_path']) for member in members],
+            [('alice', 'alice_taskrc'), ('bob', self.taskrc_path)],
+        )
+
+    def test_team_members_with_the_same_name_use_their_path(self):
+        shutil.copytree(
+            'test/data',
+            os.path.join(self.tmp, 'other', 'alice', '.task'),
+        )
+        members = team_members(
+            [
+                os.path.join(self.tmp, 'alice', '.task'),
+                os.path.join(self.tmp, 'other', 'alice', '.task'),
+            ],
+            self.taskrc_path,
+        )
+        self.assertEqual(
+            [member['name'] for member in members],
+            [
+                os.path.join(self.tmp, 'alice', '.task'),
+                os.path.join(self.tmp, 'other', 'alice', '.task'),
+            ],
+        )
+
+    def test_team_members_raises_error_if_nothing_matches(self):
+        with self.assertRaises(ValueError):
+            team_members([os.path.join(self.tmp, 'nobody')], self.taskrc_path)
+
+    def test_report_merges_the_boards_in_the_order_of_the_members(self):
+        self.assertEqual(
+            [
+                (task['person'], task['description'])
+                for task in self.report.snapshot['done']['my-first-project']
+            ],
+            [('alice', 'Done task 1'), ('bob', 'Done task 1')],
+        )
+
+    def test_report_builds_the_boards_in_a_process_pool(self):
+        report = TeamReport(
+            self.members,
+            start_date='1984-01-01',
+            config_path=os.path.join(self.config_path, 'config.yaml'),
+            workers=2,
+        )
+        self.assertEqual(report.snapshot, self.report.snapshot)
+
+    def test_report_limits_the_tasks_of_each_member(self):
+        self.report.config['max_tasks_per_state'] = 1
+        project, dataset, total_active_time = next(
+            self.report._project_tasks('todo', show_inactive=True),
+        )
+        self.assertEqual(
+            [task['person'] for task in dataset],
+            ['alice', 'bob'],
+        )
+
+    def test_records_have_the_totals_of_each_member_and_the_team(self):
+        records = list(self.report.records(show_backlog=False))
+        self.assertEqual(
+            [
+                (record['type'], record['person'], record['active'])
+                for record in records
+            ],
+            [
+                ('task', 'alice', 69),
+                ('task', 'bob', 69),
+                ('total', None, 138),
+                ('person', 'alice', 69),
+                ('person', 'bob', 69),
+                ('team', None, 138),
+            ],
+        )
+
+    def test_report_prints_the_person_of_the_tasks_and_the_totals(self):
+        out = StringIO()
+        self.report.print_report(show_backlog=False, out=out)
+        self.assertIn(
+            '\n\n### my-first-project\n\n'
+            'Person    ID     OV    Est    Active    Progress %    '
+            'Description\n'
+            '--------  -----  ----  -----  --------  ------------  '
+            '-------------\n'
+            'alice     0                   00:01:09                '
+            'Done task 1\n'
+            'bob       0                   00:01:09                '
+            'Done task 1\n'
+            '------    -----  ---   ---    --------  ----          ----\n'
+            'Total            0     0      00:02:18\n\n## test',
+            out.getvalue(),
+        )
+        self.assertTrue(out.getvalue().endswith(
+            '\n\n## Team\n\n'
+            'Person    OV    Est    Active\n'
+            '--------  ----  -----  --------\n'
+            'alice     0     0      00:01:09\n'
+            'bob       0     0      00:01:09\n'
+            '------    ---   ---    --------\n'
+            'Total     0     0      00:02:18\n',
+        ))
+
+    def test_report_exports_the_person_of_the_tasks(self):
+        out = StringIO()
+        self.report.export_report('csv', show_backlog=False, out=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0].split(',')[:2], ['type', 'person'])
+        self.assertEqual(lines[-1], 'team,,,,,0,0,138,,')
+
+
 class TestRefinementReport(unittest.TestCase):
     def setUp(self):
         self.tmp = tempfile.mkdtemp()
@@ -286,19 +662,41 @@ class TestRefinementReport(unittest.TestCase):
             None,
         )
 
+    def test_refinement_prints_report_when_no_project_is_set(self):
+        out = StringIO()
+        self.report.print_report(out=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(
+            lines[0].split(),
+            ['ID', 'Project', 'OV', 'Est', 'Urg', 'Description'],
+        )
+        self.assertEqual(
+            lines[2].split(),
+            ['1', 'my-first-project', '0', '4', 'Backlog', 'task', '1'],
+        )
+        self.assertEqual(lines[-1], '10 tasks')
+
     @patch('taskban.reports.os')
-    def test_refinement_prints_report_when_no_project_is_set(self, osMock):
-        self.report.print_report()
-        self.assertEqual(
-            osMock.system.assert_called_with(
-                'TASKDATA={} task rc:{} project:my-first-project list'.format(
-                    self.data_path,
-                    os.path.join(self.config_path, 'taskrc'),
-                ),
-            ),
-            None,
+    def test_refinement_prints_report_without_taskwarrior(self, osMock):
+        self.report.print_report(out=StringIO())
+        self.assertFalse(osMock.system.called)
+        self.assertIsNone(self.report._backend)
+
+    def test_refinement_prints_report_with_configured_columns(self):
+        self.report.config['refinement_columns'] = ['id', 'description']
+        out = StringIO()
+        self.report.print_report(out=out)
+        self.assertEqual(
+            out.getvalue().splitlines()[0].split(),
+            ['ID', 'Description'],
         )
 
+    def test_refinement_prints_report_of_project_without_tasks(self):
+        self.report.state['project'] = 'unexisting-project'
+        out = StringIO()
+        self.report.print_report(out=out)
+        self.assertEqual(out.getvalue(), 'No matches.\n')
+
     def test_refinement_can_find_project_position_on_projects(self):
         self.assertEqual(
             self.report.find_project_position('my-first-project'),
@@ -557,6 +955,150 @@ class TestRefinementReport(unittest.TestCase):
             self.report.jump('unexisting-project')
         self.assertFalse(saveMock.called)
 
+    @patch('taskban.reports.RefinementReport.save')
+    def test_refinement_cant_set_previous_sibling_on_first_project(
+        self,
+        saveMock,
+    ):
+        self.report.state['project'] = 'my-first-project'
+        with self.assertRaises(IndexError):
+            self.report.next('sibling', direction=-1)
+        self.assertFalse(saveMock.called)
+
+    def test_refinement_builds_the_project_tree_once(self):
+        self.assertIs(self.report.project_tree, self.report.project_tree)
+
+    def test_refinement_builds_projects_without_taskwarrior(self):
+        self.assertIsNone(self.report._backend)
+        self.assertIn('my-second-project', self.report.projects)
+
+    def test_refinement_saves_the_projects_cache(self):
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.data_path, 'projects.json')),
+        )
+
+    @patch('taskban.reports.Report._filter_tasks')
+    def test_refinement_uses_projects_cache(self, filterMock):
+        report = RefinementReport(
+            task_data_path=self.data_path,
+            taskrc_path=os.path.join(self.config_path, 'taskrc'),
+            config_path=os.path.join(self.config_path, 'config.yaml'),
+            data_path=self.data_path,
+        )
+        report.jump('my-second-project')
+        self.assertFalse(filterMock.called)
+
+    @patch(
+        'taskban.reports.TaskData.pending',
+        new_callable=PropertyMock,
+        side_effect=UnrecognisedTaskData,
+    )
+    def test_refinement_projects_fall_back_to_taskwarrior(self, pendingMock):
+        os.remove(os.path.join(self.data_path, 'projects.json'))
+        self.report._projects = None
+        with patch('taskban.reports.tasklib.TaskWarrior') as backendMock:
+            backendMock.return_value.tasks.filter.return_value = [
+                {'project': 'project', 'est': 1, 'ov': None},
+            ]
+            self.assertEqual(self.report.projects, {'project': {}})
+        self.assertEqual(self.report.project_stats, {'project': [1, 1, 0]})
+
+    def test_refinement_computes_project_stats(self):
+        self.assertEqual(
+            self.report.project_stats['my-second-project'][0],
+            4,
+        )
+        self.assertEqual(
+            self.report.summary(),
+            'my-first-project: 10 tasks, 0 est, 0 ov',
+        )
+
+    @patch('taskban.reports.RefinementReport.save')
+    def test_refinement_can_skip_empty_projects(self, saveMock):
+        self.report.skip_empty = True
+        self.report._project_stats['my-first-project.my-first-subproject'] \
+            = [0, 0, 0]
+        self.report._project_stats[
+            'my-first-project.my-first-subproject.my-first-subsubproject'
+        ] = [0, 0, 0]
+        self.report._project_stats[
+            'my-first-project.my-first-subproject.my-second-subsubproject'
+        ] = [0, 0, 0]
+        self.report._project_tree = None
+        self.report.next('child')
+        self.assertEqual(
+            self.report.state['project'],
+            'my-first-project.my-second-subproject',
+        )
+
+    @patch(
+        'taskban.reports.Report.project_stats',
+        new_callable=PropertyMock,
+        return_value={'my-second-project': [4, 0, 0]},
+    )
+    def test_refinement_starts_skipping_empty_projects(self, statsMock):
+        os.remove(self.state_file)
+        report = RefinementReport(
+            task_data_path=self.data_path,
+            taskrc_path=os.path.join(self.config_path, 'taskrc'),
+            config_path=os.path.join(self.config_path, 'config.yaml'),
+            data_path=self.data_path,
+            skip_empty=True,
+        )
+        self.assertEqual(report.state['project'], 'my-second-project')
+
+    def test_refinement_updates_the_completion_index(self):
+        self.report.update_completion_index()
+        index = load_index(self.data_path)
+        self.assertEqual(index['projects'][:2], [
+            'my-first-project',
+            'my-first-project.my-first-subproject',
+        ])
+        self.assertEqual(index['tasks']['1'], 'Backlog task 1')
+        self.assertIn('backlog', index['states'])
+
+    def test_completion_index_is_kept_if_the_data_files_dont_change(self):
+        self.report.update_completion_index()
+        report = RefinementReport(
+            task_data_path=self.data_path,
+            taskrc_path=os.path.join(self.config_path, 'taskrc'),
+            config_path=os.path.join(self.config_path, 'config.yaml'),
+            data_path=self.data_path,
+        )
+        with patch('taskban.reports.save_index') as saveMock:
+            report.update_completion_index()
+        self.assertFalse(saveMock.called)
+        self.assertFalse(report.task_data.pending_loaded)
+
+    def test_completion_index_is_rebuilt_if_the_data_files_change(self):
+        self.report.update_completion_index()
+        report = RefinementReport(
+            task_data_path=self.data_path,
+            taskrc_path=os.path.join(self.config_path, 'taskrc'),
+            config_path=os.path.join(self.config_path, 'config.yaml'),
+            data_path=self.data_path,
+        )
+        with open(os.path.join(self.data_path, 'pending.data'), 'a') as f:
+            f.write(
+                '[description:"New task" project:"new-project" '
+                'status:"pending" uuid:"7b3b2c4e-0000-4000-8000-000000000001"]'
+                '\n',
+            )
+        report.update_completion_index()
+        self.assertIn('new-project', load_index(self.data_path)['projects'])
+
+    @patch(
+        'taskban.reports.TaskData.pending',
+        new_callable=PropertyMock,
+        side_effect=UnrecognisedTaskData,
+    )
+    def test_completion_index_is_not_updated_without_data_files(
+        self,
+        pendingMock,
+    ):
+        self.report.update_completion_index()
+        self.assertEqual(load_index(self.data_path)['projects'], [])
+
 
 class TestPlanningReport(unittest.TestCase):
     def setUp(self):
@@ -595,20 +1137,27 @@ class TestPlanningReport(unittest.TestCase):
     def test_plan_can_get_task_position(self):
         self.assertEqual(self.report._get_task_position(6), 2)
 
+    def test_plan_task_position_of_an_unknown_task_raises_error(self):
+        with self.assertRaises(ValueError):
+            self.report._get_task_position(1000)
+
     def test_plan_can_increase_ord_of_a_task_without_ord(self):
         self.report._increase_task_ord(4, 0.1)
+        self.report.commit()
         task = self.report.backend.tasks.get(id=4)
         self.assertEqual(task['ord'], 0.1)
 
     def test_plan_can_increase_ord_of_a_task_with_ord(self):
         self.report.get_affected_tasks('backlog')
         self.report._increase_task_ord(1, 0.1)
+        self.report.commit()
         task = self.report.backend.tasks.get(id=1)
         self.assertEqual(task['ord'], 3.1)
 
     def test_plan_increase_ord_of_a_task_edits_the_taskrc(self):
         self.report.get_affected_tasks('backlog')
         self.report._increase_task_ord(1, 0.6)
+        self.report.commit()
         task = self.report.backend.tasks.get(id=1)
         self.assertEqual(task['ord'], 3.6)
         with open(self.report.backend.taskrc_location, 'r') as f:
@@ -622,6 +1171,51 @@ class TestPlanningReport(unittest.TestCase):
                 config_content,
             )
 
+    @patch('taskban.reports.PlanningReport.import_tasks')
+    def test_plan_increase_ord_is_not_saved_until_commit(self, importMock):
+        self.report._increase_task_ord(4, 0.1)
+        self.assertFalse(importMock.called)
+        self.report.commit()
+        self.assertEqual(len(importMock.call_args[0][0]), 1)
+
+    @patch('taskban.reports.PlanningReport.update_taskrc')
+    @patch('taskban.reports.PlanningReport.import_tasks')
+    def test_plan_move_saves_all_changes_at_once(
+        self,
+        importMock,
+        updatetaskrcMock,
+    ):
+        self.report.move_task_up(6)
+        self.assertEqual(importMock.call_count, 1)
+        self.assertEqual(len(importMock.call_args[0][0]), 2)
+        self.assertEqual(updatetaskrcMock.call_count, 0)
+
+    def test_plan_update_taskrc_replaces_and_adds_settings(self):
+        self.report.update_taskrc({
+            'urgency.uda.ord.3.coefficient': 4,
+            'urgency.uda.ord.7.coefficient': 7,
+        })
+        with open(self.report.backend.taskrc_location, 'r') as f:
+            config_content = f.read().splitlines()
+        self.assertIn("urgency.uda.ord.3.coefficient=4", config_content)
+        self.assertNotIn("urgency.uda.ord.3.coefficient=3", config_content)
+        self.assertIn("urgency.uda.ord.7.coefficient=7", config_content)
+
+    def test_plan_update_taskrc_keeps_the_symlink_and_the_mode(self):
+        taskrc = os.path.join(self.config_path, 'taskrc')
+        target = os.path.join(self.tmp, 'taskrc')
+        shutil.move(taskrc, target)
+        os.symlink(target, taskrc)
+        os.chmod(target, 0o600)
+        self.report.update_taskrc({'urgency.uda.ord.7.coefficient': 7})
+        self.assertTrue(os.path.islink(taskrc))
+        self.assertEqual(stat.S_IMODE(os.stat(target).st_mode), 0o600)
+        with open(target, 'r') as f:
+            self.assertIn(
+                "urgency.uda.ord.7.coefficient=7",
+                f.read().splitlines(),
+            )
+
     def test_plan_can_move_task_up_with_enough_space(self):
         self.report.get_affected_tasks('backlog')
         self.report.move_task_up(3)
@@ -666,8 +1260,8 @@ class TestPlanningReport(unittest.TestCase):
         self.report.get_affected_tasks('doing')
         self.report.move_task_down(7)
         task = self.report.backend.tasks.get(id=7)
-        self.assertEqual(task['ord'], -0.75)
-        self.assertEqual(round(task['urgency'], 3), 0.25)
+        self.assertEqual(task['ord'], -0.8)
+        self.assertEqual(round(task['urgency'], 3), 0.2)
 
     def test_plan_move_down_does_nothing_if_on_bottom(self):
         self.report.get_affected_tasks()
@@ -688,6 +1282,121 @@ class TestPlanningReport(unittest.TestCase):
         self.assertEqual(task3['ord'], -0.2)
         self.assertEqual(round(task3['urgency'], 3), 0.8)
 
+    @patch('taskban.reports.PlanningReport.update_taskrc')
+    @patch('taskban.reports.PlanningReport.import_tasks')
+    def test_plan_moves_keep_ords_spaced_by_the_minimum_step(
+        self,
+        importMock,
+        updatetaskrcMock,
+    ):
+        self.report.get_affected_tasks('backlog')
+        for task_id in [11, 12, 13, 14, 14, 13, 12, 11] * 5:
+            self.report.move_task_up(task_id)
+        urgencies = [
+            self.report.urgencies[task['uuid']] for task in self.report.tasks
+        ]
+        for urgency, next_urgency in zip(urgencies, urgencies[1:]):
+            self.assertGreaterEqual(round(urgency - next_urgency, 3), 0.1)
+
+    @patch('taskban.reports.PlanningReport.update_taskrc')
+    @patch('taskban.reports.PlanningReport.import_tasks')
+    def test_plan_moves_reuse_the_taskrc_coefficients(
+        self,
+        importMock,
+        updatetaskrcMock,
+    ):
+        self.report.get_affected_tasks('backlog')
+        moves = [11, 12, 13, 14, 14, 13, 12, 11] * 5
+        for task_id in moves:
+            self.report.move_task_up(task_id)
+        coefficients = len(self.report.taskrc_settings)
+        for task_id in moves:
+            self.report.move_task_up(task_id)
+        self.assertEqual(len(self.report.taskrc_settings), coefficients)
+
+    @patch('taskban.reports.PlanningReport.update_taskrc')
+    @patch('taskban.reports.PlanningReport.import_tasks')
+    def test_plan_moves_keep_the_ords_on_the_step_grid(
+        self,
+        importMock,
+        updatetaskrcMock,
+    ):
+        self.report.get_affected_tasks('backlog')
+        # Urgency terms like the age are not multiples of the step
+        for index, task in enumerate(self.report.tasks):
+            self.report.urgencies[task['uuid']] += 0.037 * index
+        self.report._sort_tasks()
+        initial_settings = set(self.report.taskrc_settings)
+        moves = random.Random(0)
+        for move in range(200):
+            task_id = moves.choice(self.report.tasks)['id']
+            if moves.random() < 0.5:
+                self.report.move_task_up(task_id)
+            else:
+                self.report.move_task_down(task_id)
+            urgencies = [
+                self.report.urgencies[task['uuid']]
+                for task in self.report.tasks
+            ]
+            for urgency, next_urgency in zip(urgencies, urgencies[1:]):
+                self.assertGreaterEqual(round(urgency - next_urgency, 3), 0.1)
+        new_ords = {
+            self.report.taskrc_settings[setting]
+            for setting in set(self.report.taskrc_settings) - initial_settings
+        }
+        for new_ord in new_ords:
+            self.assertAlmostEqual(new_ord * 10, round(new_ord * 10))
+        self.assertLessEqual(
+            len(new_ords),
+            round((max(new_ords) - min(new_ords)) * 10) + 1,
+        )
+
+    def test_plan_move_renumbers_only_the_tasks_around_the_gap(self):
+        self.report.get_affected_tasks('backlog')
+        self.report.move_task_up(12, commit=False)
+        self.assertEqual(
+            [task['id'] for task in self.report.tasks],
+            [1, 2, 3, 12, 11, 13, 14],
+        )
+        self.assertEqual(
+            set(self.report._changed_tasks),
+            {self.report.tasks[3]['uuid']},
+        )
+
+    @patch('taskban.reports.PlanningReport.update_taskrc')
+    @patch('taskban.reports.PlanningReport.import_tasks')
+    def test_plan_reorder_sorts_the_tasks(self, importMock, updatetaskrcMock):
+        self.report.get_affected_tasks('backlog')
+        self.report.reorder([3, 2, 1, 11, 12, 13, 14])
+        self.assertEqual(
+            [task['id'] for task in self.report.tasks],
+            [3, 2, 1, 11, 12, 13, 14],
+        )
+        self.assertEqual(importMock.call_count, 1)
+
+    @patch('taskban.reports.PlanningReport.update_taskrc')
+    @patch('taskban.reports.PlanningReport.import_tasks')
+    def test_plan_reorder_changes_only_the_tasks_out_of_place(
+        self,
+        importMock,
+        updatetaskrcMock,
+    ):
+        self.report.get_affected_tasks('backlog')
+        self.report.reorder([3, 2])
+        self.assertEqual(
+            [task['id'] for task in self.report.tasks],
+            [1, 3, 2, 11, 12, 13, 14],
+        )
+        self.assertEqual(
+            [str(task) for task in importMock.call_args[0][0]],
+            ['Backlog task 3'],
+        )
+
+    def test_plan_reorder_raises_with_duplicated_tasks(self):
+        self.report.get_affected_tasks('backlog')
+        with self.assertRaises(ValueError):
+            self.report.reorder([3, 3])
+
 
 if __name__ == '__main__':
     unittest.main()
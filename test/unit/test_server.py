@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import shutil
+import unittest
+import tempfile
+import threading
+from io import StringIO
+from taskban.reports import KanbanReport
+from taskban.server import TaskbanServer, ServerUnavailable, ServerError, \
+    request, socket_path
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        shutil.rmtree(self.tmp)
+        shutil.copytree('test/data', os.path.join(self.tmp, 'data'))
+        shutil.copytree('test/config', os.path.join(self.tmp, 'config'))
+        self.config_path = os.path.join(self.tmp, 'config')
+        self.data_path = os.path.join(self.tmp, 'data')
+        self.arguments = {
+            'period': '1984-01-01',
+            'task_data_path': self.data_path,
+            'taskrc_path': os.path.join(self.config_path, 'taskrc'),
+            'config_path': os.path.join(self.config_path, 'config.yaml'),
+            'show_backlog': True,
+            'show_inactive': True,
+        }
+        self.server = TaskbanServer(self.data_path)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        shutil.rmtree(self.tmp)
+
+    def test_server_answers_ocupation_like_the_report(self):
+        report = KanbanReport(
+            start_date='1984-01-01',
+            task_data_path=self.arguments['task_data_path'],
+            taskrc_path=self.arguments['taskrc_path'],
+            config_path=self.arguments['config_path'],
+            data_path=self.data_path,
+        )
+        out = StringIO()
+        report.print_report(show_backlog=True, show_inactive=True, out=out)
+        self.assertEqual(
+            request(self.data_path, 'ocupation', self.arguments),
+            out.getvalue(),
+        )
+
+    def test_server_answers_ocupation_in_other_formats(self):
+        self.arguments['output_format'] = 'jsonl'
+        output = request(self.data_path, 'ocupation', self.arguments)
+        self.assertEqual(
+            json.loads(output.splitlines()[0])['description'],
+            'Done task 1',
+        )
+
+    def test_server_keeps_the_tasks_in_memory(self):
+        request(self.data_path, 'ocupation', self.arguments)
+        state = list(self.server.states.values())[0]
+        task_data = state.task_data
+        request(self.data_path, 'ocupation', self.arguments)
+        self.assertIs(state.task_data, task_data)
+
+    def test_server_reloads_the_tasks_if_they_change(self):
+        request(self.data_path, 'ocupation', self.arguments)
+        state = list(self.server.states.values())[0]
+        task_data = state.task_data
+        with open(os.path.join(self.data_path, 'pending.data'), 'a') as f:
+            f.write(
+                '[description:"New task" entry:"1517438251" '
+                'modified:"1517438251" pm:"todo" project:"my-first-project" '
+                'status:"pending" '
+                'uuid:"5a2d4e76-5d9c-4a8b-9b7c-0a3b4c7c1f00"]\n',
+            )
+        output = request(self.data_path, 'ocupation', self.arguments)
+        self.assertIsNot(state.task_data, task_data)
+        self.assertIn('New task', output)
+
+    def test_server_errors_raise_server_error(self):
+        with self.assertRaises(ServerError):
+            request(self.data_path, 'unknown', {})
+
+    def test_request_waits_for_slow_commands(self):
+        run = self.server.run
+
+        def slow_run(command, arguments):
+            time.sleep(0.3)
+            return run(command, arguments)
+
+        self.server.run = slow_run
+        output = request(
+            self.data_path,
+            'ocupation',
+            self.arguments,
+            timeout=0.1,
+        )
+        self.assertIn('Done task 1', output)
+
+    def test_server_cant_be_started_twice(self):
+        with self.assertRaises(RuntimeError):
+            TaskbanServer(self.data_path)
+
+
+class TestRequest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_request_raises_if_server_is_not_running(self):
+        with self.assertRaises(ServerUnavailable):
+            request(self.tmp, 'ocupation', {})
+
+    def test_server_removes_stale_socket(self):
+        with open(socket_path(self.tmp), 'w') as f:
+            f.write('')
+        server = TaskbanServer(self.tmp)
+        server.server_close()
+        os.remove(socket_path(self.tmp))
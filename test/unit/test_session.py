@@ -0,0 +1,94 @@
+import os
+import shutil
+import unittest
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+from taskban.reports import PlanningReport, RefinementReport
+from taskban.session import Session
+
+
+class TestSession(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        shutil.rmtree(self.tmp)
+        shutil.copytree('test/data', os.path.join(self.tmp, 'data'))
+        shutil.copytree('test/config', os.path.join(self.tmp, 'config'))
+        self.config_path = os.path.join(self.tmp, 'config')
+        self.data_path = os.path.join(self.tmp, 'data')
+        report_arguments = {
+            'task_data_path': self.data_path,
+            'taskrc_path': os.path.join(self.config_path, 'taskrc'),
+            'config_path': os.path.join(self.config_path, 'config.yaml'),
+            'data_path': self.data_path,
+        }
+        refinement = RefinementReport(**report_arguments)
+        planning = PlanningReport(
+            project=refinement.state['project'],
+            **report_arguments
+        )
+        self.out = StringIO()
+        self.session = Session(refinement, planning, stdout=self.out)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_session_shares_the_tasks_between_reports(self):
+        self.assertIs(
+            self.session.refinement.task_data,
+            self.session.planning.task_data,
+        )
+
+    def test_session_prompt_shows_the_project(self):
+        self.assertEqual(self.session.prompt, '(my-first-project) ')
+
+    @patch('taskban.reports.RefinementReport.save')
+    def test_session_next_project_loads_its_planning(self, saveMock):
+        self.session.onecmd('n')
+        self.assertEqual(
+            self.session.refinement.state['project'],
+            'my-first-project.my-first-subproject',
+        )
+        self.assertEqual(
+            [task['id'] for task in self.session.planning.tasks],
+            [],
+        )
+        self.assertIn('3 tasks', self.out.getvalue())
+
+    @patch('taskban.reports.RefinementReport.save')
+    def test_session_next_doesnt_fail_at_the_end(self, saveMock):
+        self.session.onecmd('p sibling')
+        self.assertIn('no more projects', self.out.getvalue())
+
+    @patch('taskban.reports.PlanningReport.import_tasks')
+    def test_session_moves_are_not_saved_until_write(self, importMock):
+        self.session.onecmd('u 5')
+        self.assertFalse(importMock.called)
+        self.assertEqual(self.session.prompt, '(my-first-project*) ')
+        self.assertEqual(
+            [task['id'] for task in self.session.planning.tasks],
+            [5, 4],
+        )
+        self.session.onecmd('w')
+        self.assertEqual(importMock.call_count, 1)
+        self.assertFalse(self.session.changed)
+
+    @patch('taskban.reports.PlanningReport.import_tasks')
+    def test_session_saves_the_changes_on_quit(self, importMock):
+        self.session.onecmd('d 4')
+        self.assertTrue(self.session.onecmd('q'))
+        self.assertEqual(importMock.call_count, 1)
+
+    @patch('taskban.reports.PlanningReport.import_tasks')
+    def test_session_can_quit_without_saving(self, importMock):
+        self.session.onecmd('d 4')
+        self.assertTrue(self.session.onecmd('x'))
+        self.assertFalse(importMock.called)
+
+    def test_session_move_of_unknown_task_doesnt_fail(self):
+        self.session.onecmd('u 1000')
+        self.assertIn('not in the planning', self.out.getvalue())
+
+    def test_session_lists_the_tasks_of_the_project(self):
+        self.session.onecmd('l')
+        self.assertIn('10 tasks', self.out.getvalue())
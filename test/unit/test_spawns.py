@@ -0,0 +1,101 @@
+import os
+import sys
+import unittest
+import subprocess
+from unittest.mock import Mock
+from taskban.spawns import SpawnLog, log, instrument_backend
+
+
+@unittest.skipIf(
+    not hasattr(sys, 'addaudithook'),
+    'Audit hooks not supported',
+)
+class TestSpawnLog(unittest.TestCase):
+    def setUp(self):
+        log.start()
+
+    def tearDown(self):
+        log.stop()
+        log.clear()
+
+    def test_records_the_processes_out_of_commands(self):
+        subprocess.check_call(['true', 'argument'])
+        self.assertEqual(log.processes, 1)
+        self.assertEqual(log.records, [{
+            'command': 'true',
+            'arguments': ['argument'],
+            'seconds': None,
+            'output_bytes': None,
+            'processes': 1,
+        }])
+
+    def test_records_os_system(self):
+        os.system('true')
+        self.assertEqual(log.records[0]['command'], 'true')
+
+    def test_command_takes_the_processes_started_inside(self):
+        with log.command('true', [1]) as record:
+            subprocess.check_call(['true'])
+            record['output_bytes'] = 10
+        self.assertEqual(len(log.records), 1)
+        self.assertEqual(log.records[0]['arguments'], ['1'])
+        self.assertEqual(log.records[0]['processes'], 1)
+        self.assertEqual(log.records[0]['output_bytes'], 10)
+        self.assertGreater(log.records[0]['seconds'], 0)
+
+    def test_command_without_processes_is_not_recorded(self):
+        with log.command('task', ['export']):
+            pass
+        self.assertEqual(log.records, [])
+
+    def test_nothing_is_recorded_when_stopped(self):
+        log.stop()
+        subprocess.check_call(['true'])
+        with log.command('true', []):
+            subprocess.check_call(['true'])
+        self.assertEqual(log.processes, 0)
+        self.assertEqual(log.records, [])
+
+    def test_start_clears_the_previous_records(self):
+        subprocess.check_call(['true'])
+        log.start()
+        self.assertEqual(log.processes, 0)
+        self.assertEqual(log.records, [])
+
+    def test_totals(self):
+        with log.command('true', []) as record:
+            subprocess.check_call(['true'])
+            subprocess.check_call(['true'])
+            record['output_bytes'] = 10
+        subprocess.check_call(['true'])
+        totals = log.totals()
+        self.assertEqual(totals['processes'], 3)
+        self.assertEqual(totals['commands'], 2)
+        self.assertEqual(totals['output_bytes'], 10)
+
+    def test_instrument_backend_records_the_taskwarrior_commands(self):
+        backend = Mock()
+
+        def execute_command(args):
+            return subprocess.check_output(['echo'] + args).decode().split()
+
+        backend.execute_command = execute_command
+        instrument_backend(backend)
+        self.assertEqual(backend.execute_command(['export']), ['export'])
+        self.assertEqual(log.records, [{
+            'command': 'task',
+            'arguments': ['export'],
+            'seconds': log.records[0]['seconds'],
+            'output_bytes': 7,
+            'processes': 1,
+        }])
+
+
+class TestSpawnLogWithoutAuditHooks(unittest.TestCase):
+    def test_commands_are_assumed_to_start_a_process(self):
+        spawn_log = SpawnLog()
+        spawn_log.active = True
+        with spawn_log.command('task', ['export']):
+            pass
+        self.assertEqual(spawn_log.processes, 1)
+        self.assertEqual(spawn_log.records[0]['processes'], 1)
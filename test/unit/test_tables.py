@@ -0,0 +1,42 @@
+import unittest
+from io import StringIO
+from tabulate import tabulate
+from taskban.tables import Table, text_width, format_cell
+
+HEADERS = ['ID', 'OV', 'Est', 'Active', 'Progress %', 'Description']
+
+
+class TestTable(unittest.TestCase):
+    def render(self, rows):
+        table = Table(HEADERS)
+        for row in rows:
+            table.add_row(row)
+        out = StringIO()
+        table.write(out)
+        return out.getvalue()
+
+    def test_format_cell(self):
+        self.assertEqual(format_cell(None), '')
+        self.assertEqual(format_cell(2.5), '2.5')
+        self.assertEqual(format_cell(' Task '), 'Task')
+
+    def test_text_width_ignores_color_codes(self):
+        self.assertEqual(text_width('\x1b[31mred\x1b[0m'), 3)
+
+    def test_table_has_the_tabulate_layout(self):
+        rows = [
+            [1, None, 0, '00:00:00', 'NoEstimate', 'Backlog task 1'],
+            [12, 0.5, 1.25, '1 00:01:09', 52.3, ' A longer description '],
+            ['-----', '---', '---', '--------', '----', '----'],
+            ['Total', 0.5, 1.25, '1 00:01:09', '', ''],
+        ]
+        self.assertEqual(self.render(rows), tabulate(rows, headers=HEADERS))
+
+    def test_table_has_the_tabulate_layout_with_special_characters(self):
+        rows = [
+            ['\t', None, None, '00:00:00', '', 'Tab'],
+            [1, None, None, '00:00:00', '', '\x1b[31mColored\x1b[0m task'],
+            [2, None, None, '00:00:00', '', 'Wide 日本語 task'],
+            ['-----', '---', '---', '--------', '----', '----'],
+        ]
+        self.assertEqual(self.render(rows), tabulate(rows, headers=HEADERS))